@@ -20,7 +20,7 @@ from typing import List, Literal
 from core.config import settings
 from core.logging import setup_logging
 from core.db import get_conn
-from models.dao import init_db, upsert_job
+from models.dao import init_db, upsert_job, update_job_state
 
 # Simple request model that accepts frontend format
 class QuickCreateRequest(BaseModel):
@@ -38,27 +38,6 @@ class QuickCreateResponse(BaseModel):
     estimated_time_sec: Optional[int] = None
     message: str
 
-def update_state(conn, job_id, state, progress):
-    conn.execute(
-        "UPDATE jobs SET state = ?, progress = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
-        (state, progress, job_id)
-    )
-    conn.commit()
-
-def update_job_state(conn, job_id, state, progress):
-    try:
-        conn.execute(
-            "UPDATE jobs SET state = ?, progress = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
-            (state, progress, job_id)
-        )
-        conn.commit()
-    except Exception:
-        conn.execute(
-            "UPDATE jobs SET state = ?, progress = ? WHERE job_id = ?",
-            (state, progress, job_id)
-        )
-        conn.commit()
-
 class SecurityMiddleware:
     def __init__(self, app):
         self.app = app
@@ -108,7 +87,10 @@ app.add_middleware(
 )
 
 init_conn = get_conn()
-init_db(init_conn)
+try:
+    init_db(init_conn)
+finally:
+    init_conn.close()
 app.add_middleware(SecurityMiddleware)
 app.mount("/files", StaticFiles(directory=settings.MEDIA_DIR), name="files")
 log.info(f"MEDIA_DIR: {settings.MEDIA_DIR}")
@@ -0,0 +1,61 @@
+"""
+Retention-driven archival of finished jobs.
+
+The jobs table only needs the jobs people still look at. Every
+ARCHIVE_INTERVAL_SECONDS the archiver moves done, error and cancelled jobs
+last written more than RETENTION_DAYS ago into jobs_archive, in batches of
+ARCHIVE_BATCH_SIZE jobs per transaction. The hot table and its indexes stay
+small enough for the page cache, and writers only wait for one short batch
+at a time. storage.get_job falls back to the archive, so lookups by job_id
+keep working after a job has been moved.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from core.config import settings
+from core.storage import storage
+
+log = logging.getLogger(__name__)
+
+class JobArchiver:
+    """Moves old finished jobs from the hot jobs table to the archive"""
+
+    def __init__(self, retention_days: Optional[int] = None, batch_size: Optional[int] = None,
+                 interval: Optional[float] = None):
+        self.retention_days = retention_days if retention_days is not None else settings.RETENTION_DAYS
+        self.batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+        self.interval = interval or settings.ARCHIVE_INTERVAL_SECONDS
+
+    async def archive_once(self) -> int:
+        """Archive everything past retention, one batch per transaction; returns the number of jobs moved"""
+        if self.retention_days <= 0:
+            return 0
+        before = time.time() - self.retention_days * 86400
+        total = 0
+        while True:
+            moved = await storage.archive_jobs(before, self.batch_size)
+            total += moved
+            if moved < self.batch_size:
+                break
+            # Let queued writers take the lock between batches
+            await asyncio.sleep(0.05)
+        if total:
+            log.info(f"🗄️ Archived {total} jobs older than {self.retention_days} days")
+        return total
+
+    async def run(self, stop_event: asyncio.Event):
+        """Archive every `interval` seconds until stop_event is set"""
+        while not stop_event.is_set():
+            try:
+                await self.archive_once()
+            except Exception as e:
+                log.error(f"❌ Job archival failed: {e}")
+            try:
+                await asyncio.wait_for(stop_event.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+# Global instance
+job_archiver = JobArchiver()
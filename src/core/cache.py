@@ -1,10 +1,36 @@
 """
 Redis-based caching system for high-performance operations
+
+With CACHE_L1_ENABLED, CacheManager keeps an in-process LRU (L1) of recently
+read and written values in front of Redis (L2), bounded by entries and bytes.
+An L1 entry lives at most CACHE_L1_TTL seconds, or less if its Redis key
+expires sooner. Every write and delete publishes the affected keys on a
+Redis channel, and each process drops them from its L1 when the message
+arrives, so replicas serve stale values only for the length of a publish.
+While that subscription is down, L1 is bypassed and emptied.
+
+clear_namespace() never enumerates keys: each namespace has a generation,
+kept in one Redis hash and part of its key prefix ("ns:" at generation 0,
+then "ns@1:", "ns@2:", ...), and clearing bumps it. Bumps are broadcast on
+the invalidation channel (polled from the hash while it is down); keys of
+old generations are no longer read and expire with their TTLs. Sweeps that
+do have to enumerate (delete_pattern, recode_namespace) SCAN in batches
+instead of calling KEYS, which blocks Redis and the job queue on it.
+
+Values are encoded by core.cache_codecs: CACHE_CODEC and CACHE_COMPRESSION
+by default, overridden per namespace by CACHE_NAMESPACE_CODECS or
+configure_namespace().
 """
 import json
-import pickle
 import asyncio
-from typing import Any, Optional, Union, Dict, List
+import concurrent.futures
+import fnmatch
+import functools
+import inspect
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Tuple, Union, Dict, List
 from datetime import timedelta
 import redis.asyncio as redis
 from redis.asyncio import ConnectionPool
@@ -12,6 +38,7 @@ import logging
 import hashlib
 import time
 
+from core import cache_codecs
 from core.config import settings
 
 log = logging.getLogger(__name__)
@@ -28,6 +55,62 @@ class CacheSerializationError(CacheError):
     """Exception for serialization issues"""
     pass
 
+class LocalCache:
+    """In-process LRU of serialized values, bounded by entries and bytes, with per-entry expiry"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # cache key -> (expires_at, serialized value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self.nbytes = 0
+        self.evictions = 0
+        # Bumped by every invalidation: a value read from Redis before one must not be stored after it
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, data: bytes, ttl: float):
+        self._remove(key)
+        if ttl <= 0 or len(data) > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self.nbytes += len(data)
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[str]):
+        self.epoch += 1
+        for key in keys:
+            self._remove(key)
+
+    def invalidate_matching(self, pattern: str):
+        """Drop the keys matching a Redis glob pattern"""
+        self.invalidate([key for key in self._entries if fnmatch.fnmatchcase(key, pattern)])
+
+    def clear(self):
+        self.epoch += 1
+        self._entries.clear()
+        self.nbytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= len(entry[1])
+
 class CacheManager:
     """
     High-performance Redis cache manager with serialization,
@@ -39,10 +122,29 @@ class CacheManager:
         self._redis: Optional[redis.Redis] = None
         self._default_ttl = settings.REDIS_CACHE_TTL
         self._prefix = "genscene_cache:"
-        self._compression_enabled = True
-        self._serializer = "pickle"  # or "json"
+        self._default_codec = self._resolve_codec(settings.CACHE_CODEC, settings.CACHE_COMPRESSION)
+        self._namespace_codecs: Dict[str, Tuple[cache_codecs.Codec, cache_codecs.Codec]] = {}
+        for namespace, spec in settings.cache_namespace_codecs.items():
+            codec, _, compression = spec.partition("/")
+            self._namespace_codecs[namespace] = self._resolve_codec(codec, compression or settings.CACHE_COMPRESSION)
+        self._compression_min_bytes = settings.CACHE_COMPRESSION_MIN_BYTES
         self._max_retries = 3
         self._retry_delay = 1
+        # Optional L1 tier; only read while subscribed to other processes' invalidations
+        self._local: Optional[LocalCache] = (
+            LocalCache(settings.CACHE_L1_MAX_ENTRIES, settings.CACHE_L1_MAX_BYTES) if settings.CACHE_L1_ENABLED else None
+        )
+        self._local_ttl = settings.CACHE_L1_TTL
+        self._subscribed = False
+        self._invalidation_channel = f"{self._prefix}invalidate"
+        self._versions_key = f"{self._prefix}namespaces"
+        self._namespace_versions: Dict[str, int] = {}
+        self._versions_loaded_at = 0.0
+        self._version_poll_interval = 1.0  # seconds, while not subscribed
+        self._scan_batch_size = settings.CACHE_SCAN_BATCH_SIZE
+        self._instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._tier_stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0}
 
     async def initialize(self):
         """Initialize Redis connection pool"""
@@ -60,6 +162,9 @@ class CacheManager:
 
             # Test connection
             await self._redis.ping()
+            await self._load_namespace_versions()
+            if self._listener is None:
+                self._listener = asyncio.create_task(self._listen_for_invalidations())
             log.info("✅ Redis cache initialized successfully")
 
         except Exception as e:
@@ -68,39 +173,165 @@ class CacheManager:
 
     async def close(self):
         """Close Redis connections"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
         if self._pool:
             await self._pool.disconnect()
             log.info("🔌 Redis cache connections closed")
 
+    def _namespace_prefix(self, namespace: str, version: Optional[int] = None) -> str:
+        """Key prefix of a namespace's current (or given) generation"""
+        if version is None:
+            version = self._namespace_versions.get(namespace, 0)
+        return f"{self._prefix}{namespace}@{version}:" if version else f"{self._prefix}{namespace}:"
+
     def _make_key(self, key: str, namespace: str = "default") -> str:
         """Create a namespaced cache key with hash for long keys"""
         # If key is too long, hash it
         if len(key) > 100:
             key_hash = hashlib.md5(key.encode()).hexdigest()
-            return f"{self._prefix}{namespace}:{key_hash[:8]}:{key_hash[-8:]}"
+            return f"{self._namespace_prefix(namespace)}{key_hash[:8]}:{key_hash[-8:]}"
+
+        return f"{self._namespace_prefix(namespace)}{key}"
+
+    async def _load_namespace_versions(self):
+        versions = await self._execute_with_retry(self._redis.hgetall, self._versions_key)
+        self._namespace_versions = {
+            (name.decode() if isinstance(name, bytes) else name): int(version) for name, version in versions.items()
+        }
+        self._versions_loaded_at = time.monotonic()
+
+    async def _sync_namespace_versions(self):
+        """Bumps arrive on the invalidation channel; while it is down, re-read them every poll interval"""
+        if not self._subscribed and time.monotonic() - self._versions_loaded_at >= self._version_poll_interval:
+            await self._load_namespace_versions()
+
+    def _set_namespace_version(self, namespace: str, version: int):
+        previous = self._namespace_versions.get(namespace, 0)
+        if version <= previous:
+            return
+        self._namespace_versions[namespace] = version
+        if self._local is not None:
+            self._local.invalidate_matching(f"{self._namespace_prefix(namespace, previous)}*")
+
+    def _local_tier(self) -> Optional[LocalCache]:
+        """L1, if enabled and currently receiving invalidations"""
+        return self._local if self._subscribed else None
+
+    async def _listen_for_invalidations(self):
+        """Apply other processes' invalidations and namespace bumps, resubscribing after errors"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(self._invalidation_channel)
+                # Invalidations published while we were not subscribed are lost
+                await self._load_namespace_versions()
+                if self._local is not None:
+                    self._local.clear()
+                self._subscribed = True
+                while True:
+                    # A bounded wait: listen() would hit the pool's 5s socket_timeout on a quiet channel
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"⚠️ Cache invalidation subscription lost, bypassing L1: {e}")
+            finally:
+                self._subscribed = False
+                if self._local is not None:
+                    self._local.clear()
+                await pubsub.close()
+            await asyncio.sleep(self._retry_delay)
+
+    def _apply_invalidation(self, data: Union[bytes, str]):
+        try:
+            message = json.loads(data)
+        except ValueError:
+            log.warning(f"⚠️ Ignoring malformed cache invalidation: {data!r}")
+            return
+        if message.get("origin") == self._instance_id:
+            return  # already applied when published
+        if "namespace" in message:
+            self._set_namespace_version(message["namespace"], message["version"])
+        elif self._local is None:
+            return
+        elif "pattern" in message:
+            self._local.invalidate_matching(message["pattern"])
+        else:
+            self._local.invalidate(message.get("keys", []))
 
-        return f"{self._prefix}{namespace}:{key}"
+    def _invalidation(self, keys: Optional[List[str]] = None, pattern: Optional[str] = None) -> str:
+        """Drop keys (or a pattern) from this process's L1; returns the message for the other processes"""
+        if self._local is not None:
+            if pattern is not None:
+                self._local.invalidate_matching(pattern)
+            else:
+                self._local.invalidate(keys or [])
+        message = {"origin": self._instance_id}
+        if pattern is not None:
+            message["pattern"] = pattern
+        else:
+            message["keys"] = keys or []
+        return json.dumps(message)
+
+    async def _publish_invalidation(self, message: str):
+        await self._execute_with_retry(self._redis.publish, self._invalidation_channel, message)
+
+    def _local_entry_ttl(self, redis_ttl: float) -> float:
+        """L1 lifetime: CACHE_L1_TTL, but never past the key's Redis expiry (negative = no expiry)"""
+        return self._local_ttl if redis_ttl < 0 else min(redis_ttl, self._local_ttl)
+
+    def _record_l2(self, hits: int, misses: int):
+        self._tier_stats["l2_hits"] += hits
+        self._tier_stats["l2_misses"] += misses
+
+    def get_tier_stats(self) -> Dict[str, Any]:
+        """Hit ratios of the in-process tier (L1) and Redis (L2)"""
+        stats = dict(self._tier_stats)
+        l1_lookups = stats["l1_hits"] + stats["l1_misses"]
+        l2_lookups = stats["l2_hits"] + stats["l2_misses"]
+        stats["l1_hit_ratio"] = round(stats["l1_hits"] / l1_lookups, 4) if l1_lookups else 0.0
+        stats["l2_hit_ratio"] = round(stats["l2_hits"] / l2_lookups, 4) if l2_lookups else 0.0
+        stats["l1_enabled"] = self._local is not None
+        stats["l1_live"] = self._subscribed
+        if self._local is not None:
+            stats.update(l1_entries=len(self._local), l1_bytes=self._local.nbytes, l1_evictions=self._local.evictions)
+        return stats
+
+    def _resolve_codec(self, codec: str, compression: str) -> Tuple[cache_codecs.Codec, cache_codecs.Codec]:
+        """Codec and compressor from settings, falling back to pickle/zlib when one is unavailable"""
+        try:
+            return cache_codecs.resolve(codec, compression)
+        except ValueError as e:
+            log.warning(f"⚠️ {e}; using pickle/zlib")
+            return cache_codecs.resolve("pickle", "zlib")
 
-    def _serialize(self, data: Any) -> bytes:
-        """Serialize data for storage"""
+    def configure_namespace(self, namespace: str, codec: str, compression: Optional[str] = None):
+        """Encode values written to a namespace from now on with another codec/compression"""
         try:
-            if self._serializer == "json":
-                if isinstance(data, (dict, list, str, int, float, bool)):
-                    return json.dumps(data).encode('utf-8')
-                else:
-                    raise CacheSerializationError("JSON serialization requires JSON-serializable data")
-            else:
-                return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            self._namespace_codecs[namespace] = cache_codecs.resolve(codec, compression or self._default_codec[1].name)
+        except ValueError as e:
+            raise CacheError(str(e))
+
+    def _serialize(self, data: Any, namespace: str = "default") -> bytes:
+        """Serialize data for storage with the namespace's codec"""
+        codec, compressor = self._namespace_codecs.get(namespace, self._default_codec)
+        try:
+            return cache_codecs.encode(data, codec, compressor, self._compression_min_bytes)
         except Exception as e:
-            raise CacheSerializationError(f"Failed to serialize data: {e}")
+            raise CacheSerializationError(f"Failed to serialize data with {codec.name}: {e}")
 
     def _deserialize(self, data: bytes) -> Any:
-        """Deserialize data from storage"""
+        """Deserialize data from storage, whatever codec it was written with"""
         try:
-            if self._serializer == "json":
-                return json.loads(data.decode('utf-8'))
-            else:
-                return pickle.loads(data)
+            return cache_codecs.decode(data)
         except Exception as e:
             raise CacheSerializationError(f"Failed to deserialize data: {e}")
 
@@ -122,19 +353,57 @@ class CacheManager:
 
         raise CacheConnectionError(f"Redis operation failed after {self._max_retries} retries: {last_exception}")
 
+    async def _execute_pipeline(self, queue, transaction: bool = False) -> List[Any]:
+        """
+        Execute a pipeline with retry logic; queue(pipeline) adds its commands.
+
+        A pipeline is reset once executed, even when the connection fails, so
+        every attempt queues the commands on a fresh one.
+        """
+        async def execute():
+            pipeline = self._redis.pipeline(transaction=transaction)
+            queue(pipeline)
+            return await pipeline.execute()
+
+        return await self._execute_with_retry(execute)
+
     async def get(self, key: str, namespace: str = "default") -> Optional[Any]:
         """Get value from cache"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         cache_key = self._make_key(key, namespace)
 
         try:
-            data = await self._execute_with_retry(self._redis.get, cache_key)
+            local = self._local_tier()
+            if local is None:
+                data = await self._execute_with_retry(self._redis.get, cache_key)
+                self._record_l2(data is not None, data is None)
+                if data is None:
+                    return None
+                return self._deserialize(data)
+
+            data = local.get(cache_key)
+            if data is not None:
+                self._tier_stats["l1_hits"] += 1
+                return self._deserialize(data)
+            self._tier_stats["l1_misses"] += 1
+
+            epoch = local.epoch
+            def queue_reads(pipeline):
+                pipeline.get(cache_key)
+                pipeline.pttl(cache_key)
+
+            data, pttl = await self._execute_pipeline(queue_reads)
+            self._record_l2(data is not None, data is None)
             if data is None:
                 return None
 
-            return self._deserialize(data)
+            value = self._deserialize(data)
+            if local.epoch == epoch:
+                local.put(cache_key, data, self._local_entry_ttl(pttl / 1000))
+            return value
         except CacheError:
             raise
         except Exception as e:
@@ -151,15 +420,25 @@ class CacheManager:
         """Set value in cache with optional TTL"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         cache_key = self._make_key(key, namespace)
         ttl = ttl or self._default_ttl
 
         try:
-            serialized_data = self._serialize(value)
-            success = await self._execute_with_retry(
-                self._redis.setex, cache_key, ttl, serialized_data
-            )
+            serialized_data = self._serialize(value, namespace)
+            invalidation = self._invalidation([cache_key])
+            local = self._local_tier()
+            epoch = local.epoch if local is not None else None
+
+            def queue_writes(pipeline):
+                pipeline.setex(cache_key, ttl, serialized_data)
+                pipeline.publish(self._invalidation_channel, invalidation)
+
+            success, _ = await self._execute_pipeline(queue_writes)
+            # A newer write from another process may have been announced meanwhile
+            if success and local is not None and local.epoch == epoch:
+                local.put(cache_key, serialized_data, self._local_entry_ttl(ttl))
             return bool(success)
         except CacheError:
             raise
@@ -171,11 +450,18 @@ class CacheManager:
         """Delete key from cache"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         cache_key = self._make_key(key, namespace)
 
         try:
-            result = await self._execute_with_retry(self._redis.delete, cache_key)
+            invalidation = self._invalidation([cache_key])
+
+            def queue_writes(pipeline):
+                pipeline.delete(cache_key)
+                pipeline.publish(self._invalidation_channel, invalidation)
+
+            result, _ = await self._execute_pipeline(queue_writes)
             return result > 0
         except CacheError:
             raise
@@ -187,25 +473,59 @@ class CacheManager:
         """Delete keys matching pattern"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
-        cache_pattern = self._make_key(pattern.replace('*', '*'), namespace)
-        cache_pattern = cache_pattern.replace('*', '*')
+        cache_pattern = self._make_key(pattern, namespace)
 
         try:
-            keys = await self._execute_with_retry(self._redis.keys, cache_pattern)
-            if keys:
-                return await self._execute_with_retry(self._redis.delete, *keys)
-            return 0
+            deleted = 0
+            async for batch in self.scan_batches(cache_pattern):
+                # UNLINK frees the values off Redis's main thread
+                deleted += await self._execute_with_retry(self._redis.unlink, *batch)
+            await self._publish_invalidation(self._invalidation(pattern=cache_pattern))
+            return deleted
         except CacheError:
             raise
         except Exception as e:
             log.error(f"❌ Cache delete pattern error for {cache_pattern}: {e}")
             return 0
 
+    async def sweep(self, pattern: str, predicate: Callable[[Any], bool], namespace: str = "default") -> int:
+        """Delete the keys matching pattern whose cached value satisfies predicate, scanning in batches"""
+        if not self._redis:
+            raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
+
+        cache_pattern = self._make_key(pattern, namespace)
+
+        try:
+            deleted = 0
+            async for batch in self.scan_batches(cache_pattern):
+                expired = []
+                for cache_key, data in zip(batch, await self._execute_with_retry(self._redis.mget, batch)):
+                    if data is None:
+                        continue
+                    try:
+                        if predicate(self._deserialize(data)):
+                            expired.append(cache_key)
+                    except Exception as e:
+                        log.debug(f"Leaving {cache_key} in cache: {e}")
+
+                if expired:
+                    deleted += await self._execute_with_retry(self._redis.unlink, *expired)
+                    await self._publish_invalidation(self._invalidation(expired))
+            return deleted
+        except CacheError:
+            raise
+        except Exception as e:
+            log.error(f"❌ Cache sweep error for {cache_pattern}: {e}")
+            return 0
+
     async def exists(self, key: str, namespace: str = "default") -> bool:
         """Check if key exists in cache"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         cache_key = self._make_key(key, namespace)
 
@@ -222,6 +542,7 @@ class CacheManager:
         """Get TTL for key (returns seconds remaining or None if key doesn't exist)"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         cache_key = self._make_key(key, namespace)
 
@@ -238,6 +559,7 @@ class CacheManager:
         """Get multiple values from cache"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         if not keys:
             return {}
@@ -245,8 +567,35 @@ class CacheManager:
         cache_keys = [self._make_key(key, namespace) for key in keys]
 
         try:
-            values = await self._execute_with_retry(self._redis.mget, cache_keys)
             result = {}
+            local = self._local_tier()
+            if local is None:
+                values = await self._execute_with_retry(self._redis.mget, cache_keys)
+                ttls = None
+            else:
+                missing = []
+                for key, cache_key in zip(keys, cache_keys):
+                    data = local.get(cache_key)
+                    if data is None:
+                        missing.append((key, cache_key))
+                    else:
+                        result[key] = self._deserialize(data)
+                self._tier_stats["l1_hits"] += len(result)
+                self._tier_stats["l1_misses"] += len(missing)
+                if not missing:
+                    return result
+
+                epoch = local.epoch
+                keys, cache_keys = [key for key, _ in missing], [cache_key for _, cache_key in missing]
+                def queue_reads(pipeline):
+                    pipeline.mget(cache_keys)
+                    for cache_key in cache_keys:
+                        pipeline.pttl(cache_key)
+
+                values, *ttls = await self._execute_pipeline(queue_reads)
+
+            hits = sum(value is not None for value in values)
+            self._record_l2(hits, len(values) - hits)
 
             for i, (key, value) in enumerate(zip(keys, values)):
                 if value is not None:
@@ -256,6 +605,9 @@ class CacheManager:
                         log.warning(f"⚠️ Failed to deserialize cached value for key {key}")
                         # Delete corrupted key
                         await self.delete(key, namespace)
+                        continue
+                    if ttls is not None and local.epoch == epoch:
+                        local.put(cache_keys[i], value, self._local_entry_ttl(ttls[i] / 1000))
 
             return result
         except CacheError:
@@ -273,6 +625,7 @@ class CacheManager:
         """Set multiple values in cache (uses pipeline for performance)"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         if not data:
             return True
@@ -280,14 +633,23 @@ class CacheManager:
         ttl = ttl or self._default_ttl
 
         try:
-            pipeline = self._redis.pipeline()
-
-            for key, value in data.items():
-                cache_key = self._make_key(key, namespace)
-                serialized_data = self._serialize(value)
-                pipeline.setex(cache_key, ttl, serialized_data)
-
-            await self._execute_with_retry(pipeline.execute)
+            serialized = {
+                self._make_key(key, namespace): self._serialize(value, namespace)
+                for key, value in data.items()
+            }
+            invalidation = self._invalidation(list(serialized))
+
+            def queue_writes(pipeline):
+                for cache_key, serialized_data in serialized.items():
+                    pipeline.setex(cache_key, ttl, serialized_data)
+                pipeline.publish(self._invalidation_channel, invalidation)
+
+            local = self._local_tier()
+            epoch = local.epoch if local is not None else None
+            await self._execute_pipeline(queue_writes, transaction=True)
+            if local is not None and local.epoch == epoch:
+                for cache_key, serialized_data in serialized.items():
+                    local.put(cache_key, serialized_data, self._local_entry_ttl(ttl))
             return True
         except CacheError:
             raise
@@ -299,6 +661,7 @@ class CacheManager:
         """Increment a counter in cache"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
 
         cache_key = self._make_key(key, namespace)
 
@@ -307,6 +670,7 @@ class CacheManager:
             # Set TTL if it's a new key
             if await self._redis.ttl(cache_key) == -1:
                 await self._execute_with_retry(self._redis.expire, cache_key, self._default_ttl)
+            await self._publish_invalidation(self._invalidation([cache_key]))
             return result
         except CacheError:
             raise
@@ -334,7 +698,8 @@ class CacheManager:
                     max(info.get("keyspace_hits", 0) + info.get("keyspace_misses", 0), 1)
                 ) * 100,
                 "expired_keys": info.get("expired_keys", 0),
-                "evicted_keys": info.get("evicted_keys", 0)
+                "evicted_keys": info.get("evicted_keys", 0),
+                "tiers": self.get_tier_stats()
             }
         except CacheError:
             raise
@@ -343,88 +708,280 @@ class CacheManager:
             return {}
 
     async def clear_namespace(self, namespace: str) -> int:
-        """Clear all keys in a namespace"""
+        """Clear all keys in a namespace in O(1) by moving it to a new generation; returns that generation"""
         if not self._redis:
             raise CacheConnectionError("Cache not initialized")
 
-        pattern = f"{self._prefix}{namespace}:*"
-
         try:
-            keys = await self._execute_with_retry(self._redis.keys, pattern)
-            if keys:
-                return await self._execute_with_retry(self._redis.delete, *keys)
-            return 0
+            version = await self._execute_with_retry(self._redis.hincrby, self._versions_key, namespace, 1)
+            self._set_namespace_version(namespace, version)
+            await self._publish_invalidation(json.dumps({
+                "origin": self._instance_id, "namespace": namespace, "version": version
+            }))
+            log.info(f"🧹 Cleared cache namespace {namespace} (generation {version})")
+            return version
         except CacheError:
             raise
         except Exception as e:
             log.error(f"❌ Clear namespace error for {namespace}: {e}")
             return 0
 
+    async def recode_namespace(self, namespace: str, batch_size: Optional[int] = None) -> int:
+        """Rewrite a namespace's values that were stored with another codec/compression, keeping their TTLs"""
+        if not self._redis:
+            raise CacheConnectionError("Cache not initialized")
+        await self._sync_namespace_versions()
+
+        codec, compressor = self._namespace_codecs.get(namespace, self._default_codec)
+        target = (codec.name, compressor.name)
+        recoded = 0
+
+        try:
+            async for batch in self.scan_batches(f"{self._namespace_prefix(namespace)}*", batch_size):
+                def queue_reads(pipeline, batch=batch):
+                    for cache_key in batch:
+                        pipeline.get(cache_key)
+                        pipeline.pttl(cache_key)
+
+                results = await self._execute_pipeline(queue_reads)
+
+                writes = []
+                for cache_key, data, pttl in zip(batch, results[::2], results[1::2]):
+                    if not isinstance(data, bytes) or cache_codecs.header(data) == target:
+                        continue
+                    try:
+                        encoded = self._serialize(self._deserialize(data), namespace)
+                    except CacheSerializationError as e:
+                        log.warning(f"⚠️ Leaving {cache_key} as is: {e}")
+                        continue
+                    writes.append((cache_key, encoded, pttl if pttl > 0 else None))
+
+                def queue_writes(pipeline, writes=writes):
+                    # XX: skip keys deleted since they were read
+                    for cache_key, encoded, pttl in writes:
+                        pipeline.set(cache_key, encoded, px=pttl, xx=True)
+
+                if writes:
+                    recoded += sum(bool(ok) for ok in await self._execute_pipeline(queue_writes))
+
+            log.info(f"🔁 Re-encoded {recoded} cache values in {namespace} as {codec.name}/{compressor.name}")
+            return recoded
+        except CacheError:
+            raise
+        except Exception as e:
+            log.error(f"❌ Recode namespace error for {namespace}: {e}")
+            return recoded
+
+    async def scan_batches(self, pattern: str, batch_size: Optional[int] = None):
+        """Yield the Redis keys matching pattern in batches, with SCAN instead of the blocking KEYS"""
+        batch_size = batch_size or self._scan_batch_size
+        batch = []
+        async for cache_key in self._redis.scan_iter(match=pattern, count=batch_size):
+            batch.append(cache_key.decode() if isinstance(cache_key, bytes) else cache_key)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
 # Global cache manager instance
 cache_manager = CacheManager()
 
+class _SyncMemo:
+    """In-process TTL cache and single-flight for cache_result on sync functions"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # key -> (value, fresh_until, expires_at), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._inflight: Dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """(value, is_fresh), or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], now < entry[1]
+
+    def call(self, key: str, compute: Callable[[], Tuple[Any, Optional[float], float]]) -> Any:
+        """Run compute once per key at a time; concurrent callers wait for and share its result"""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = concurrent.futures.Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value, fresh_for, keep_for = compute()
+            if fresh_for is not None:
+                now = time.monotonic()
+                with self._lock:
+                    self._entries[key] = (value, now + fresh_for, now + keep_for)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def refreshing(self, key: str) -> bool:
+        with self._lock:
+            return key in self._inflight
+
 # Decorator for caching function results
 def cache_result(
     key_template: str,
     ttl: Optional[int] = None,
     namespace: str = "functions",
-    serialize_args: bool = True
+    serialize_args: bool = True,
+    stale_ttl: int = 0,
+    negative_ttl: int = 0,
+    maxsize: int = 1024
 ):
     """
     Decorator to cache function results
 
+    Concurrent calls that miss the same key share one call of the function
+    (single-flight). Once a result is older than ttl it is still served for
+    another stale_ttl seconds while one background call refreshes it. A None
+    result is cached for negative_ttl seconds (not at all by default).
+
+    Coroutine functions are cached in Redis through cache_manager; without
+    an initialized cache only the single-flight applies. Plain functions
+    are cached in process, in a TTL cache of at most maxsize keys, and must
+    not be called from the event loop if they block.
+
     Args:
-        key_template: Template for cache key, can use function arguments
+        key_template: Template for cache key, formatted with the function arguments
+            when serialize_args is False (e.g. "style_preview:{style_id}")
         ttl: Time to live in seconds
         namespace: Cache namespace
         serialize_args: Whether to include arguments in cache key
+        stale_ttl: Seconds a result past its ttl is still served while it is refreshed
+        negative_ttl: Seconds a None result is cached
+        maxsize: Entries kept in process for plain functions
     """
     def decorator(func):
-        async def async_wrapper(*args, **kwargs):
-            if not cache_manager._redis:
-                return await func(*args, **kwargs)
-
-            # Generate cache key
-            if serialize_args:
-                import inspect
-                sig = inspect.signature(func)
-                bound_args = sig.bind(*args, **kwargs)
-                bound_args.apply_defaults()
-
-                args_str = "_".join(str(v) for v in bound_args.arguments.values())
-                cache_key = f"{func.__name__}:{hashlib.md5(args_str.encode()).hexdigest()[:8]}"
-            else:
-                cache_key = key_template
+        signature = inspect.signature(func)
+        fresh_ttl = ttl or cache_manager._default_ttl
+
+        def make_key(args, kwargs) -> str:
+            bound_args = signature.bind(*args, **kwargs)
+            bound_args.apply_defaults()
+            if not serialize_args:
+                return key_template.format(**bound_args.arguments)
+            args_str = "_".join(str(v) for v in bound_args.arguments.values())
+            return f"{func.__name__}:{hashlib.md5(args_str.encode()).hexdigest()[:8]}"
+
+        def lifetimes(result: Any) -> Tuple[Optional[int], int]:
+            """(seconds fresh, seconds kept) for a result; (None, 0) if it is not cached"""
+            fresh_for = fresh_ttl if result is not None else negative_ttl
+            if not fresh_for:
+                return None, 0
+            return fresh_for, fresh_for + stale_ttl
 
-            # Try to get from cache
-            cached_result = await cache_manager.get(cache_key, namespace)
-            if cached_result is not None:
-                log.debug(f"🎯 Cache hit for {func.__name__}")
-                return cached_result
+        if asyncio.iscoroutinefunction(func):
+            inflight: Dict[str, asyncio.Task] = {}
+            refreshes = set()  # strong references to running background refreshes
 
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            await cache_manager.set(cache_key, result, ttl, namespace)
-            log.debug(f"💾 Cached result for {func.__name__}")
+            async def compute(cache_key: str, args, kwargs) -> Any:
+                result = await func(*args, **kwargs)
+                fresh_for, keep_for = lifetimes(result)
+                if fresh_for is not None and cache_manager._redis:
+                    try:
+                        await cache_manager.set(cache_key, {"value": result, "fresh_until": time.time() + fresh_for},
+                                                keep_for, namespace)
+                        log.debug(f"💾 Cached result for {func.__name__}")
+                    except CacheError as e:
+                        log.warning(f"⚠️ Could not cache result of {func.__name__}: {e}")
+                return result
+
+            def single_flight(cache_key: str, args, kwargs) -> asyncio.Task:
+                task = inflight.get(cache_key)
+                if task is None:
+                    task = asyncio.ensure_future(compute(cache_key, args, kwargs))
+                    inflight[cache_key] = task
+                    task.add_done_callback(lambda _: inflight.pop(cache_key, None))
+                return task
+
+            async def background_refresh(cache_key: str, args, kwargs):
+                try:
+                    await single_flight(cache_key, args, kwargs)
+                except Exception as e:
+                    log.warning(f"⚠️ Background refresh of {func.__name__} failed, serving stale result: {e}")
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key = make_key(args, kwargs)
+
+                if cache_manager._redis:
+                    try:
+                        cached = await cache_manager.get(cache_key, namespace)
+                    except CacheError as e:
+                        log.warning(f"⚠️ Cache read failed for {func.__name__}: {e}")
+                        cached = None
+                    if isinstance(cached, dict) and "fresh_until" in cached:
+                        if time.time() >= cached["fresh_until"] and cache_key not in inflight:
+                            task = asyncio.ensure_future(background_refresh(cache_key, args, kwargs))
+                            refreshes.add(task)
+                            task.add_done_callback(refreshes.discard)
+                        log.debug(f"🎯 Cache hit for {func.__name__}")
+                        return cached["value"]
+
+                # shield: one caller being cancelled must not cancel the call the others wait on
+                return await asyncio.shield(single_flight(cache_key, args, kwargs))
+
+            async def refresh(*args, **kwargs):
+                """Recompute and re-cache now, ignoring any cached result"""
+                return await asyncio.shield(single_flight(make_key(args, kwargs), args, kwargs))
+
+            async_wrapper.refresh = refresh
+            return async_wrapper
 
-            return result
+        memo = _SyncMemo(maxsize)
 
-        def sync_wrapper(*args, **kwargs):
-            if not cache_manager._redis:
-                return func(*args, **kwargs)
+        def compute_sync(args, kwargs):
+            def compute():
+                result = func(*args, **kwargs)
+                fresh_for, keep_for = lifetimes(result)
+                return result, fresh_for, keep_for
+            return compute
 
-            # For synchronous functions, run async wrapper in event loop
-            import asyncio
+        def background_refresh_sync(cache_key: str, args, kwargs):
             try:
-                loop = asyncio.get_event_loop()
-                return loop.run_until_complete(async_wrapper(*args, **kwargs))
-            except RuntimeError:
-                # No event loop running, create one
-                return asyncio.run(async_wrapper(*args, **kwargs))
-
-        if asyncio.iscoroutinefunction(func):
-            return async_wrapper
-        else:
-            return sync_wrapper
+                memo.call(cache_key, compute_sync(args, kwargs))
+            except Exception as e:
+                log.warning(f"⚠️ Background refresh of {func.__name__} failed, serving stale result: {e}")
 
-    return decorator
\ No newline at end of file
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            cache_key = make_key(args, kwargs)
+            cached = memo.lookup(cache_key)
+            if cached is not None:
+                value, fresh = cached
+                if not fresh and not memo.refreshing(cache_key):
+                    threading.Thread(target=background_refresh_sync, args=(cache_key, args, kwargs),
+                                     name=f"cache-refresh-{func.__name__}", daemon=True).start()
+                return value
+            return memo.call(cache_key, compute_sync(args, kwargs))
+
+        def refresh_sync(*args, **kwargs):
+            """Recompute and re-cache now, ignoring any cached result"""
+            return memo.call(make_key(args, kwargs), compute_sync(args, kwargs))
+
+        sync_wrapper.refresh = refresh_sync
+        return sync_wrapper
+
+    return decorator
@@ -0,0 +1,105 @@
+"""
+Value encodings for core.cache.
+
+Every value CacheManager stores starts with a 3-byte header (magic, codec
+id, compression id), so any process can decode entries written under any
+configuration and a namespace can switch codecs without being flushed;
+entries are re-encoded as they are rewritten, or in one pass with
+CacheManager.recode_namespace(). Values without the header are plain
+pickles from before the header existed.
+
+Codecs: "pickle" (any Python object), "msgpack" (compact binary, needs the
+msgpack package) and "json" (uses orjson when installed). msgpack and json
+only take JSON-shaped values: dicts, lists, strings, numbers, bools, None.
+Compressors: "none", "zlib" and "lz4" (needs the lz4 package). A payload is
+compressed only from min_bytes up, and only when that makes it smaller.
+"""
+import json
+import pickle
+import zlib
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+MAGIC = 0xC5
+HEADER_SIZE = 3
+
+class Codec(NamedTuple):
+    id: int
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+def _json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def _json_loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+CODECS: Dict[str, Codec] = {
+    "pickle": Codec(1, "pickle", lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+    "json": Codec(2, "json", _json_dumps, _json_loads),
+}
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        3, "msgpack",
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+    )
+
+COMPRESSORS: Dict[str, Codec] = {
+    "none": Codec(0, "none", bytes, bytes),
+    # Level 1: most of the size win for a fraction of the CPU of the default level
+    "zlib": Codec(1, "zlib", lambda data: zlib.compress(data, 1), zlib.decompress),
+}
+if lz4_frame is not None:
+    COMPRESSORS["lz4"] = Codec(2, "lz4", lz4_frame.compress, lz4_frame.decompress)
+
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+def resolve(codec: str, compression: str) -> Tuple[Codec, Codec]:
+    """Look up a codec and compressor by name; raises ValueError for unknown or unavailable ones"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown or unavailable cache codec '{codec}' (available: {', '.join(CODECS)})")
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Unknown or unavailable cache compression '{compression}' (available: {', '.join(COMPRESSORS)})")
+    return CODECS[codec], COMPRESSORS[compression]
+
+def encode(value: Any, codec: Codec, compressor: Codec, min_bytes: int) -> bytes:
+    payload = codec.dumps(value)
+    if compressor.id and len(payload) >= min_bytes:
+        compressed = compressor.dumps(payload)
+        if len(compressed) < len(payload):
+            return bytes((MAGIC, codec.id, compressor.id)) + compressed
+    return bytes((MAGIC, codec.id, 0)) + payload
+
+def header(data: bytes) -> Optional[Tuple[str, str]]:
+    """(codec, compression) names a value was stored with, or None for a headerless pickle"""
+    if len(data) < HEADER_SIZE or data[0] != MAGIC:
+        return None
+    codec, compressor = _CODECS_BY_ID.get(data[1]), _COMPRESSORS_BY_ID.get(data[2])
+    return (codec.name if codec else f"#{data[1]}"), (compressor.name if compressor else f"#{data[2]}")
+
+def decode(data: bytes) -> Any:
+    if len(data) < HEADER_SIZE or data[0] != MAGIC:
+        return pickle.loads(data)
+    codec, compressor = _CODECS_BY_ID.get(data[1]), _COMPRESSORS_BY_ID.get(data[2])
+    if codec is None or compressor is None:
+        raise ValueError(f"Value encoded with an unavailable codec/compression ({data[1]}, {data[2]})")
+    return codec.loads(compressor.loads(data[HEADER_SIZE:]))
@@ -0,0 +1,72 @@
+"""
+Cross-process job cancellation over Redis.
+
+The API and the workers run in separate containers, so cancelling a job
+means telling whichever worker owns it. A cancel request sets a short-lived
+marker key (checked before a queued job starts) and is broadcast on a
+pub/sub channel (for jobs already running).
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+import redis.asyncio as redis
+
+from core.config import settings
+
+log = logging.getLogger(__name__)
+
+class JobCancellation:
+    """Publishes and receives job cancellation requests"""
+
+    def __init__(self):
+        self.client = None
+        self.channel = "genscene:jobs:cancel"
+        self.marker_prefix = "genscene:jobs:cancelled:"
+        self.marker_ttl = settings.REDIS_JOB_TTL
+
+    async def connect(self):
+        if not self.client:
+            self.client = redis.from_url(settings.redis_url, decode_responses=True)
+
+    async def request(self, job_id: str) -> int:
+        """Mark a job cancelled and notify workers; returns how many workers received it"""
+        await self.connect()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(f"{self.marker_prefix}{job_id}", 1, ex=self.marker_ttl)
+        pipe.publish(self.channel, job_id)
+        _, receivers = await pipe.execute()
+        log.info(f"🚫 Cancellation requested for job {job_id} ({receivers} workers notified)")
+        return receivers
+
+    async def is_cancelled(self, job_id: str) -> bool:
+        """Whether cancellation was requested for a job (e.g. while it was still queued)"""
+        await self.connect()
+        return bool(await self.client.exists(f"{self.marker_prefix}{job_id}"))
+
+    async def listen(self, on_cancel: Callable[[str], Awaitable[None]],
+                     stop_event: Optional[asyncio.Event] = None):
+        """Call on_cancel(job_id) for every cancellation broadcast, reconnecting on errors"""
+        await self.connect()
+        while not (stop_event and stop_event.is_set()):
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                while not (stop_event and stop_event.is_set()):
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message.get("type") == "message":
+                        await on_cancel(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"⚠️ Cancellation listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    async def close(self):
+        if self.client:
+            await self.client.close()
+
+# Global instance
+job_cancellation = JobCancellation()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 import os
 from enum import Enum
 
@@ -29,9 +29,19 @@ class Settings(BaseSettings):
     # Media and Storage
     MEDIA_DIR: str = Field(default="./media", env="MEDIA_DIR")
     PUBLIC_BASE_URL: str = Field(default="http://localhost:8000", env="PUBLIC_BASE_URL")
+    # Send the locally cropped 9:16 concept image (PUBLIC_BASE_URL/files/...) to image-to-video instead of
+    # the KIE image URL; PUBLIC_BASE_URL must then be reachable from KIE
+    VIDEO_INPUT_CROPPED_IMAGE: bool = Field(default=False, env="VIDEO_INPUT_CROPPED_IMAGE")
 
     # Database Configuration - PostgreSQL for Production
     DATABASE_URL: str = Field(default="sqlite:///./whatif.db", env="DATABASE_URL")
+    STORAGE_BACKEND: str = Field(default="sqlite", env="STORAGE_BACKEND")  # sqlite (DATABASE_URL) or postgres (POSTGRES_*)
+    DB_POOL_SIZE: int = Field(default=8, env="DB_POOL_SIZE")  # pooled SQLite connections per process
+    DB_POOL_TIMEOUT: float = Field(default=30.0, env="DB_POOL_TIMEOUT")  # seconds to wait for a free connection
+    DB_ASYNC_POOL_SIZE: int = Field(default=4, env="DB_ASYNC_POOL_SIZE")  # SQLite threads for async handlers
+    DB_READ_POOL_SIZE: int = Field(default=8, env="DB_READ_POOL_SIZE")  # read-only SQLite connections (and threads) for reads
+    DB_GROUP_COMMIT_DELAY_MS: float = Field(default=2.0, env="DB_GROUP_COMMIT_DELAY_MS")  # how long a write waits to share a transaction
+    DB_GROUP_COMMIT_MAX_BATCH: int = Field(default=256, env="DB_GROUP_COMMIT_MAX_BATCH")  # writes per transaction
     POSTGRES_HOST: str = Field(default="localhost", env="POSTGRES_HOST")
     POSTGRES_PORT: int = Field(default=5432, env="POSTGRES_PORT")
     POSTGRES_DB: str = Field(default="genscene", env="POSTGRES_DB")
@@ -50,6 +60,15 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: Optional[str] = Field(default=None, env="REDIS_PASSWORD")
     REDIS_CACHE_TTL: int = Field(default=3600, env="REDIS_CACHE_TTL")  # 1 hour
     REDIS_JOB_TTL: int = Field(default=86400, env="REDIS_JOB_TTL")  # 24 hours
+    CACHE_L1_ENABLED: bool = Field(default=False, env="CACHE_L1_ENABLED")  # in-process tier in front of Redis
+    CACHE_L1_MAX_ENTRIES: int = Field(default=10000, env="CACHE_L1_MAX_ENTRIES")
+    CACHE_L1_MAX_BYTES: int = Field(default=64 * 1024 * 1024, env="CACHE_L1_MAX_BYTES")
+    CACHE_L1_TTL: float = Field(default=10.0, env="CACHE_L1_TTL")  # seconds, capped by the key's Redis TTL
+    CACHE_CODEC: str = Field(default="pickle", env="CACHE_CODEC")  # pickle | msgpack | json
+    CACHE_COMPRESSION: str = Field(default="zlib", env="CACHE_COMPRESSION")  # none | zlib | lz4
+    CACHE_COMPRESSION_MIN_BYTES: int = Field(default=1024, env="CACHE_COMPRESSION_MIN_BYTES")
+    CACHE_NAMESPACE_CODECS: str = Field(default="", env="CACHE_NAMESPACE_CODECS")  # "namespace=codec[/compression],..."
+    CACHE_SCAN_BATCH_SIZE: int = Field(default=500, env="CACHE_SCAN_BATCH_SIZE")  # keys per SCAN step in sweeps
 
     # Worker Configuration
     WORKER_CONCURRENCY: int = Field(default=4, env="WORKER_CONCURRENCY")
@@ -57,6 +76,30 @@ class Settings(BaseSettings):
     WORKER_MAX_RETRIES: int = Field(default=3, env="WORKER_MAX_RETRIES")
     WORKER_RETRY_DELAY: int = Field(default=10, env="WORKER_RETRY_DELAY")
     WORKER_TIMEOUT: int = Field(default=300, env="WORKER_TIMEOUT")  # 5 minutes
+    QUEUE_RETRY_MAX_DELAY: int = Field(default=600, env="QUEUE_RETRY_MAX_DELAY")  # backoff cap, seconds
+    QUEUE_DLQ_MAXLEN: int = Field(default=10000, env="QUEUE_DLQ_MAXLEN")
+    JOB_PROGRESS_FLUSH_SECONDS: int = Field(default=10, env="JOB_PROGRESS_FLUSH_SECONDS")  # max SQLite lag for progress
+    JOB_STATUS_LOCAL_CACHE_SIZE: int = Field(default=1024, env="JOB_STATUS_LOCAL_CACHE_SIZE")
+    JOB_STATUS_LOCAL_CACHE_TTL: float = Field(default=1.0, env="JOB_STATUS_LOCAL_CACHE_TTL")  # seconds
+
+    # Job Queue Backend ("list" = BLPOP, "streams" = consumer groups with acks)
+    QUEUE_BACKEND: str = Field(default="list", env="QUEUE_BACKEND")
+    QUEUE_STREAM_GROUP: str = Field(default="genscene-workers", env="QUEUE_STREAM_GROUP")
+    QUEUE_STREAM_MAXLEN: int = Field(default=100000, env="QUEUE_STREAM_MAXLEN")
+    QUEUE_CLAIM_IDLE_MS: int = Field(default=120000, env="QUEUE_CLAIM_IDLE_MS")  # 2 minutes
+
+    # Concurrent execution inside one worker process (jobs are mostly network-bound)
+    WORKER_MAX_CONCURRENT_JOBS: int = Field(default=32, env="WORKER_MAX_CONCURRENT_JOBS")
+    WORKER_JOB_TYPE_LIMITS: str = Field(
+        default="quick_create_full_universe=32,compose=4,tts=16",
+        env="WORKER_JOB_TYPE_LIMITS"
+    )  # "job_type=limit,..."; unlisted types are bounded only by the global limit
+
+    # Weighted fair dequeue across lanes (lane weight = job type weight x priority weight)
+    QUEUE_JOB_TYPE_WEIGHTS: str = Field(
+        default="tts=4,compose=2,quick_create_full_universe=1",
+        env="QUEUE_JOB_TYPE_WEIGHTS"
+    )  # unlisted types get weight 1
 
     # Rate Limiting
     RATE_LIMIT_DB_PATH: str = Field(default="./rate_limits.db", env="RATE_LIMIT_DB_PATH")
@@ -103,7 +146,11 @@ class Settings(BaseSettings):
     # Features and Options
     SAFE_COMPOSE: bool = Field(default=True, env="SAFE_COMPOSE")
     THUMBNAIL_ENABLE: bool = Field(default=True, env="THUMBNAIL_ENABLE")
-    RETENTION_DAYS: int = Field(default=14, env="RETENTION_DAYS")
+    RETENTION_DAYS: int = Field(default=14, env="RETENTION_DAYS")  # finished jobs older than this are archived; 0 disables
+    ARCHIVE_BATCH_SIZE: int = Field(default=500, env="ARCHIVE_BATCH_SIZE")  # jobs moved per transaction
+    ARCHIVE_INTERVAL_SECONDS: int = Field(default=3600, env="ARCHIVE_INTERVAL_SECONDS")
+    MIGRATION_BATCH_SIZE: int = Field(default=1000, env="MIGRATION_BATCH_SIZE")  # rows per online-migration chunk
+    MIGRATION_THROTTLE_MS: float = Field(default=50.0, env="MIGRATION_THROTTLE_MS")  # pause between chunks
 
     # Webhook notifications
     NOTIFY_URL: str = Field(default="", env="NOTIFY_URL")
@@ -160,6 +207,16 @@ class Settings(BaseSettings):
             )
         return self.DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://")
 
+    @property
+    def postgres_dsn(self) -> str:
+        """PostgreSQL DSN for asyncpg: DATABASE_URL if it is one, else the POSTGRES_* settings"""
+        if self.DATABASE_URL.startswith(("postgresql://", "postgres://")):
+            return self.DATABASE_URL
+        return (
+            f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
+        )
+
     @property
     def redis_url(self) -> str:
         """Get Redis URL with password if provided"""
@@ -170,6 +227,36 @@ class Settings(BaseSettings):
             return f"redis://:{self.REDIS_PASSWORD}@{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
         return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    @staticmethod
+    def _parse_int_map(value: str) -> Dict[str, int]:
+        """Parse "key=int,key=int" settings into a dict, skipping malformed items"""
+        result = {}
+        for item in value.split(","):
+            key, _, number = item.partition("=")
+            if key.strip() and number.strip().isdigit():
+                result[key.strip()] = int(number)
+        return result
+
+    @property
+    def worker_job_type_limits(self) -> Dict[str, int]:
+        """Get per-job-type concurrency limits as a dict"""
+        return self._parse_int_map(self.WORKER_JOB_TYPE_LIMITS)
+
+    @property
+    def queue_job_type_weights(self) -> Dict[str, int]:
+        """Get per-job-type dequeue weights as a dict"""
+        return self._parse_int_map(self.QUEUE_JOB_TYPE_WEIGHTS)
+
+    @property
+    def cache_namespace_codecs(self) -> Dict[str, str]:
+        """Get per-namespace cache codecs ("codec" or "codec/compression") as a dict"""
+        result = {}
+        for item in self.CACHE_NAMESPACE_CODECS.split(","):
+            namespace, _, spec = item.partition("=")
+            if namespace.strip() and spec.strip():
+                result[namespace.strip()] = spec.strip()
+        return result
+
     @property
     def cors_origins_list(self) -> List[str]:
         """Get CORS origins as a list"""
@@ -1,10 +1,215 @@
+"""
+SQLite connection provider shared by the API, the worker, models.dao and
+the repositories.
+
+get_conn() checks a connection out of a bounded per-database pool. The
+connections are opened once with the production PRAGMAs (WAL, relaxed
+fsync, big page cache, mmap, busy timeout) and conn.close() hands them back
+instead of closing them, so existing call sites need no changes. The pool
+records checkouts and how long callers waited for a free connection. A
+checked-out connection that is dropped without close() (an exception path,
+a forgotten close) gives its slot back when it is garbage collected, and is
+counted under "reclaimed".
+
+get_read_conn() checks out of a separate read-only pool (query_only, bigger
+page cache) per database. WAL readers never wait for the writer, so as long
+as reads do not compete with writes for pool slots they never queue behind
+the worker's writes.
+"""
 import sqlite3
+import threading
+import time
+import weakref
+from collections import deque
 from pathlib import Path
+from typing import Any, Deque, Dict, Optional, Tuple, Union
+
 from core.config import settings
 
 DB_PATH = Path(settings.DATABASE_URL.replace("sqlite:///", ""))
 
+# Applied to every pooled connection. journal_mode is persistent in the file;
+# the rest are per connection
+CONNECTION_PRAGMAS = {
+    "journal_mode": "WAL",          # readers do not block the writer
+    "synchronous": "NORMAL",        # fsync at checkpoints only, safe with WAL
+    "cache_size": -64000,           # 64MB page cache
+    "mmap_size": 268435456,         # 256MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 30000,          # wait for the write lock instead of failing
+    "wal_autocheckpoint": 1000,
+}
+
+# Read-only pool connections: a bigger page cache for the listing and stats
+# queries, and query_only so a stray write fails instead of taking the lock
+READ_CONNECTION_PRAGMAS = {
+    **CONNECTION_PRAGMAS,
+    "cache_size": -128000,          # 128MB
+    "query_only": "ON",
+}
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, Any] = CONNECTION_PRAGMAS):
+    for pragma, value in pragmas.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to its pool"""
+
+    _pool: Optional["SQLitePool"] = None
+    _checked_out = False
+    _finalizer: Optional[weakref.finalize] = None
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+        elif self._checked_out:
+            self._pool.release(self)
+
+class SQLitePool:
+    """Bounded pool of tuned connections to one database file"""
+
+    def __init__(self, path: Union[str, Path], size: Optional[int] = None, timeout: Optional[float] = None,
+                 readonly: bool = False):
+        self.path = Path(path)
+        self.readonly = readonly
+        self.size = size or (settings.DB_READ_POOL_SIZE if readonly else settings.DB_POOL_SIZE)
+        self.timeout = timeout if timeout is not None else settings.DB_POOL_TIMEOUT
+        self._idle: Deque[PooledConnection] = deque()
+        self._opened = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,          # checkouts that found the pool exhausted
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "timeouts": 0,
+            "reclaimed": 0,      # checked-out connections collected without close()
+        }
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, READ_CONNECTION_PRAGMAS if self.readonly else CONNECTION_PRAGMAS)
+        conn._pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Check out a connection, waiting up to `timeout` seconds for a free one"""
+        start = time.perf_counter()
+        with self._cond:
+            waited = False
+            while not self._idle and self._opened >= self.size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise sqlite3.OperationalError(
+                        f"connection pool exhausted ({self.size} connections in use for {self.timeout}s)"
+                    )
+                self._cond.wait(remaining)
+
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                # Reserve the slot before opening outside the lock
+                self._opened += 1
+
+            wait = time.perf_counter() - start
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += wait
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._cond.notify()
+                raise
+        conn._checked_out = True
+        # Must not reference conn: it runs once conn is unreachable
+        conn._finalizer = weakref.finalize(conn, self._reclaim)
+        return conn
+
+    def _reclaim(self):
+        """Free the slot of a checked-out connection that was collected without close()"""
+        with self._cond:
+            self._opened -= 1
+            self._stats["reclaimed"] += 1
+            self._cond.notify()
+
+    def release(self, conn: PooledConnection):
+        """Return a connection, discarding any uncommitted work"""
+        conn._checked_out = False
+        if conn._finalizer is not None:
+            conn._finalizer.detach()
+            conn._finalizer = None
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            # Broken connection: drop it and free its slot
+            sqlite3.Connection.close(conn)
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self.size, open=self._opened, idle=len(self._idle),
+                         in_use=self._opened - len(self._idle))
+        checkouts = stats["checkouts"] or 1
+        stats["avg_wait_ms"] = round(stats["wait_seconds"] / checkouts * 1000, 3)
+        stats["max_wait_ms"] = round(stats.pop("max_wait_seconds") * 1000, 3)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 6)
+        return stats
+
+    def close_all(self):
+        """Close the idle connections (at shutdown)"""
+        with self._cond:
+            while self._idle:
+                conn = self._idle.pop()
+                conn._pool = None
+                sqlite3.Connection.close(conn)
+                self._opened -= 1
+
+_pools: Dict[Tuple[Path, bool], SQLitePool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path: Union[str, Path, None] = None, readonly: bool = False) -> SQLitePool:
+    """The shared pool for a database file (DATABASE_URL by default)"""
+    key = (Path(path) if path is not None else DB_PATH, readonly)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = SQLitePool(key[0], readonly=readonly)
+        return pool
+
+def get_read_pool(path: Union[str, Path, None] = None) -> SQLitePool:
+    """The shared read-only pool for a database file"""
+    return get_pool(path, readonly=True)
+
 def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
\ No newline at end of file
+    return get_pool().acquire()
+
+def get_read_conn() -> sqlite3.Connection:
+    return get_read_pool().acquire()
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {f"{pool.path} (read)" if pool.readonly else str(pool.path): pool.stats() for pool in pools}
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
@@ -0,0 +1,110 @@
+"""
+Non-blocking access to the SQLite database from async code.
+
+sqlite3 calls block, so running them on the event loop stalls every other
+in-flight request while a query waits on the database lock. AsyncDB runs
+them on a small dedicated thread pool instead, with connections checked
+out of the core.db pool per call, so the DAO functions in models.dao can
+be reused unchanged:
+
+    await async_db.run(upsert_job, job_id, "queued", 0)
+
+async_read_db serves the read paths from the read-only pool on threads of
+its own, each call inside one read transaction so multi-statement reads see
+a single WAL snapshot. Both record call latency (pool wait included) for
+/health.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+from core.config import settings
+from core.db import get_conn, get_read_conn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class AsyncDB:
+    """Runs DAO calls on a dedicated thread pool"""
+
+    def __init__(self, pool_size: Optional[int] = None,
+                 connect: Optional[Callable[[], sqlite3.Connection]] = None, readonly: bool = False):
+        self.readonly = readonly
+        self.pool_size = pool_size or (settings.DB_READ_POOL_SIZE if readonly else settings.DB_ASYNC_POOL_SIZE)
+        # Defaults to core.db.get_conn / get_read_conn (the DATABASE_URL pools)
+        self.connect = connect or (get_read_conn if readonly else None)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            prefix = "sqlite-read" if self.readonly else "sqlite"
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix=prefix)
+        return self._executor
+
+    def _call(self, func: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        conn = self.connect() if self.connect else get_conn()
+        try:
+            if self.readonly:
+                # One snapshot for the whole call; released (rolled back) with the connection
+                conn.execute("BEGIN")
+            return func(conn, *args, **kwargs)
+        except Exception:
+            # Never leave a half-finished transaction on a reused connection
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run func(conn, *args, **kwargs) on a pool thread"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._get_executor(), partial(self._call, func, args, kwargs))
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stats["calls"] += 1
+            self._stats["seconds"] += elapsed
+            self._stats["max_seconds"] = max(self._stats["max_seconds"], elapsed)
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run a write statement and commit; returns the number of affected rows"""
+        def _execute(conn: sqlite3.Connection) -> int:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+        return await self.run(_execute)
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self._stats["calls"]
+        return {
+            "calls": calls,
+            "errors": self._stats["errors"],
+            "avg_ms": round(self._stats["seconds"] / calls * 1000, 3) if calls else 0.0,
+            "max_ms": round(self._stats["max_seconds"] * 1000, 3),
+        }
+
+    def close(self):
+        """Stop the pool threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Global instances
+async_db = AsyncDB()
+async_read_db = AsyncDB(readonly=True)
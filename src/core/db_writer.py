@@ -0,0 +1,168 @@
+"""
+Group commit for SQLite writes from async code.
+
+SQLite has a single writer, so concurrent jobs that each commit their own
+upsert_job / insert_or_update_render / set_cached_asset queue up on the
+write lock and pay a full transaction each. GroupCommitWriter collects the
+writes submitted by all coroutines and runs them on one writer thread, many
+per transaction:
+
+    rows = await writer.submit(update_job_state, job_id, "running", 10)
+
+A write waits at most DB_GROUP_COMMIT_DELAY_MS for company, then its batch
+(up to DB_GROUP_COMMIT_MAX_BATCH writes) runs inside BEGIN IMMEDIATE with a
+savepoint per write, so a failing write is rolled back alone and its
+exception raised to its caller. submit() returns once the batch has
+committed.
+
+Submitted functions get a connection whose commit() is deferred to the
+batch; they must not begin or roll back transactions themselves.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from core.config import settings
+from core.db import get_conn
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# (func, args, kwargs, future)
+Write = Tuple[Callable[..., Any], tuple, dict, asyncio.Future]
+
+class _BatchConnection:
+    """The batch's connection as seen by one write: commit() is done by the batch"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def commit(self):
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+class GroupCommitWriter:
+    """Batches writes from many coroutines into one transaction"""
+
+    def __init__(self, connect: Optional[Callable[[], sqlite3.Connection]] = None,
+                 max_batch: Optional[int] = None, max_delay: Optional[float] = None):
+        # Defaults to core.db.get_conn (the DATABASE_URL pool)
+        self.connect = connect
+        self.max_batch = max_batch or settings.DB_GROUP_COMMIT_MAX_BATCH
+        self.max_delay = max_delay if max_delay is not None else settings.DB_GROUP_COMMIT_DELAY_MS / 1000
+        self._pending: List[Write] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {"writes": 0, "batches": 0, "failed_batches": 0, "max_batch": 0}
+        # Submit-to-commit latency as seen by callers
+        self._latency = {"writes": 0, "seconds": 0.0, "max_seconds": 0.0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        return self._executor
+
+    async def submit(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run func(conn, *args, **kwargs) in the next batch; returns its result once committed"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((func, args, kwargs, future))
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+        elif len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        start = time.perf_counter()
+        try:
+            return await future
+        finally:
+            elapsed = time.perf_counter() - start
+            self._latency["writes"] += 1
+            self._latency["seconds"] += elapsed
+            self._latency["max_seconds"] = max(self._latency["max_seconds"], elapsed)
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            # Give other coroutines a moment to join the batch
+            if len(self._pending) < self.max_batch and self.max_delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            try:
+                outcomes = await loop.run_in_executor(
+                    self._get_executor(), self._commit, [(func, args, kwargs) for func, args, kwargs, _ in batch]
+                )
+            except asyncio.CancelledError:
+                for *_, future in batch + self._pending:
+                    future.cancel()
+                self._pending = []
+                raise
+            except Exception as e:
+                # Executor shut down
+                outcomes = [(None, e)] * len(batch)
+
+            for (_, _, _, future), (result, error) in zip(batch, outcomes):
+                if future.done():
+                    continue  # caller went away
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _commit(self, batch: List[Tuple[Callable[..., Any], tuple, dict]]) -> List[Tuple[Any, Optional[BaseException]]]:
+        """Run a batch in one transaction on the writer thread; (result, exception) per write"""
+        conn = self.connect() if self.connect else get_conn()
+        outcomes: List[Tuple[Any, Optional[BaseException]]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            batch_conn = _BatchConnection(conn)
+            for func, args, kwargs in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((func(batch_conn, *args, **kwargs), None))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    outcomes.append((None, e))
+                conn.execute("RELEASE write")
+            conn.commit()
+        except Exception as e:
+            log.error(f"❌ Group commit of {len(batch)} writes failed: {e}")
+            if conn.in_transaction:
+                conn.rollback()
+            self._stats["failed_batches"] += 1
+            return [(None, e)] * len(batch)
+        finally:
+            conn.close()
+
+        self._stats["writes"] += len(batch)
+        self._stats["batches"] += 1
+        self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+        return outcomes
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats, pending=len(self._pending))
+        stats["avg_batch"] = round(stats["writes"] / stats["batches"], 2) if stats["batches"] else 0.0
+        latency = self._latency
+        stats["avg_ms"] = round(latency["seconds"] / latency["writes"] * 1000, 3) if latency["writes"] else 0.0
+        stats["max_ms"] = round(latency["max_seconds"] * 1000, 3)
+        return stats
+
+    def close(self):
+        """Stop the writer thread once the queued batches are done"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+# Global instance
+db_writer = GroupCommitWriter()
@@ -0,0 +1,185 @@
+"""
+Live job state and progress in Redis with write-behind to the jobs table.
+
+Workers report progress many times per job. Every report goes to a Redis
+hash per job (cheap and always current), while the jobs table is written
+only on state transitions or once the last write is older than
+JOB_PROGRESS_FLUSH_SECONDS. This keeps the worker from competing with the
+API for the SQLite write lock. Status readers overlay the Redis hash on
+the SQLite row.
+
+The hash also carries the job's metadata (current_phase, video_model,
+output_url...), so the API container can show what a worker is doing. A
+small per-process LRU with a short TTL absorbs polling bursts.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+from core.config import settings
+from core.storage import storage
+
+log = logging.getLogger(__name__)
+
+# KEYS: status hash. ARGV: ttl, then field/value pairs
+# A progress tick landing after the job finished or was cancelled (e.g. by the API
+# while the worker was mid-phase) must not bring it back to 'running'
+WRITE_PROGRESS_SCRIPT = """
+local state = redis.call('HGET', KEYS[1], 'state')
+if state == 'done' or state == 'error' or state == 'cancelled' then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+class JobStatusStore:
+    """Fast channel for job progress, persisted to core.storage in coalesced writes"""
+
+    def __init__(self):
+        self.client = None
+        self.key_prefix = "genscene:jobs:status:"
+        self.ttl = settings.REDIS_JOB_TTL
+        self.flush_interval = settings.JOB_PROGRESS_FLUSH_SECONDS
+        # job_id -> (state, time) of the last SQLite write made by this process
+        self._persisted: Dict[str, Tuple[str, float]] = {}
+        # job_id -> (expires_at, status or None), least recently used first
+        self._local: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self.local_size = settings.JOB_STATUS_LOCAL_CACHE_SIZE
+        self.local_ttl = settings.JOB_STATUS_LOCAL_CACHE_TTL
+        self._progress_script = None
+
+    async def connect(self):
+        if not self.client:
+            self.client = redis.from_url(settings.redis_url, decode_responses=True)
+
+    def _key(self, job_id: str) -> str:
+        return f"{self.key_prefix}{job_id}"
+
+    async def _write_live(self, job_id: str, fields: Dict[str, Any],
+                          metadata: Optional[Dict[str, Any]] = None,
+                          unless_finished: bool = False) -> Optional[bool]:
+        """True if written, False if Redis is unavailable, None if skipped for a finished job"""
+        self._local.pop(job_id, None)
+        if metadata is not None:
+            fields["metadata"] = json.dumps(metadata, default=str)
+        try:
+            await self.connect()
+            if unless_finished:
+                if self._progress_script is None:
+                    self._progress_script = self.client.register_script(WRITE_PROGRESS_SCRIPT)
+                args = [self.ttl] + [item for field in fields.items() for item in field]
+                written = await self._progress_script(keys=[self._key(job_id)], args=args)
+                return True if written else None
+            pipe = self.client.pipeline(transaction=False)
+            pipe.hset(self._key(job_id), mapping=fields)
+            pipe.expire(self._key(job_id), self.ttl)
+            await pipe.execute()
+            return True
+        except Exception as e:
+            log.warning(f"⚠️ Failed to publish live status for {job_id}: {e}")
+            return False
+
+    async def update_progress(self, job_id: str, state: str, progress: int,
+                              job_type: str = 'unknown', payload: Optional[Dict[str, Any]] = None,
+                              metadata: Optional[Dict[str, Any]] = None):
+        """
+        Record a progress tick; SQLite is written only on a state change or after the flush interval.
+
+        Ticks for a job whose live state is already done, error or cancelled are dropped.
+        """
+        now = time.time()
+        live = await self._write_live(
+            job_id,
+            {"state": state, "progress": progress, "job_type": job_type, "updated_at": now},
+            metadata,
+            unless_finished=True
+        )
+        if live is None:
+            log.debug(f"Dropped progress tick for finished job {job_id}")
+            self._persisted.pop(job_id, None)
+            return
+
+        last = self._persisted.get(job_id)
+        # Without Redis the jobs table is the only channel, so write through
+        if not live or last is None or last[0] != state or now - last[1] >= self.flush_interval:
+            # Narrow writes: the payload was stored at enqueue time and does not change. Guarded in
+            # SQL too, since without Redis the script above cannot tell that the job has finished
+            if last is not None and last[0] == state:
+                written = await storage.update_job_progress(job_id, progress, unless_finished=True)
+            else:
+                written = await storage.update_job_state(job_id, state, progress, unless_finished=True)
+            if not written:
+                if await storage.get_job(job_id) is not None:
+                    log.debug(f"Dropped progress tick for finished job {job_id}")
+                    self._persisted.pop(job_id, None)
+                    return
+                # Job row missing (e.g. enqueued by an older API): create it
+                await storage.upsert_job(job_id, state, progress, job_type=job_type, payload=payload)
+            self._persisted[job_id] = (state, now)
+
+    async def set_state(self, job_id: str, state: str, progress: Optional[int] = None,
+                        metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Record a state transition (done, error, cancelled, queued...): always written through.
+
+        Returns the number of job rows updated, 0 if the job has no row yet.
+        """
+        fields = {"state": state, "updated_at": time.time()}
+        if progress is not None:
+            fields["progress"] = progress
+        await self._write_live(job_id, fields, metadata)
+
+        written = await storage.update_job_state(job_id, state, progress)
+        self._persisted.pop(job_id, None)
+        return written
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Live status of a job, or None if unknown or Redis is unavailable"""
+        now = time.monotonic()
+        cached = self._local.get(job_id)
+        if cached and cached[0] > now:
+            self._local.move_to_end(job_id)
+            return cached[1]
+
+        try:
+            await self.connect()
+            data = await self.client.hgetall(self._key(job_id))
+        except Exception as e:
+            log.warning(f"⚠️ Failed to read live status for {job_id}: {e}")
+            return None
+
+        status = self._decode(data) if data else None
+        # Misses are cached too: a burst of polls for an unknown job costs one lookup
+        self._local[job_id] = (now + self.local_ttl, status)
+        self._local.move_to_end(job_id)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+        return status
+
+    def _decode(self, data: Dict[str, str]) -> Dict[str, Any]:
+        status: Dict[str, Any] = dict(data)
+        if "progress" in status:
+            status["progress"] = int(status["progress"])
+        if "updated_at" in status:
+            status["updated_at"] = float(status["updated_at"])
+        status["metadata"] = json.loads(status["metadata"]) if "metadata" in status else {}
+        return status
+
+    async def overlay(self, job_id: str, state: str, progress: int) -> Tuple[str, int]:
+        """Combine a jobs-table row with the live status, which is never older"""
+        live = await self.get(job_id)
+        if not live:
+            return state, progress
+        return live.get("state", state), live.get("progress", progress)
+
+    async def close(self):
+        if self.client:
+            await self.client.close()
+
+# Global instance
+job_status_store = JobStatusStore()
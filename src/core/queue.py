@@ -1,17 +1,67 @@
 
+import asyncio
 import json
 import logging
+import os
+import socket
+import time
 import redis.asyncio as redis
-from typing import Dict, Any, Optional
+from enum import Enum
+from typing import AbstractSet, Awaitable, Callable, Dict, Any, List, Optional, Tuple
 from core.config import settings
 
 log = logging.getLogger(__name__)
 
+class JobPriority(int, Enum):
+    LOW = 1
+    NORMAL = 2
+    HIGH = 3
+    CRITICAL = 4
+
+# Each priority step doubles a lane's share of dequeues
+PRIORITY_WEIGHTS = {
+    JobPriority.LOW: 1,
+    JobPriority.NORMAL: 2,
+    JobPriority.HIGH: 4,
+    JobPriority.CRITICAL: 8,
+}
+
+# Seconds between refreshes of the lane registry from Redis
+LANE_REFRESH_INTERVAL = 5
+
+class WeightedFairScheduler:
+    """
+    Smooth weighted round-robin over queue lanes.
+
+    Every non-empty lane with weight w is picked w times in each window of
+    sum(weights) picks, so a lane's wait is bounded by the number of lanes
+    and their weights, not by how deep the other lanes are.
+    """
+
+    def __init__(self):
+        self._credit: Dict[str, int] = {}
+
+    def pick(self, weights: Dict[str, int]) -> Optional[str]:
+        """Pick the next lane among the eligible (non-empty) lanes"""
+        if not weights:
+            return None
+        total = sum(weights.values())
+        for lane, weight in weights.items():
+            self._credit[lane] = self._credit.get(lane, 0) + weight
+        lane = max(weights, key=lambda name: (self._credit[name], weights[name]))
+        self._credit[lane] -= total
+        return lane
+
 class RedisQueue:
     def __init__(self):
         self.client = None
         self.queue_key = "genscene:jobs"
-        
+        self.lanes_key = f"{self.queue_key}:lanes"
+        self.type_weights = settings.queue_job_type_weights
+        self._lanes: List[str] = []
+        self._lanes_refreshed_at = 0.0
+        self._scheduler = WeightedFairScheduler()
+
     async def connect(self):
         try:
             self.client = redis.from_url(settings.redis_url, decode_responses=True)
@@ -21,44 +71,432 @@ class RedisQueue:
             log.error(f"❌ Failed to connect to Redis: {e}")
             raise
 
-    async def enqueue(self, job_id: str, job_type: str, payload: Dict[str, Any]):
-        """Push a job to the queue"""
-        if not self.client:
-            await self.connect()
-            
-        message = {
+    def lane_key(self, job_type: str, priority: JobPriority) -> str:
+        """Redis key of the lane holding jobs of this type and priority"""
+        return f"{self.queue_key}:{job_type}:{int(priority)}"
+
+    def lane_weight(self, lane: str) -> int:
+        """Dequeue weight of a lane: job type weight x priority weight"""
+        if lane == self.queue_key:
+            # Pre-lanes list, kept so jobs enqueued before the upgrade still drain
+            return PRIORITY_WEIGHTS[JobPriority.NORMAL]
+        _, job_type, priority = lane.rsplit(":", 2)
+        return self.type_weights.get(job_type, 1) * PRIORITY_WEIGHTS[JobPriority(int(priority))]
+
+    def lane_type(self, lane: str) -> Optional[str]:
+        """Job type a lane holds (None for the pre-lanes list, which mixes types)"""
+        if lane == self.queue_key:
+            return None
+        return lane.rsplit(":", 2)[1]
+
+    def _open_lanes(self, lanes: List[str], skip_types: Optional[AbstractSet[str]]) -> List[str]:
+        """Lanes whose job type is not in skip_types"""
+        if not skip_types:
+            return lanes
+        return [lane for lane in lanes if self.lane_type(lane) not in skip_types]
+
+    async def _refresh_lanes(self, force: bool = False) -> List[str]:
+        """Reload the set of known lanes (cheap SMEMBERS, cached for a few seconds)"""
+        if force or time.monotonic() - self._lanes_refreshed_at > LANE_REFRESH_INTERVAL:
+            lanes = await self.client.smembers(self.lanes_key)
+            self._lanes = sorted(lanes) + [self.queue_key]
+            self._lanes_refreshed_at = time.monotonic()
+        return self._lanes
+
+    def _build_message(self, job_id: str, job_type: str, payload: Dict[str, Any], priority: JobPriority) -> Dict[str, Any]:
+        return {
             "job_id": job_id,
             "type": job_type,
+            "priority": int(priority),
             "payload": payload
         }
+
+    def _decode(self, message_json: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(message_json)
+        except json.JSONDecodeError:
+            log.error(f"❌ Failed to decode message from Redis: {message_json}")
+            return None
+
+    async def enqueue(self, job_id: str, job_type: str, payload: Dict[str, Any],
+                      priority: JobPriority = JobPriority.NORMAL):
+        """Push a job to the tail of its (job_type, priority) lane"""
+        if not self.client:
+            await self.connect()
+
+        message = self._build_message(job_id, job_type, payload, priority)
+        lane = self.lane_key(job_type, priority)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(self.lanes_key, lane)
         # RPUSH adds to the tail
-        await self.client.rpush(self.queue_key, json.dumps(message))
-        log.info(f"📥 Enqueued job {job_id} ({job_type})")
+        pipe.rpush(lane, json.dumps(message))
+        await pipe.execute()
+        log.info(f"📥 Enqueued job {job_id} ({job_type}, priority {int(priority)})")
+
+    async def enqueue_many(self, jobs: List[Tuple[str, str, Dict[str, Any]]],
+                           priority: JobPriority = JobPriority.NORMAL):
+        """Push many (job_id, job_type, payload) jobs in a single pipelined round trip"""
+        if not self.client:
+            await self.connect()
+
+        lanes = {self.lane_key(job_type, priority) for _, job_type, _ in jobs}
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(self.lanes_key, *lanes)
+        for job_id, job_type, payload in jobs:
+            message = self._build_message(job_id, job_type, payload, priority)
+            pipe.rpush(self.lane_key(job_type, priority), json.dumps(message))
+        await pipe.execute()
+        log.info(f"📥 Enqueued {len(jobs)} jobs in one batch (priority {int(priority)})")
+
+    async def _exhausted(self, message: Dict[str, Any]) -> bool:
+        """Dead-letter and ack a reclaimed entry that has used up its retries; True if it was"""
+        if self.on_exhausted is None:
+            return False
+        lane, message_id = message["lane"], message["message_id"]
+        pending = await self.client.xpending_range(
+            lane, self.group, min=message_id, max=message_id, count=1
+        )
+        # XAUTOCLAIM already counted this delivery; every one past the first is a crashed run
+        deliveries = int(pending[0]["times_delivered"]) if pending else 1
+        retries = int(message.get("retry", 0)) + deliveries - 1
+        if retries <= self.max_retries:
+            return False
+
+        message["retry"] = retries
+        error = f"Worker lost the job {deliveries} times"
+        await self.on_exhausted(message, error)
+        await self.ack(message)
+        log.error(f"☠️ Dropped reclaimed job {message.get('job_id')} ({lane} {message_id}): {error}")
+        return True
+
+    async def _lane_depths(self, lanes: List[str]) -> Dict[str, int]:
+        """Number of jobs waiting in each lane (single pipelined round trip)"""
+        pipe = self.client.pipeline(transaction=False)
+        for lane in lanes:
+            pipe.llen(lane)
+        return dict(zip(lanes, await pipe.execute()))
+
+    async def dequeue(self, timeout: int = 5,
+                      skip_types: Optional[AbstractSet[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Pop the next job by weighted fair choice across lanes, blocking when all are empty.
 
-    async def dequeue(self, timeout: int = 5) -> Optional[Dict[str, Any]]:
-        """Blocking pop from the queue"""
+        Lanes of the job types in skip_types (those the worker has no room
+        for) are left alone.
+        """
         if not self.client:
             await self.connect()
-            
+
         try:
+            lanes = self._open_lanes(await self._refresh_lanes(), skip_types)
+            depths = await self._lane_depths(lanes)
+            eligible = {lane: self.lane_weight(lane) for lane, depth in depths.items() if depth}
+
+            # Another worker may empty the chosen lane first; try the next pick
+            while eligible:
+                lane = self._scheduler.pick(eligible)
+                message_json = await self.client.lpop(lane)
+                if message_json:
+                    return self._decode(message_json)
+                eligible.pop(lane)
+
+            # Everything empty: block on all lanes, heaviest first
+            lanes = self._open_lanes(await self._refresh_lanes(force=True), skip_types)
+            if not lanes:
+                await asyncio.sleep(timeout)
+                return None
+            ordered = sorted(lanes, key=self.lane_weight, reverse=True)
             # BLPOP returns tuple (key, value) or None
-            result = await self.client.blpop(self.queue_key, timeout=timeout)
-            
+            result = await self.client.blpop(ordered, timeout=timeout)
+
             if result:
                 queue_name, message_json = result
-                try:
-                    return json.loads(message_json)
-                except json.JSONDecodeError:
-                    log.error(f"❌ Failed to decode message from Redis: {message_json}")
-                    return None
+                return self._decode(message_json)
             return None
         except Exception as e:
              # Redis timeout or connect error
              return None
 
+    async def get_lane_stats(self) -> Dict[str, Dict[str, int]]:
+        """Depth and weight of every lane"""
+        if not self.client:
+            await self.connect()
+        lanes = await self._refresh_lanes(force=True)
+        depths = await self._lane_depths(lanes)
+        return {lane: {"depth": depths[lane], "weight": self.lane_weight(lane)} for lane in lanes}
+
+    async def ack(self, message: Dict[str, Any]):
+        """Confirm a dequeued message was handled (no-op: the pop already removed it)"""
+        return None
+
+    async def touch(self, message: Dict[str, Any]):
+        """Signal that a dequeued message is still being worked on (no-op for lists)"""
+        return None
+
     async def close(self):
         if self.client:
             await self.client.close()
 
+class RedisStreamQueue(RedisQueue):
+    """
+    At-least-once queue on Redis Streams consumer groups, one stream per lane.
+
+    Messages stay in the group's pending list until ack() is called, so a
+    worker killed mid-job does not lose it: once the entry has been idle for
+    QUEUE_CLAIM_IDLE_MS another consumer reclaims it via XAUTOCLAIM.
+    Long-running handlers must call touch() periodically to keep ownership.
+
+    Every reclaim counts as a retry: an entry whose retries plus redeliveries
+    exceed WORKER_MAX_RETRIES (a job that keeps killing its worker) is passed
+    to on_exhausted and acked instead of being returned again.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queue_key = "genscene:jobs:stream"
+        self.lanes_key = f"{self.queue_key}:lanes"
+        self.group = settings.QUEUE_STREAM_GROUP
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.claim_idle_ms = settings.QUEUE_CLAIM_IDLE_MS
+        self.maxlen = settings.QUEUE_STREAM_MAXLEN
+        self.max_retries = settings.WORKER_MAX_RETRIES
+        # Called with (message, error) for reclaimed entries out of retries; set by the worker
+        self.on_exhausted: Optional[Callable[[Dict[str, Any], str], Awaitable[Any]]] = None
+        self._groups_ready: set = set()
+        self._claim_cursor = 0
+        self._next_claim_sweep = 0.0
+
+    async def _ensure_group(self, lane: str):
+        """Create the consumer group on a lane stream once per process"""
+        if lane in self._groups_ready:
+            return
+        try:
+            await self.client.xgroup_create(lane, self.group, id="0", mkstream=True)
+            log.info(f"✅ Created consumer group '{self.group}' on {lane}")
+        except redis.ResponseError as e:
+            # BUSYGROUP: group already exists, which is the normal case
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups_ready.add(lane)
+
+    async def enqueue(self, job_id: str, job_type: str, payload: Dict[str, Any],
+                      priority: JobPriority = JobPriority.NORMAL):
+        """Append a job to its lane stream"""
+        if not self.client:
+            await self.connect()
+
+        message = self._build_message(job_id, job_type, payload, priority)
+        lane = self.lane_key(job_type, priority)
+        await self._ensure_group(lane)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(self.lanes_key, lane)
+        pipe.xadd(lane, {"data": json.dumps(message)}, maxlen=self.maxlen, approximate=True)
+        await pipe.execute()
+        log.info(f"📥 Enqueued job {job_id} ({job_type}, priority {int(priority)}) to stream")
+
+    async def enqueue_many(self, jobs: List[Tuple[str, str, Dict[str, Any]]],
+                           priority: JobPriority = JobPriority.NORMAL):
+        """Append many (job_id, job_type, payload) jobs to their lane streams in one pipeline"""
+        if not self.client:
+            await self.connect()
+
+        lanes = {self.lane_key(job_type, priority) for _, job_type, _ in jobs}
+        for lane in lanes:
+            await self._ensure_group(lane)
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(self.lanes_key, *lanes)
+        for job_id, job_type, payload in jobs:
+            message = self._build_message(job_id, job_type, payload, priority)
+            pipe.xadd(self.lane_key(job_type, priority), {"data": json.dumps(message)},
+                      maxlen=self.maxlen, approximate=True)
+        await pipe.execute()
+        log.info(f"📥 Enqueued {len(jobs)} jobs in one batch (priority {int(priority)}) to stream")
+
+    def _decode_entry(self, lane: str, message_id: str, fields: Optional[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+        """Turn a stream entry into the dict shape returned by dequeue()"""
+        if not fields or "data" not in fields:
+            return None
+        message = self._decode(fields["data"])
+        if message is None:
+            return None
+        message["message_id"] = message_id
+        message["lane"] = lane
+        return message
+
+    async def _claim_stale(self, lanes: List[str]) -> Optional[Dict[str, Any]]:
+        """Take over one entry left pending by a dead consumer, sweeping lanes round-robin"""
+        if time.monotonic() < self._next_claim_sweep:
+            return None
+
+        while self._claim_cursor < len(lanes):
+            lane = lanes[self._claim_cursor]
+            _, entries, *_ = await self.client.xautoclaim(
+                lane,
+                self.group,
+                self.consumer,
+                min_idle_time=self.claim_idle_ms,
+                start_id="0-0",
+                count=1
+            )
+            if not entries:
+                self._claim_cursor += 1
+                continue
+            # count=1: a single entry; the lane is swept again since it may hold more
+            message_id, fields = entries[0]
+            message = self._decode_entry(lane, message_id, fields)
+            if message is None:
+                # Trimmed or undecodable entry: drop it from the pending list
+                await self.client.xack(lane, self.group, message_id)
+                continue
+            if await self._exhausted(message):
+                continue
+            log.warning(f"♻️ Reclaimed stale job {message.get('job_id')} ({lane} {message_id})")
+            return message
+
+        # Full sweep found nothing; pending entries cannot go stale faster than this
+        self._claim_cursor = 0
+        self._next_claim_sweep = time.monotonic() + self.claim_idle_ms / 4000
+        return None
+
+    async def _lane_positions(self, lanes: List[str]) -> Dict[str, Tuple[int, str]]:
+        """Undelivered entry count (XINFO GROUPS lag) and last delivered ID of each lane"""
+        pipe = self.client.pipeline(transaction=False)
+        for lane in lanes:
+            pipe.xinfo_groups(lane)
+        positions = {}
+        for lane, groups in zip(lanes, await pipe.execute(raise_on_error=False)):
+            # No group info: only entries added from now on can wake a wait
+            positions[lane] = (0, "$")
+            if isinstance(groups, Exception):
+                continue
+            for group in groups:
+                if group.get("name") == self.group:
+                    lag = group.get("lag")
+                    # lag is None when Redis cannot compute it; probe the lane anyway
+                    depth = 1 if lag is None else int(lag)
+                    positions[lane] = (depth, group.get("last-delivered-id") or "$")
+        return positions
+
+    async def _lane_depths(self, lanes: List[str]) -> Dict[str, int]:
+        """Entries not yet delivered to the group in each lane"""
+        return {lane: depth for lane, (depth, _) in (await self._lane_positions(lanes)).items()}
+
+    async def _read_lane(self, lane: str) -> Optional[Dict[str, Any]]:
+        """Non-blocking read of one new entry from a single lane"""
+        result = await self.client.xreadgroup(self.group, self.consumer, {lane: ">"}, count=1)
+        for _, entries in result or []:
+            for message_id, fields in entries:
+                message = self._decode_entry(lane, message_id, fields)
+                if message is None:
+                    await self.client.xack(lane, self.group, message_id)
+                return message
+        return None
+
+    async def _read_weighted(self, lanes: List[str]) -> Tuple[Optional[Dict[str, Any]], Dict[str, str]]:
+        """
+        Read one entry from a lane picked by weight among those with undelivered entries.
+
+        Also returns each lane's last delivered ID, from where a wait for new
+        entries has to start.
+        """
+        positions = await self._lane_positions(lanes)
+        eligible = {lane: self.lane_weight(lane) for lane, (depth, _) in positions.items() if depth}
+        while eligible:
+            lane = self._scheduler.pick(eligible)
+            message = await self._read_lane(lane)
+            if message:
+                return message, {}
+            eligible.pop(lane)
+        return None, {lane: last_id for lane, (_, last_id) in positions.items()}
+
+    async def dequeue(self, timeout: int = 5,
+                      skip_types: Optional[AbstractSet[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Reclaim a stale entry or read the next one by weighted fair choice; caller must ack().
+
+        Lanes of the job types in skip_types are neither read nor reclaimed
+        from. Every read takes a single entry from a single lane, so nothing
+        is delivered to this consumer beyond the message returned.
+        """
+        if not self.client:
+            await self.connect()
+
+        try:
+            all_lanes = await self._refresh_lanes()
+            for lane in all_lanes:
+                await self._ensure_group(lane)
+            lanes = self._open_lanes(all_lanes, skip_types)
+            if not lanes:
+                await asyncio.sleep(timeout)
+                return None
+
+            message = await self._claim_stale(lanes)
+            if message:
+                return message
+
+            message, last_ids = await self._read_weighted(lanes)
+            if message:
+                return message
+
+            # Everything empty: wait for an entry past the group's position on
+            # any lane. A plain XREAD delivers nothing, so a multi-lane wake-up
+            # cannot hand this consumer entries it will not run right away
+            woken = await self.client.xread(last_ids, count=1, block=timeout * 1000)
+            if not woken:
+                return None
+            message, _ = await self._read_weighted(lanes)
+            return message
+        except redis.ResponseError as e:
+            log.error(f"❌ Stream dequeue error: {e}")
+            # NOGROUP: a stream or group was deleted under us, recreate on next call
+            if "NOGROUP" in str(e):
+                self._groups_ready.clear()
+            return None
+        except Exception:
+            return None
+
+    async def get_lane_stats(self) -> Dict[str, Dict[str, int]]:
+        """Undelivered depth and weight of every lane stream"""
+        if not self.client:
+            await self.connect()
+        lanes = await self._refresh_lanes(force=True)
+        depths = await self._lane_depths(lanes)
+        return {lane: {"depth": depths[lane], "weight": self.lane_weight(lane)} for lane in lanes}
+
+    async def ack(self, message: Dict[str, Any]):
+        """Acknowledge and delete the entry so it is never redelivered"""
+        message_id = message.get("message_id")
+        lane = message.get("lane")
+        if not message_id or not lane or not self.client:
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.xack(lane, self.group, message_id)
+        pipe.xdel(lane, message_id)
+        await pipe.execute()
+
+    async def touch(self, message: Dict[str, Any]):
+        """Reset the entry's idle time so it is not reclaimed while still running"""
+        message_id = message.get("message_id")
+        lane = message.get("lane")
+        if not message_id or not lane or not self.client:
+            return
+        await self.client.xclaim(
+            lane,
+            self.group,
+            self.consumer,
+            min_idle_time=0,
+            message_ids=[message_id],
+            justid=True
+        )
+
+def create_queue() -> RedisQueue:
+    """Build the queue backend selected by settings.QUEUE_BACKEND"""
+    if settings.QUEUE_BACKEND == "streams":
+        return RedisStreamQueue()
+    return RedisQueue()
+
 # Global instance
-job_queue = RedisQueue()
+job_queue = create_queue()
@@ -0,0 +1,190 @@
+"""
+Retry scheduling and dead-lettering for jobs consumed by worker_main.
+
+A failed job is parked in a sorted set scored by the time it becomes due
+(exponential backoff with jitter). Due jobs are moved back into their queue
+lane by a Lua script, so each batch is promoted atomically and several
+workers can run the promoter at once without losing or duplicating jobs.
+Jobs that exhaust their retries land in a capped dead-letter list where they
+can be inspected and replayed.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.queue import JobPriority, RedisQueue, RedisStreamQueue, job_queue
+
+log = logging.getLogger(__name__)
+
+# Fields added by dequeue() that must not travel with a re-enqueued message
+TRANSIENT_FIELDS = ("message_id", "lane")
+
+# KEYS: retry zset, lanes set. ARGV: now, batch size, backend, stream maxlen
+# Lane keys come from the members themselves, so this assumes a single Redis node
+PROMOTE_DUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(due) do
+    local entry = cjson.decode(member)
+    if ARGV[3] == 'streams' then
+        redis.call('XADD', entry.lane, 'MAXLEN', '~', ARGV[4], '*', 'data', entry.data)
+    else
+        redis.call('RPUSH', entry.lane, entry.data)
+    end
+    redis.call('SADD', KEYS[2], entry.lane)
+    redis.call('ZREM', KEYS[1], member)
+end
+return #due
+"""
+
+# KEYS: dead-letter list, retry zset. ARGV: dead entry, retry member, due time
+REPLAY_DEAD_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+class RetryPolicy:
+    """Exponential backoff with equal jitter"""
+
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def next_delay(self, retry: int) -> float:
+        """Seconds to wait before retry number `retry` (1-based)"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+        # Half fixed, half random: spreads out a burst of failures without retrying instantly
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+class RetryScheduler:
+    """Delayed retries and dead-letter list for one queue backend"""
+
+    def __init__(self, queue: RedisQueue, policy: Optional[RetryPolicy] = None):
+        self.queue = queue
+        self.policy = policy or RetryPolicy(
+            settings.WORKER_MAX_RETRIES,
+            settings.WORKER_RETRY_DELAY,
+            settings.QUEUE_RETRY_MAX_DELAY
+        )
+        self.retry_key = f"{queue.queue_key}:retry"
+        self.dead_key = f"{queue.queue_key}:dead"
+        self.dead_maxlen = settings.QUEUE_DLQ_MAXLEN
+        self._promote_script = None
+        self._replay_script = None
+
+    async def _client(self):
+        if not self.queue.client:
+            await self.queue.connect()
+        return self.queue.client
+
+    def _retry_member(self, message: Dict[str, Any]) -> str:
+        """Serialize a message together with the lane it goes back to"""
+        lane = self.queue.lane_key(message.get("type"), JobPriority(message.get("priority", JobPriority.NORMAL)))
+        return json.dumps({"lane": lane, "data": json.dumps(message)})
+
+    async def handle_failure(self, message: Dict[str, Any], error: str) -> bool:
+        """Schedule a retry for a failed message, or dead-letter it; True if it will be retried"""
+        message = {k: v for k, v in message.items() if k not in TRANSIENT_FIELDS}
+        retry = int(message.get("retry", 0)) + 1
+        message["retry"] = retry
+        message["last_error"] = error[:500]
+
+        if retry > self.policy.max_retries:
+            await self.dead_letter(message, error)
+            return False
+
+        delay = self.policy.next_delay(retry)
+        client = await self._client()
+        await client.zadd(self.retry_key, {self._retry_member(message): time.time() + delay})
+        log.info(f"🔄 Job {message.get('job_id')} scheduled for retry #{retry} in {delay:.1f}s")
+        return True
+
+    async def dead_letter(self, message: Dict[str, Any], error: str):
+        """Push a message to the capped dead-letter list"""
+        entry = {
+            "job_id": message.get("job_id"),
+            "type": message.get("type"),
+            "retries": message.get("retry", 0),
+            "error": error[:500],
+            "failed_at": time.time(),
+            "data": json.dumps(message)
+        }
+        client = await self._client()
+        pipe = client.pipeline(transaction=True)
+        pipe.lpush(self.dead_key, json.dumps(entry))
+        pipe.ltrim(self.dead_key, 0, self.dead_maxlen - 1)
+        await pipe.execute()
+        log.error(f"☠️ Job {entry['job_id']} moved to dead-letter queue after {entry['retries']} retries: {error[:100]}")
+
+    async def promote_due(self, batch_size: int = 100) -> int:
+        """Move up to batch_size due retries back into their lanes; returns how many moved"""
+        client = await self._client()
+        if self._promote_script is None:
+            self._promote_script = client.register_script(PROMOTE_DUE_SCRIPT)
+        backend = "streams" if isinstance(self.queue, RedisStreamQueue) else "list"
+        maxlen = getattr(self.queue, "maxlen", 0)
+        promoted = await self._promote_script(
+            keys=[self.retry_key, self.queue.lanes_key],
+            args=[time.time(), batch_size, backend, maxlen]
+        )
+        if promoted:
+            log.info(f"🔄 Promoted {promoted} due retries")
+        return int(promoted)
+
+    async def run(self, stop_event, interval: float = 1.0, batch_size: int = 100):
+        """Promote due retries until stop_event is set"""
+        while not stop_event.is_set():
+            try:
+                # A full batch means more may be due: go again without sleeping
+                if await self.promote_due(batch_size) >= batch_size:
+                    continue
+            except Exception as e:
+                log.error(f"❌ Retry promotion failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def list_dead_letters(self, offset: int = 0, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent dead-lettered jobs first"""
+        client = await self._client()
+        entries = []
+        for raw in await client.lrange(self.dead_key, offset, offset + limit - 1):
+            entry = json.loads(raw)
+            entry["payload"] = json.loads(entry.pop("data")).get("payload")
+            entries.append(entry)
+        return entries
+
+    async def count_dead_letters(self) -> int:
+        client = await self._client()
+        return await client.llen(self.dead_key)
+
+    async def replay_dead_letter(self, job_id: str) -> bool:
+        """Re-queue a dead-lettered job with a fresh retry budget; False if not found"""
+        client = await self._client()
+        for raw in await client.lrange(self.dead_key, 0, -1):
+            entry = json.loads(raw)
+            if entry.get("job_id") != job_id:
+                continue
+            message = json.loads(entry["data"])
+            message["retry"] = 0
+            message.pop("last_error", None)
+
+            if self._replay_script is None:
+                self._replay_script = client.register_script(REPLAY_DEAD_SCRIPT)
+            # Goes through the retry set (due now) so it reaches the lane atomically
+            replayed = await self._replay_script(
+                keys=[self.dead_key, self.retry_key],
+                args=[raw, self._retry_member(message), time.time()]
+            )
+            if replayed:
+                log.info(f"♻️ Replaying dead-lettered job {job_id}")
+                return True
+        return False
+
+# Global instance
+retry_scheduler = RetryScheduler(job_queue)
@@ -0,0 +1,593 @@
+"""
+Storage backends for jobs, phase checkpoints, renders and the asset cache.
+
+Everything that persists job data goes through `storage`:
+
+- SQLiteBackend runs the models.dao reads on the core.db_async read-only
+  pool and group-commits the writes through core.db_writer. The API and
+  worker containers share one database file.
+- PostgresBackend talks to a PostgreSQL server over an asyncpg pool, so the
+  containers no longer need a shared volume.
+
+STORAGE_BACKEND selects one. Job rows support both index access (in
+models.dao.JOB_COLUMNS order) and key access, whichever backend returned
+them.
+"""
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from core.config import settings
+from core.db import close_pools, get_pool, get_read_pool
+from core.db_async import AsyncDB, async_db, async_read_db
+from core.db_writer import GroupCommitWriter, db_writer
+from models import dao
+
+log = logging.getLogger(__name__)
+
+# (job_id, state, progress, job_type, payload), as taken by upsert_jobs
+JobRow = Tuple[str, str, int, str, Optional[Dict[str, Any]]]
+
+class StorageBackend(ABC):
+    """Persistence for jobs and their artefacts"""
+
+    @abstractmethod
+    async def initialize(self):
+        """Create the schema if needed"""
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def upsert_job(self, job_id: str, state: str, progress: int,
+                         job_type: str = 'unknown', payload: Optional[Dict[str, Any]] = None):
+        """Create or fully rewrite a job, keeping created_at"""
+
+    @abstractmethod
+    async def upsert_jobs(self, rows: Sequence[JobRow]):
+        """upsert_job for many jobs in one transaction"""
+
+    @abstractmethod
+    async def update_job_state(self, job_id: str, state: str, progress: Optional[int] = None,
+                               unless_finished: bool = False) -> int:
+        """Narrow state write; returns the number of rows updated. unless_finished leaves done/error/cancelled jobs alone"""
+
+    @abstractmethod
+    async def update_job_progress(self, job_id: str, progress: int, unless_finished: bool = False) -> int:
+        """Narrow progress write; returns the number of rows updated. unless_finished as for update_job_state"""
+
+    @abstractmethod
+    async def get_job(self, job_id: str):
+        """Job row (JOB_COLUMNS plus payload), from the archive if needed, or None"""
+
+    @abstractmethod
+    async def delete_job(self, job_id: str) -> Optional[int]:
+        """Delete a job, hot or archived, and its checkpoints; None if it does not exist"""
+
+    @abstractmethod
+    async def archive_jobs(self, before: float, limit: int = 500) -> int:
+        """Move up to `limit` finished jobs last written before `before` to the archive"""
+
+    @abstractmethod
+    async def list_jobs_page(self, limit: int = 100, cursor: Optional[str] = None, state: Optional[str] = None,
+                             job_type: Optional[str] = None, user_id: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+        """Newest jobs first, keyset-paginated: (rows, next_cursor)"""
+
+    @abstractmethod
+    async def get_changes_cursor(self) -> str:
+        """Opaque cursor for list_job_changes that skips everything written so far"""
+
+    @abstractmethod
+    async def list_job_changes(self, since: str, limit: int = 500) -> Tuple[List[Any], str]:
+        """
+        Jobs written after cursor `since`, oldest change first: (rows, cursor).
+
+        Removed jobs come back as 'deleted'/'archived' tombstones. ValueError
+        for a cursor that did not come from this backend.
+        """
+
+    @abstractmethod
+    async def get_job_stats(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Job counts per state and job_type (and per state for user_id) from the maintained counters"""
+
+    @abstractmethod
+    async def save_job_checkpoint(self, job_id: str, phase: str, data: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    async def get_job_checkpoints(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def insert_or_update_render(self, job_id: str, item_id: str, h: str, quality: str,
+                                      url: Optional[str], status: str):
+        pass
+
+    @abstractmethod
+    async def list_job_outputs(self, job_id: str) -> List[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def get_cached_asset(self, h: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set_cached_asset(self, h: str, url: str):
+        pass
+
+class SQLiteBackend(StorageBackend):
+    """models.dao on the SQLite connection pool, off the event loop, with group-committed writes"""
+
+    def __init__(self, db_path: Union[str, Path, None] = None):
+        # The default path shares the global pool, thread pool and writer with the rest of the process
+        self.pool = get_pool(db_path) if db_path else None
+        self.read_pool = get_read_pool(db_path) if db_path else None
+        self.db = AsyncDB(connect=self.pool.acquire) if self.pool else async_db
+        self.read_db = AsyncDB(connect=self.read_pool.acquire, readonly=True) if self.read_pool else async_read_db
+        self.writer = GroupCommitWriter(connect=self.pool.acquire) if self.pool else db_writer
+
+    async def initialize(self):
+        await self.db.run(dao.init_db)
+
+    async def close(self):
+        self.writer.close()
+        self.db.close()
+        self.read_db.close()
+        if self.pool:
+            self.pool.close_all()
+            self.read_pool.close_all()
+        else:
+            close_pools()
+
+    async def upsert_job(self, job_id, state, progress, job_type='unknown', payload=None):
+        await self.writer.submit(dao.upsert_job, job_id, state, progress, job_type=job_type, payload=payload)
+
+    async def upsert_jobs(self, rows):
+        await self.writer.submit(dao.upsert_jobs, rows)
+
+    async def update_job_state(self, job_id, state, progress=None, unless_finished=False):
+        return await self.writer.submit(dao.update_job_state, job_id, state, progress, unless_finished)
+
+    async def update_job_progress(self, job_id, progress, unless_finished=False):
+        return await self.writer.submit(dao.update_job_progress, job_id, progress, unless_finished)
+
+    async def get_job(self, job_id):
+        return await self.read_db.run(dao.get_job, job_id)
+
+    async def delete_job(self, job_id):
+        return await self.writer.submit(dao.delete_job, job_id)
+
+    async def archive_jobs(self, before, limit=500):
+        return await self.db.run(dao.archive_jobs, before, limit)
+
+    async def list_jobs_page(self, limit=100, cursor=None, state=None, job_type=None, user_id=None):
+        return await self.read_db.run(dao.list_jobs_page, limit, cursor, state=state, job_type=job_type, user_id=user_id)
+
+    async def get_changes_cursor(self):
+        return str(await self.read_db.run(dao.get_changes_cursor))
+
+    async def list_job_changes(self, since, limit=500):
+        rows, cursor = await self.read_db.run(dao.list_job_changes, float(since), limit)
+        return rows, str(cursor)
+
+    async def get_job_stats(self, user_id=None):
+        return await self.read_db.run(dao.get_job_stats, user_id)
+
+    async def save_job_checkpoint(self, job_id, phase, data):
+        await self.writer.submit(dao.save_job_checkpoint, job_id, phase, data)
+
+    async def get_job_checkpoints(self, job_id):
+        return await self.read_db.run(dao.get_job_checkpoints, job_id)
+
+    async def insert_or_update_render(self, job_id, item_id, h, quality, url, status):
+        await self.writer.submit(dao.insert_or_update_render, job_id, item_id, h, quality, url, status)
+
+    async def list_job_outputs(self, job_id):
+        return await self.read_db.run(dao.list_job_outputs, job_id)
+
+    async def get_cached_asset(self, h):
+        return await self.read_db.run(dao.get_cached_asset, h)
+
+    async def set_cached_asset(self, h, url):
+        await self.writer.submit(dao.set_cached_asset, h, url)
+
+POSTGRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs(
+    job_id TEXT PRIMARY KEY,
+    state TEXT,
+    progress INTEGER,
+    created_at BIGINT,
+    job_type TEXT DEFAULT 'unknown',
+    payload TEXT DEFAULT '{}',
+    user_id TEXT,
+    updated_at DOUBLE PRECISION,
+    change_xid BIGINT,
+    change_id BIGINT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_state_created ON jobs(state, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_type_created ON jobs(job_type, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at);
+CREATE TABLE IF NOT EXISTS renders(
+    job_id TEXT,
+    item_id TEXT,
+    hash TEXT,
+    quality TEXT,
+    url TEXT,
+    status TEXT,
+    PRIMARY KEY(job_id, item_id)
+);
+CREATE TABLE IF NOT EXISTS assets_cache(
+    hash TEXT PRIMARY KEY,
+    url TEXT,
+    created_at BIGINT
+);
+CREATE TABLE IF NOT EXISTS job_checkpoints(
+    job_id TEXT,
+    phase TEXT,
+    data TEXT DEFAULT '{}',
+    created_at BIGINT,
+    PRIMARY KEY(job_id, phase)
+);
+-- Payloads are left to TOAST compression here
+CREATE TABLE IF NOT EXISTS jobs_archive(
+    job_id TEXT PRIMARY KEY,
+    state TEXT,
+    progress INTEGER,
+    created_at BIGINT,
+    job_type TEXT,
+    user_id TEXT,
+    updated_at DOUBLE PRECISION,
+    archived_at BIGINT,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS job_tombstones(
+    job_id TEXT PRIMARY KEY,
+    state TEXT,
+    updated_at DOUBLE PRECISION,
+    change_xid BIGINT,
+    change_id BIGINT
+);
+CREATE INDEX IF NOT EXISTS idx_job_tombstones_updated_at ON job_tombstones(updated_at);
+-- Changes feed position of the last write (see CHANGE_STAMP); added in place on older databases
+CREATE SEQUENCE IF NOT EXISTS job_change_seq;
+ALTER TABLE jobs ADD COLUMN IF NOT EXISTS change_xid BIGINT, ADD COLUMN IF NOT EXISTS change_id BIGINT;
+ALTER TABLE job_tombstones ADD COLUMN IF NOT EXISTS change_xid BIGINT, ADD COLUMN IF NOT EXISTS change_id BIGINT;
+CREATE INDEX IF NOT EXISTS idx_jobs_change ON jobs(change_xid, change_id);
+CREATE INDEX IF NOT EXISTS idx_job_tombstones_change ON job_tombstones(change_xid, change_id);
+-- models.dao.create_job_stats as a PL/pgSQL trigger
+CREATE TABLE IF NOT EXISTS job_stats(
+    dimension TEXT,
+    value TEXT,
+    state TEXT,
+    count BIGINT NOT NULL DEFAULT 0,
+    progress_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY(dimension, value, state)
+);
+CREATE OR REPLACE FUNCTION job_stats_bump(r jobs, sign INTEGER) RETURNS void AS $$
+BEGIN
+    INSERT INTO job_stats(dimension, value, state, count, progress_sum) VALUES
+        ('state', '', COALESCE(r.state, ''), sign, sign * COALESCE(r.progress, 0)),
+        ('job_type', COALESCE(r.job_type, ''), COALESCE(r.state, ''), sign, 0),
+        ('user', COALESCE(r.user_id, ''), COALESCE(r.state, ''), sign, 0)
+    ON CONFLICT(dimension, value, state) DO UPDATE SET
+        count = job_stats.count + EXCLUDED.count,
+        progress_sum = job_stats.progress_sum + EXCLUDED.progress_sum;
+END $$ LANGUAGE plpgsql;
+CREATE OR REPLACE FUNCTION jobs_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.state IS NOT DISTINCT FROM NEW.state
+            AND OLD.job_type IS NOT DISTINCT FROM NEW.job_type AND OLD.user_id IS NOT DISTINCT FROM NEW.user_id THEN
+        UPDATE job_stats SET progress_sum = progress_sum + COALESCE(NEW.progress, 0) - COALESCE(OLD.progress, 0)
+        WHERE dimension = 'state' AND value = '' AND state = COALESCE(NEW.state, '')
+            AND OLD.progress IS DISTINCT FROM NEW.progress;
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM job_stats_bump(OLD, -1);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        PERFORM job_stats_bump(NEW, 1);
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS jobs_stats ON jobs;
+CREATE TRIGGER jobs_stats AFTER INSERT OR DELETE OR UPDATE OF state, progress, job_type, user_id ON jobs
+    FOR EACH ROW EXECUTE FUNCTION jobs_stats_trigger();
+-- Archived jobs stay counted: the archive's upsert takes back the counts its DELETE from jobs removed
+CREATE OR REPLACE FUNCTION jobs_archive_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM job_stats_bump(jsonb_populate_record(NULL::jobs, to_jsonb(OLD)), -1);
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        PERFORM job_stats_bump(jsonb_populate_record(NULL::jobs, to_jsonb(NEW)), 1);
+    END IF;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS jobs_archive_stats ON jobs_archive;
+CREATE TRIGGER jobs_archive_stats AFTER INSERT OR DELETE OR UPDATE ON jobs_archive
+    FOR EACH ROW EXECUTE FUNCTION jobs_archive_stats_trigger();
+"""
+
+# Feed position of a job or tombstone write: the writing transaction's ID, then a sequence
+# number ordering the writes within it. Concurrent writers commit in any order, so the feed
+# only returns writes of transactions older than every one still running (pg_snapshot_xmin):
+# nothing can commit behind a position once the feed has handed it out
+CHANGE_STAMP = "pg_current_xact_id()::text::bigint, nextval('job_change_seq')"
+SET_CHANGE_STAMP = "change_xid=pg_current_xact_id()::text::bigint, change_id=nextval('job_change_seq')"
+SNAPSHOT_XMIN = "pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+
+def _change_cursor(change_xid: int, change_id: int) -> str:
+    return f"{change_xid}-{change_id}"
+
+def _parse_change_cursor(cursor: str) -> Tuple[int, int]:
+    """Inverse of _change_cursor; ValueError for anything else"""
+    change_xid, change_id = str(cursor).split("-")
+    return int(change_xid), int(change_id)
+
+def _rowcount(status: str) -> int:
+    # asyncpg returns the command tag, e.g. "UPDATE 1"
+    return int(status.split()[-1])
+
+class PostgresBackend(StorageBackend):
+    """PostgreSQL over an asyncpg pool"""
+
+    UPSERT_JOB_SQL = (
+        "INSERT INTO jobs(job_id,state,progress,created_at,job_type,payload,user_id,updated_at,change_xid,change_id) "
+        f"VALUES($1,$2,$3,$4,$5,$6,$7,$8,{CHANGE_STAMP}) "
+        "ON CONFLICT(job_id) DO UPDATE SET state=EXCLUDED.state, progress=EXCLUDED.progress, "
+        "job_type=EXCLUDED.job_type, payload=EXCLUDED.payload, user_id=EXCLUDED.user_id, updated_at=EXCLUDED.updated_at, "
+        "change_xid=EXCLUDED.change_xid, change_id=EXCLUDED.change_id"
+    )
+
+    def __init__(self, dsn: Optional[str] = None, pool_size: Optional[int] = None):
+        self.dsn = dsn or settings.postgres_dsn
+        self.pool_size = pool_size or settings.POSTGRES_POOL_SIZE
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    import asyncpg  # only needed for this backend
+                    self._pool = await asyncpg.create_pool(
+                        self.dsn, min_size=1, max_size=self.pool_size, command_timeout=30,
+                        server_settings={"application_name": "genscene_backend"}
+                    )
+        return self._pool
+
+    async def _write_jobs(self, sql: str, args: Sequence[Any], many: bool = False) -> int:
+        pool = await self._get_pool()
+        if not many:
+            return _rowcount(await pool.execute(sql, *args))
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(sql, args)
+                return len(args)
+
+    async def initialize(self):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Count from scratch when the counters are new or predate the archive trigger
+                new_stats = await conn.fetchval(
+                    "SELECT NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'jobs_archive_stats')"
+                )
+                # Recreating the triggers locks jobs and jobs_archive against writes until commit,
+                # so no job changes between the trigger and the backfill
+                await conn.execute(POSTGRES_SCHEMA)
+                if new_stats:
+                    await conn.execute("""
+                        DELETE FROM job_stats;
+                        WITH counted AS (
+                            SELECT state, progress, job_type, user_id FROM jobs
+                            UNION ALL
+                            SELECT state, progress, job_type, user_id FROM jobs_archive
+                        )
+                        INSERT INTO job_stats(dimension, value, state, count, progress_sum)
+                        SELECT 'state', '', COALESCE(state, ''), COUNT(*), SUM(COALESCE(progress, 0)) FROM counted GROUP BY 3
+                        UNION ALL
+                        SELECT 'job_type', COALESCE(job_type, ''), COALESCE(state, ''), COUNT(*), 0 FROM counted GROUP BY 2, 3
+                        UNION ALL
+                        SELECT 'user', COALESCE(user_id, ''), COALESCE(state, ''), COUNT(*), 0 FROM counted GROUP BY 2, 3
+                    """)
+        log.info("✅ PostgreSQL storage initialized")
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def upsert_job(self, job_id, state, progress, job_type='unknown', payload=None):
+        await self._write_jobs(self.UPSERT_JOB_SQL, dao.job_row(job_id, state, progress, job_type, payload, time.time()))
+
+    async def upsert_jobs(self, rows):
+        now = time.time()
+        await self._write_jobs(self.UPSERT_JOB_SQL, [
+            dao.job_row(job_id, state, progress, job_type, payload, now)
+            for job_id, state, progress, job_type, payload in rows
+        ], many=True)
+
+    async def update_job_state(self, job_id, state, progress=None, unless_finished=False):
+        return await self._write_jobs(
+            f"UPDATE jobs SET state=$1, progress=COALESCE($2, progress), updated_at=$3, {SET_CHANGE_STAMP} "
+            "WHERE job_id=$4 AND NOT ($5 AND state = ANY($6::text[]))",
+            (state, progress, time.time(), job_id, unless_finished, list(dao.FINISHED_STATES))
+        )
+
+    async def update_job_progress(self, job_id, progress, unless_finished=False):
+        return await self._write_jobs(
+            f"UPDATE jobs SET progress=$1, updated_at=$2, {SET_CHANGE_STAMP} "
+            "WHERE job_id=$3 AND NOT ($4 AND state = ANY($5::text[]))",
+            (progress, time.time(), job_id, unless_finished, list(dao.FINISHED_STATES))
+        )
+
+    async def get_job(self, job_id):
+        pool = await self._get_pool()
+        row = await pool.fetchrow(f"SELECT {dao.JOB_COLUMNS}, payload FROM jobs WHERE job_id=$1", job_id)
+        if row is None:
+            row = await pool.fetchrow(f"SELECT {dao.JOB_COLUMNS}, payload FROM jobs_archive WHERE job_id=$1", job_id)
+        return row
+
+    async def delete_job(self, job_id):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Tombstone for the changes feed, committed together with the delete
+                await conn.execute(f"""
+                    INSERT INTO job_tombstones(job_id, state, updated_at, change_xid, change_id)
+                    SELECT $1, 'deleted', $2, {CHANGE_STAMP}
+                    WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id=$1) OR EXISTS (SELECT 1 FROM jobs_archive WHERE job_id=$1)
+                    ON CONFLICT(job_id) DO UPDATE SET state=EXCLUDED.state, updated_at=EXCLUDED.updated_at,
+                        change_xid=EXCLUDED.change_xid, change_id=EXCLUDED.change_id
+                """, job_id, time.time())
+                deleted = _rowcount(await conn.execute("DELETE FROM jobs WHERE job_id=$1", job_id))
+                deleted += _rowcount(await conn.execute("DELETE FROM jobs_archive WHERE job_id=$1", job_id))
+                await conn.execute("DELETE FROM job_checkpoints WHERE job_id=$1", job_id)
+                return deleted or None
+
+    ARCHIVE_JOBS_SQL = f"""
+            WITH moved AS (
+                DELETE FROM jobs WHERE job_id IN (
+                    SELECT job_id FROM jobs WHERE updated_at < $1 AND state = ANY($2::text[])
+                    LIMIT $3 FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {dao.JOB_COLUMNS}, payload
+            ), archived AS (
+                INSERT INTO jobs_archive(job_id,state,progress,created_at,job_type,user_id,updated_at,archived_at,payload)
+                SELECT {dao.JOB_COLUMNS}, $4, payload FROM moved
+                ON CONFLICT(job_id) DO UPDATE SET state=EXCLUDED.state, progress=EXCLUDED.progress,
+                    created_at=EXCLUDED.created_at, job_type=EXCLUDED.job_type, user_id=EXCLUDED.user_id,
+                    updated_at=EXCLUDED.updated_at, archived_at=EXCLUDED.archived_at, payload=EXCLUDED.payload
+                RETURNING job_id
+            ), tombstones AS (
+                INSERT INTO job_tombstones(job_id, state, updated_at, change_xid, change_id)
+                SELECT job_id, 'archived', $5, {CHANGE_STAMP} FROM moved
+                ON CONFLICT(job_id) DO UPDATE SET state=EXCLUDED.state, updated_at=EXCLUDED.updated_at,
+                    change_xid=EXCLUDED.change_xid, change_id=EXCLUDED.change_id
+            ), checkpoints AS (
+                DELETE FROM job_checkpoints WHERE job_id IN (SELECT job_id FROM moved)
+            )
+            SELECT count(*) FROM archived
+        """
+
+    async def archive_jobs(self, before, limit=500):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                moved = await conn.fetchval(self.ARCHIVE_JOBS_SQL, before, list(dao.FINISHED_STATES), limit,
+                                            int(time.time()), time.time())
+                await conn.execute("DELETE FROM job_tombstones WHERE updated_at < $1", before)
+                return moved
+
+    async def list_jobs_page(self, limit=100, cursor=None, state=None, job_type=None, user_id=None):
+        where, params = [], []
+        for column, value in (("state", state), ("job_type", job_type), ("user_id", user_id)):
+            if value is not None:
+                params.append(value)
+                where.append(f"{column} = ${len(params)}")
+        if cursor:
+            params.extend(dao.decode_job_cursor(cursor))
+            where.append(f"(created_at, job_id) < (${len(params) - 1}, ${len(params)})")
+
+        sql = f"SELECT {dao.JOB_COLUMNS} FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        params.append(limit + 1)
+        sql += f" ORDER BY created_at DESC, job_id DESC LIMIT ${len(params)}"
+        pool = await self._get_pool()
+        rows = await pool.fetch(sql, *params)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = dao.encode_job_cursor(rows[-1][3], rows[-1][0])
+        return rows, next_cursor
+
+    async def get_changes_cursor(self):
+        # Transactions older than the snapshot's xmin are visible to a listing taken next;
+        # newer ones may or may not be, and come back from the feed either way
+        pool = await self._get_pool()
+        return _change_cursor(await pool.fetchval(f"SELECT {SNAPSHOT_XMIN}"), 0)
+
+    async def list_job_changes(self, since, limit=500):
+        change_xid, change_id = _parse_change_cursor(since)
+        pool = await self._get_pool()
+        rows = await pool.fetch(f"""
+            (SELECT {dao.JOB_COLUMNS}, change_xid, change_id FROM jobs
+             WHERE (change_xid, change_id) > ($1, $2) AND change_xid < {SNAPSHOT_XMIN}
+             ORDER BY change_xid, change_id LIMIT $3)
+            UNION ALL
+            (SELECT job_id, state, NULL, NULL, NULL, NULL, updated_at, change_xid, change_id FROM job_tombstones
+             WHERE (change_xid, change_id) > ($1, $2) AND change_xid < {SNAPSHOT_XMIN}
+             ORDER BY change_xid, change_id LIMIT $3)
+            ORDER BY 8, 9 LIMIT $3
+        """, change_xid, change_id, limit)
+        return rows, (_change_cursor(rows[-1][7], rows[-1][8]) if rows else since)
+
+    async def get_job_stats(self, user_id=None):
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "SELECT dimension, value, state, count, progress_sum FROM job_stats "
+            "WHERE dimension IN ('state', 'job_type') OR (dimension = 'user' AND value = $1)",
+            user_id
+        )
+        return dao.fold_job_stats(rows, user_id)
+
+    async def save_job_checkpoint(self, job_id, phase, data):
+        pool = await self._get_pool()
+        await pool.execute(
+            "INSERT INTO job_checkpoints(job_id,phase,data,created_at) VALUES($1,$2,$3,$4) "
+            "ON CONFLICT(job_id,phase) DO UPDATE SET data=EXCLUDED.data, created_at=EXCLUDED.created_at",
+            job_id, phase, json.dumps(data), int(time.time())
+        )
+
+    async def get_job_checkpoints(self, job_id):
+        pool = await self._get_pool()
+        rows = await pool.fetch("SELECT phase, data FROM job_checkpoints WHERE job_id=$1", job_id)
+        return {row[0]: json.loads(row[1]) for row in rows}
+
+    async def insert_or_update_render(self, job_id, item_id, h, quality, url, status):
+        pool = await self._get_pool()
+        await pool.execute(
+            "INSERT INTO renders(job_id,item_id,hash,quality,url,status) VALUES($1,$2,$3,$4,$5,$6) "
+            "ON CONFLICT(job_id,item_id) DO UPDATE SET hash=EXCLUDED.hash, quality=EXCLUDED.quality, "
+            "url=EXCLUDED.url, status=EXCLUDED.status",
+            job_id, item_id, h, quality, url, status
+        )
+
+    async def list_job_outputs(self, job_id):
+        pool = await self._get_pool()
+        rows = await pool.fetch(
+            "SELECT item_id AS id, quality, hash, url, status FROM renders WHERE job_id=$1 ORDER BY item_id", job_id
+        )
+        return [dict(row) for row in rows]
+
+    async def get_cached_asset(self, h):
+        pool = await self._get_pool()
+        return await pool.fetchval("SELECT url FROM assets_cache WHERE hash=$1", h)
+
+    async def set_cached_asset(self, h, url):
+        pool = await self._get_pool()
+        await pool.execute(
+            "INSERT INTO assets_cache(hash,url,created_at) VALUES($1,$2,$3) "
+            "ON CONFLICT(hash) DO UPDATE SET url=EXCLUDED.url, created_at=EXCLUDED.created_at",
+            h, url, int(time.time())
+        )
+
+def create_storage() -> StorageBackend:
+    """Build the storage backend selected by settings.STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "postgres":
+        return PostgresBackend()
+    return SQLiteBackend()
+
+# Global instance
+storage = create_storage()
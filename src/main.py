@@ -20,8 +20,13 @@ from typing import List, Literal
 # Import existing modules
 from core.config import settings
 from core.logging import setup_logging
-from core.db import get_conn
-from models.dao import init_db, upsert_job
+from core.db import get_pool_stats
+from core.db_async import async_read_db
+from core.db_writer import db_writer
+from core.job_status import job_status_store
+from core.queue import JobPriority
+from core.retry import retry_scheduler
+from core.storage import storage
 
 # Import video model configuration from enterprise manager
 from worker.enterprise_manager import (
@@ -45,6 +50,9 @@ class QuickCreateRequest(BaseModel):
     video_quality: Optional[str] = Field("720p", description="Video quality: 720p or 1080p")
     aspect_ratio: Optional[str] = Field("16:9", description="Aspect ratio: 16:9, 9:16, 1:1")
 
+class QuickCreateBatchRequest(BaseModel):
+    items: List[QuickCreateRequest] = Field(..., min_length=1, max_length=500)
+
 class DeleteJobRequest(BaseModel):
     job_id: str = Field(..., description="Job ID to delete")
 
@@ -57,27 +65,6 @@ class QuickCreateResponse(BaseModel):
     estimated_time_sec: Optional[int] = None
     message: str
 
-def update_state(conn, job_id, state, progress):
-    conn.execute(
-        "UPDATE jobs SET state = ?, progress = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
-        (state, progress, job_id)
-    )
-    conn.commit()
-
-def update_job_state(conn, job_id, state, progress):
-    try:
-        conn.execute(
-            "UPDATE jobs SET state = ?, progress = ?, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
-            (state, progress, job_id)
-        )
-        conn.commit()
-    except Exception:
-        conn.execute(
-            "UPDATE jobs SET state = ?, progress = ? WHERE job_id = ?",
-            (state, progress, job_id)
-        )
-        conn.commit()
-
 class SecurityMiddleware:
     def __init__(self, app):
         self.app = app
@@ -117,6 +104,7 @@ log = setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    await storage.initialize()
     log.info("🚀 Initializing Enterprise Job Manager...")
     await enterprise_job_manager.initialize()
     await enterprise_job_manager.start_workers(num_workers=4)
@@ -125,6 +113,7 @@ async def lifespan(app: FastAPI):
     # Shutdown
     log.info("🔌 Shutting down Enterprise Job Manager...")
     await enterprise_job_manager.close()
+    await storage.close()
 
 app = FastAPI(title="Gen Scene Studio Backend", version="0.2.0", lifespan=lifespan)
 
@@ -136,8 +125,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-init_conn = get_conn()
-init_db(init_conn)
 app.add_middleware(SecurityMiddleware)
 app.mount("/files", StaticFiles(directory=settings.MEDIA_DIR), name="files")
 log.info(f"MEDIA_DIR: {settings.MEDIA_DIR}")
@@ -167,23 +154,19 @@ async def worker():
         job_type = job.get("type", "unknown")
         log.info(f"Processing job: {job_id} of type {job_type}")
 
-        conn = get_conn()
-        update_job_state(conn, job_id, "running", 10)
+        await storage.update_job_state(job_id, "running", 10)
         await asyncio.sleep(3)
-        update_job_state(conn, job_id, "running", 50)
+        await storage.update_job_state(job_id, "running", 50)
         await asyncio.sleep(4)
-        update_job_state(conn, job_id, "running", 90)
+        await storage.update_job_state(job_id, "running", 90)
         await asyncio.sleep(2)
-        update_job_state(conn, job_id, "done", 100)
-        conn.close()
+        await storage.update_job_state(job_id, "done", 100)
 
       except Exception as e:
         log.exception("Error en worker: %s", e)
         try:
             job_id = job.get("payload", {}).get("job_id", "unknown")
-            conn = get_conn()
-            update_job_state(conn, job_id, "error", 0)
-            conn.close()
+            await storage.update_job_state(job_id, "error", 0)
         except:
             pass
       finally:
@@ -205,7 +188,11 @@ def health():
         "status": "ok",
         "ffmpeg": _bin_ok("ffmpeg"),
         "ffprobe": _bin_ok("ffprobe"),
-        "db": True
+        "db": True,
+        "db_pool": get_pool_stats(),
+        # Read vs write latency: reads on the read-only pool, writes from submit to commit
+        "db_read": async_read_db.stats(),
+        "db_writer": db_writer.stats()
     }
 
 @app.get("/styles")
@@ -280,31 +267,26 @@ def get_recommended_model_endpoint(style_key: str):
 
 # NEW ENDPOINT 1: Status with query parameter (for frontend compatibility)
 @app.get("/api/status")
-def get_job_status_query(job_id: str = Query(..., description="Job ID to check")):
+async def get_job_status_query(job_id: str = Query(..., description="Job ID to check")):
     """Get job status using query parameter - compatible with frontend"""
     try:
-        conn = get_conn()
-        cursor = conn.execute("""
-            SELECT job_id, state, progress, created_at
-            FROM jobs
-            WHERE job_id = ?
-        """, (job_id,))
-
-        row = cursor.fetchone()
-        conn.close()
+        row = await storage.get_job(job_id)
 
         if not row:
             raise HTTPException(status_code=404, detail="Job not found")
 
-        # Determine status message based on state
-        status = row[1]
+        # Progress is written to SQLite in coalesced batches; Redis has the latest
+        live = await job_status_store.get(job_id) or {}
+        status = live.get("state", row[1])
+        progress = live.get("progress", row[2])
+        metadata = live.get("metadata", {})
         message = None
         error_message = None
 
         if status == "queued":
             message = "Job is queued for processing"
         elif status == "running":
-            message = f"Job is in progress ({row[2]}% complete)"
+            message = metadata.get("current_phase") or f"Job is in progress ({progress}% complete)"
         elif status == "done":
             message = "Job completed successfully"
         elif status == "error":
@@ -314,12 +296,14 @@ def get_job_status_query(job_id: str = Query(..., description="Job ID to check")
         return {
             "job_id": row[0],
             "status": status,
-            "progress": row[2],
-            "progress_pct": row[2],  # Alternative field name
+            "progress": progress,
+            "progress_pct": progress,  # Alternative field name
             "created_at": row[3],
-            "updated_at": row[3],
+            "updated_at": row[6] or row[3],
             "message": message,
             "error_message": error_message,
+            "current_phase": metadata.get("current_phase"),
+            "metadata": metadata,  # video_model, output_url... as reported by the worker
             "output_assets": None  # Placeholder for frontend compatibility
         }
 
@@ -331,10 +315,10 @@ def get_job_status_query(job_id: str = Query(..., description="Job ID to check")
 
 # NEW ENDPOINT 1B: Status with path parameter (REST-compliant)
 @app.get("/api/status/{job_id}")
-def get_job_status_path(job_id: str):
+async def get_job_status_path(job_id: str):
     """Get job status using path parameter - REST-compliant endpoint"""
     # Reuse the same logic as query parameter version
-    return get_job_status_query(job_id=job_id)
+    return await get_job_status_query(job_id=job_id)
 
 
 # NEW ENDPOINT 2: Jobs Hub (for frontend Jobs Hub page)
@@ -348,67 +332,93 @@ def get_credits_balance():
         "currency": "credits"
     }
 
+def _hub_job(row) -> Dict[str, Any]:
+    """Jobs Hub entry for a jobs-table row"""
+    job_id, state, progress, created_at, job_type = row[0], row[1], row[2], row[3], row[4]
+
+    # Calculate duration if available (placeholder)
+    duration = None
+    if job_type in ["quick_create", "quick_create_full_universe"]:
+        # Extract duration from job type or use default
+        duration = 30  # placeholder
+
+    return {
+        "job_id": job_id,
+        "status": state,
+        "progress": progress,
+        "progress_pct": progress,
+        "type": job_type,
+        "created_at": created_at,
+        "updated_at": row[6] or created_at,
+        "duration": duration,
+        "message": f"Job {job_id} - {state}"
+    }
+
 @app.get("/api/jobs-hub")
 @app.get("/api/jobs-hub")
-def get_jobs_hub():
+async def get_jobs_hub(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    state: Optional[str] = None,
+    job_type: Optional[str] = None,
+    user_id: Optional[str] = None
+):
     """Get all jobs for Jobs Hub frontend - includes quick-create-full-universe jobs"""
     try:
-        conn = get_conn()
-        cursor = conn.execute("""
-            SELECT job_id, state, progress, created_at
-            FROM jobs
-            ORDER BY created_at DESC
-            LIMIT 100
-        """)
-
-        jobs = []
-        for row in cursor.fetchall():
-            job_id = row[0]
-            state = row[1]
-            progress = row[2]
-            created_at = row[3]
-
-            # Determine job type from job_id prefix
-            job_type = "unknown"
-            if job_id.startswith("qc_"):
-                job_type = "quick_create"
-            elif job_id.startswith("qcf_"):
-                job_type = "quick_create_full_universe"
-            elif job_id.startswith("compose-"):
-                job_type = "compose"
-            elif job_id.startswith("render-"):
-                job_type = "render"
-            elif job_id.startswith("tts-"):
-                job_type = "tts"
-
-            # Calculate duration if available (placeholder)
-            duration = None
-            if job_type in ["quick_create", "quick_create_full_universe"]:
-                # Extract duration from job type or use default
-                duration = 30  # placeholder
-
-            jobs.append({
-                "job_id": job_id,
-                "status": state,
-                "progress": progress,
-                "progress_pct": progress,
-                "type": job_type,
-                "created_at": created_at,
-                "updated_at": created_at,
-                "duration": duration,
-                "message": f"Job {job_id} - {state}"
-            })
+        # Taken before the listing so a change racing with it shows up in the next delta
+        changes_cursor = await storage.get_changes_cursor()
+        rows, next_cursor = await storage.list_jobs_page(
+            limit, cursor, state=state, job_type=job_type, user_id=user_id
+        )
+        jobs = [_hub_job(row) for row in rows]
 
-        conn.close()
         return {
             "jobs": jobs,
-            "total": len(jobs)
+            "total": len(jobs),
+            "next_cursor": next_cursor,
+            "changes_cursor": changes_cursor
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         log.exception("Failed to list jobs")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/jobs-hub/changes")
+async def get_jobs_hub_changes(
+    since: str = Query(..., description="changes_cursor of the Jobs Hub list or cursor of the previous poll"),
+    limit: int = Query(500, ge=1, le=1000)
+):
+    """
+    Jobs Hub entries written after `since`, so polling clients only fetch what changed.
+
+    Jobs deleted or archived since then come back with status "deleted" or
+    "archived" and should be dropped from the list.
+    """
+    try:
+        rows, cursor = await storage.list_job_changes(since, limit)
+        return {
+            "jobs": [_hub_job(row) for row in rows],
+            "cursor": cursor,
+            "has_more": len(rows) == limit
+        }
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        log.exception("Failed to list job changes")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs-hub/stats")
+async def get_jobs_hub_stats(user_id: Optional[str] = None):
+    """Job counts per state and job type (and per state for one user), read from maintained counters"""
+    try:
+        return await storage.get_job_stats(user_id)
+    except Exception as e:
+        log.exception("Failed to get job stats")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/api/quick-create-full-universe", response_model=QuickCreateResponse)
 async def quick_create_full_universe(request: QuickCreateRequest):
     try:
@@ -447,64 +457,85 @@ async def quick_create_full_universe(request: QuickCreateRequest):
         log.exception("Failed to create quick create full universe job")
         raise HTTPException(status_code=500, detail=f"Failed to create job: {str(e)}")
 
+@app.post("/api/quick-create-full-universe/batch")
+async def quick_create_full_universe_batch(request: QuickCreateBatchRequest, _k=Depends(require_api_key)):
+    """Queue many full universe jobs at once (bulk credits, one DB transaction, one Redis pipeline)"""
+    try:
+        jobs = [
+            ("quick_create_full_universe", {"job_id": f"qcf-{uuid.uuid4().hex[:12]}", "request": item.dict()})
+            for item in request.items
+        ]
+
+        # Low priority so batch submissions never delay interactive jobs
+        results = await enterprise_job_manager.enqueue_jobs(jobs, priority=JobPriority.LOW)
+
+        queued = sum(1 for result in results if result["status"] == "queued")
+        log.info(f"Quick Create Full Universe batch: {queued}/{len(results)} jobs queued")
+
+        return {
+            "results": results,
+            "queued": queued,
+            "rejected": len(results) - queued
+        }
+
+    except Exception as e:
+        log.exception("Failed to create quick create full universe batch")
+        raise HTTPException(status_code=500, detail=f"Failed to create jobs: {str(e)}")
+
 @app.post("/api/compose")
 async def compose_api(compose_data: dict, _k=Depends(require_api_key)):
     try:
         job_id = compose_data.get("job_id", f"compose-{uuid.uuid4().hex[:12]}")
-        conn = get_conn()
-        upsert_job(conn, job_id, "compose", 0)
+        await storage.upsert_job(job_id, "queued", 0, job_type="compose")
         queue.put_nowait({"type": "compose", "payload": {"job_id": job_id, **compose_data}})
-        conn.close()
         return {"job_id": job_id, "status": "queued"}
     except Exception as e:
         log.exception("Failed to queue compose job")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/jobs")
-def list_jobs(_k=Depends(require_api_key)):
+async def list_jobs(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    state: Optional[str] = None,
+    job_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    _k=Depends(require_api_key)
+):
     try:
-        conn = get_conn()
-        cursor = conn.execute("""
-            SELECT job_id, state, progress, created_at
-            FROM jobs
-            ORDER BY created_at DESC
-            LIMIT 100
-        """)
+        rows, next_cursor = await storage.list_jobs_page(
+            limit, cursor, state=state, job_type=job_type, user_id=user_id
+        )
 
         jobs = []
-        for row in cursor.fetchall():
+        for row in rows:
             jobs.append({
                 "job_id": row[0],
                 "state": row[1],
                 "progress": row[2],
                 "created_at": row[3],
-                "updated_at": row[3]
+                "updated_at": row[6] or row[3]
             })
-        conn.close()
-        return {"jobs": jobs}
+        return {"jobs": jobs, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         log.exception("Failed to list jobs")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/jobs/{job_id}")
-def get_job_status_path(job_id: str, _k=Depends(require_api_key)):
+async def get_job_status_path(job_id: str, _k=Depends(require_api_key)):
     try:
-        conn = get_conn()
-        cursor = conn.execute("""
-            SELECT job_id, state, progress, created_at
-            FROM jobs
-            WHERE job_id = ?
-        """, (job_id,))
-        row = cursor.fetchone()
-        conn.close()
+        row = await storage.get_job(job_id)
         if not row:
             raise HTTPException(status_code=404, detail="Job not found")
+        state, progress = await job_status_store.overlay(job_id, row[1], row[2])
         return {
             "job_id": row[0],
-            "state": row[1],
-            "progress": row[2],
+            "state": state,
+            "progress": progress,
             "created_at": row[3],
-            "updated_at": row[3]
+            "updated_at": row[6] or row[3]
         }
     except HTTPException:
         raise
@@ -538,21 +569,10 @@ async def delete_job(request: DeleteJobRequest, _k=Depends(require_api_key)):
     try:
         job_id = request.job_id
 
-        # Check if job exists first
-        conn = get_conn()
-        cursor = conn.execute("SELECT job_id FROM jobs WHERE job_id = ?", (job_id,))
-        job_exists = cursor.fetchone()
-
-        if not job_exists:
-            conn.close()
+        deleted_rows = await storage.delete_job(job_id)
+        if deleted_rows is None:
             raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
 
-        # Delete the job from database
-        cursor = conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
-        deleted_rows = cursor.rowcount
-        conn.commit()
-        conn.close()
-
         if deleted_rows > 0:
             log.info(f"✅ Job {job_id} deleted successfully from database")
             return {
@@ -574,21 +594,10 @@ async def delete_job(request: DeleteJobRequest, _k=Depends(require_api_key)):
 async def delete_job_by_id(job_id: str, _k=Depends(require_api_key)):
     """Delete a job from the database permanently by job_id in URL"""
     try:
-        # Check if job exists first
-        conn = get_conn()
-        cursor = conn.execute("SELECT job_id FROM jobs WHERE job_id = ?", (job_id,))
-        job_exists = cursor.fetchone()
-
-        if not job_exists:
-            conn.close()
+        deleted_rows = await storage.delete_job(job_id)
+        if deleted_rows is None:
             raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
 
-        # Delete the job from database
-        cursor = conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
-        deleted_rows = cursor.rowcount
-        conn.commit()
-        conn.close()
-
         if deleted_rows > 0:
             log.info(f"✅ Job {job_id} deleted successfully from database via DELETE")
             return {
@@ -604,4 +613,53 @@ async def delete_job_by_id(job_id: str, _k=Depends(require_api_key)):
         raise
     except Exception as e:
         log.exception(f"Failed to delete job {job_id}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, _k=Depends(require_api_key)):
+    """Cancel a queued or running job, wherever it is running"""
+    try:
+        if not await enterprise_job_manager.cancel_job(job_id):
+            raise HTTPException(status_code=409, detail=f"Job {job_id} is not queued, processing or running")
+        return {"job_id": job_id, "status": "cancelled"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception(f"Failed to cancel job {job_id}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/dead-letters")
+async def list_dead_letters(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    _k=Depends(require_api_key)
+):
+    """List jobs that exhausted their retries, most recent first"""
+    try:
+        return {
+            "total": await retry_scheduler.count_dead_letters(),
+            "items": await retry_scheduler.list_dead_letters(offset, limit)
+        }
+    except Exception as e:
+        log.exception("Failed to list dead-lettered jobs")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/dead-letters/{job_id}/replay")
+async def replay_dead_letter(job_id: str, _k=Depends(require_api_key)):
+    """Re-queue a dead-lettered job with a fresh retry budget"""
+    try:
+        if not await retry_scheduler.replay_dead_letter(job_id):
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found in dead-letter queue")
+
+        await job_status_store.set_state(job_id, "queued", 0)
+
+        log.info(f"♻️ Job {job_id} replayed from dead-letter queue")
+        return {"job_id": job_id, "status": "queued"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception(f"Failed to replay job {job_id}")
+        raise HTTPException(status_code=500, detail=str(e))
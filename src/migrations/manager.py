@@ -1,7 +1,22 @@
+"""
+Schema migrations with version tracking and rollback.
+
+Plain migrations run their SQL in one go. An OnlineMigration instead runs a
+list of steps, each in its own short transaction, so the API and worker keep
+writing while it runs:
+
+- a SQL string runs atomically (DDL, table swaps, triggers);
+- a Backfill copies or rewrites a table in key-range chunks of
+  MIGRATION_BATCH_SIZE rows, sleeping MIGRATION_THROTTLE_MS between chunks.
+
+Progress is committed with each step and chunk in schema_migration_progress,
+so an interrupted migration resumes where it stopped when run again. Dry runs
+estimate the rows and time of each online migration.
+"""
 import sqlite3
 import time
 import hashlib
-from typing import List, Dict, Optional, Callable, Any
+from typing import List, Dict, Optional, Callable, Any, Sequence, Tuple, Union
 from pathlib import Path
 from contextlib import contextmanager
 import logging
@@ -16,13 +31,17 @@ class Migration:
                  upgrade_sql: Optional[str] = None,
                  downgrade_sql: Optional[str] = None,
                  upgrade_func: Optional[Callable] = None,
-                 downgrade_func: Optional[Callable] = None):
+                 downgrade_func: Optional[Callable] = None,
+                 previous_checksums: Sequence[str] = ()):
         self.version = version
         self.description = description
         self.upgrade_sql = upgrade_sql
         self.downgrade_sql = downgrade_sql
         self.upgrade_func = upgrade_func
         self.downgrade_func = downgrade_func
+        # Checksums of earlier, equivalent definitions (e.g. a rewritten downgrade);
+        # a database that recorded one of them is updated instead of failing integrity
+        self.previous_checksums = set(previous_checksums)
         self.created_at = int(time.time())
 
     def upgrade(self, conn: sqlite3.Connection) -> None:
@@ -59,9 +78,219 @@ class Migration:
         else:
             raise Exception(f"Migration {self.version} has no downgrade defined")
 
+    def has_upgrade(self) -> bool:
+        return bool(self.upgrade_sql or self.upgrade_func)
+
+    def checksum_content(self) -> str:
+        return (self.upgrade_sql or "") + (self.downgrade_sql or "")
+
     def __repr__(self):
         return f"Migration({self.version}: {self.description})"
 
+# (version, step label, rows done, rows total) after each backfill chunk
+ProgressCallback = Callable[[str, str, int, int], None]
+
+PROGRESS_TABLE = "schema_migration_progress"
+
+def _ensure_progress_table(conn: sqlite3.Connection):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PROGRESS_TABLE} (
+            version TEXT NOT NULL,
+            direction TEXT NOT NULL,
+            step INTEGER NOT NULL,
+            last_key INTEGER,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0,
+            updated_at INTEGER NOT NULL,
+            PRIMARY KEY (version, direction, step)
+        )
+    """)
+    conn.commit()
+
+def _split_statements(sql: str) -> List[str]:
+    """Split a script into statements (trigger bodies stay whole) so it can run in one transaction"""
+    statements, current = [], ""
+    for piece in sql.split(";"):
+        current += piece + ";"
+        if sqlite3.complete_statement(current):
+            statements.append(current.strip())
+            current = ""
+    return statements
+
+class Backfill:
+    """A table rewrite run in key-range chunks, one short transaction each
+
+    `sql` runs once per chunk with :lo (exclusive) and :hi (inclusive) bound to
+    the chunk's range of `key`, which must be an integer column (rowid by
+    default), e.g. "INSERT OR IGNORE INTO jobs_rebuild SELECT ... FROM jobs
+    WHERE rowid > :lo AND rowid <= :hi".
+    """
+
+    def __init__(self, table: str, sql: str, key: str = "rowid"):
+        self.table = table
+        self.sql = sql
+        self.key = key
+
+    def next_chunk(self, conn: sqlite3.Connection, lo: int, size: int) -> Tuple[Optional[int], int]:
+        """(hi, rows) of the chunk after `lo`; hi is None when the table is done"""
+        row = conn.execute(
+            f"SELECT MAX(k), COUNT(*) FROM (SELECT {self.key} AS k FROM {self.table} "
+            f"WHERE {self.key} > ? ORDER BY {self.key} LIMIT ?)", (lo, size)
+        ).fetchone()
+        return row[0], row[1]
+
+    def remaining(self, conn: sqlite3.Connection, lo: int) -> int:
+        return conn.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {self.key} > ?", (lo,)).fetchone()[0]
+
+    def __repr__(self):
+        return f"Backfill({self.table})"
+
+Step = Union[str, Backfill]
+
+# Below any rowid
+_FIRST_KEY = -(2 ** 63)
+
+class OnlineMigration(Migration):
+    """Migration run as resumable steps that never hold the write lock for long"""
+
+    def __init__(self, version: str, description: str, upgrade_steps: Sequence[Step],
+                 downgrade_steps: Optional[Sequence[Step]] = None,
+                 batch_size: Optional[int] = None, throttle_ms: Optional[float] = None,
+                 previous_checksums: Sequence[str] = ()):
+        super().__init__(version, description, previous_checksums=previous_checksums)
+        self.upgrade_steps = list(upgrade_steps)
+        self.downgrade_steps = list(downgrade_steps or [])
+        # Default to MIGRATION_BATCH_SIZE / MIGRATION_THROTTLE_MS when run
+        self.batch_size = batch_size
+        self.throttle_ms = throttle_ms
+
+    def has_upgrade(self) -> bool:
+        return bool(self.upgrade_steps)
+
+    def _chunking(self) -> Tuple[int, float]:
+        """(rows per chunk, seconds to sleep between chunks)"""
+        throttle_ms = self.throttle_ms if self.throttle_ms is not None else settings.MIGRATION_THROTTLE_MS
+        return self.batch_size or settings.MIGRATION_BATCH_SIZE, throttle_ms / 1000
+
+    def checksum_content(self) -> str:
+        return "".join(step if isinstance(step, str) else step.table + step.sql
+                       for step in self.upgrade_steps + self.downgrade_steps)
+
+    def upgrade(self, conn: sqlite3.Connection, on_progress: Optional[ProgressCallback] = None) -> None:
+        log.info(f"Executing online migration {self.version}: {self.description}")
+        self._run("upgrade", self.upgrade_steps, conn, on_progress)
+
+    def downgrade(self, conn: sqlite3.Connection, on_progress: Optional[ProgressCallback] = None) -> None:
+        if not self.downgrade_steps:
+            raise Exception(f"Migration {self.version} has no downgrade defined")
+        log.info(f"Rolling back online migration {self.version}: {self.description}")
+        self._run("downgrade", self.downgrade_steps, conn, on_progress)
+
+    def _run(self, direction: str, steps: List[Step], conn: sqlite3.Connection,
+             on_progress: Optional[ProgressCallback]):
+        _ensure_progress_table(conn)
+        batch_size, throttle = self._chunking()
+
+        for index, step in enumerate(steps):
+            last_key, rows_done, done = self._load_progress(conn, direction, index)
+            if done:
+                continue
+
+            if isinstance(step, str):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for statement in _split_statements(step):
+                        conn.execute(statement)
+                    self._save_progress(conn, direction, index, None, 0, done=True)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                continue
+
+            label = f"{direction} step {index + 1}/{len(steps)} ({step.table})"
+            lo = last_key if last_key is not None else _FIRST_KEY
+            total = rows_done + step.remaining(conn, lo)
+            if rows_done:
+                log.info(f"Resuming migration {self.version} {label} at {rows_done}/{total} rows")
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    hi, rows = step.next_chunk(conn, lo, batch_size)
+                    if hi is not None:
+                        conn.execute(step.sql, {"lo": lo, "hi": hi})
+                        lo, rows_done = hi, rows_done + rows
+                    # The chunk commits with its progress row, so a resumed backfill never repeats one
+                    self._save_progress(conn, direction, index, lo, rows_done, done=hi is None)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                if hi is None:
+                    break
+
+                log.info(f"Migration {self.version} {label}: {rows_done}/{total} rows")
+                if on_progress:
+                    on_progress(self.version, label, rows_done, total)
+                if throttle > 0:
+                    # Let the application's writers in between chunks
+                    time.sleep(throttle)
+
+    def _save_progress(self, conn: sqlite3.Connection, direction: str, index: int,
+                       last_key: Optional[int], rows_done: int, done: bool):
+        conn.execute(f"""
+            INSERT OR REPLACE INTO {PROGRESS_TABLE} (version, direction, step, last_key, rows_done, done, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (self.version, direction, index, last_key, rows_done, int(done), int(time.time())))
+
+    def _load_progress(self, conn: sqlite3.Connection, direction: str, index: int) -> Tuple[Optional[int], int, bool]:
+        row = conn.execute(
+            f"SELECT last_key, rows_done, done FROM {PROGRESS_TABLE} WHERE version = ? AND direction = ? AND step = ?",
+            (self.version, direction, index)
+        ).fetchone()
+        return (row[0], row[1], bool(row[2])) if row else (None, 0, False)
+
+    def estimate(self, conn: sqlite3.Connection, direction: str = "upgrade") -> Dict[str, Any]:
+        """Rows to backfill and a time estimate, timing one chunk per backfill in a rolled-back transaction"""
+        _ensure_progress_table(conn)
+        steps = self.upgrade_steps if direction == "upgrade" else self.downgrade_steps
+        batch_size, throttle = self._chunking()
+        rows = chunks = 0
+        seconds = 0.0
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for index, step in enumerate(steps):
+                last_key, _, done = self._load_progress(conn, direction, index)
+                if done:
+                    continue
+                start = time.perf_counter()
+                if isinstance(step, str):
+                    for statement in _split_statements(step):
+                        conn.execute(statement)
+                    seconds += time.perf_counter() - start
+                    continue
+                lo = last_key if last_key is not None else _FIRST_KEY
+                remaining = step.remaining(conn, lo)
+                hi, sample_rows = step.next_chunk(conn, lo, batch_size)
+                if hi is not None:
+                    conn.execute(step.sql, {"lo": lo, "hi": hi})
+                    per_row = (time.perf_counter() - start) / sample_rows
+                    step_chunks = -(-remaining // batch_size)
+                    seconds += remaining * per_row + step_chunks * throttle
+                    rows += remaining
+                    chunks += step_chunks
+        finally:
+            conn.rollback()
+
+        return {
+            'version': self.version,
+            'direction': direction,
+            'rows': rows,
+            'chunks': chunks,
+            'estimated_seconds': round(seconds, 2)
+        }
+
 class MigrationManager:
     """Database migration manager with version tracking and rollback"""
 
@@ -84,11 +313,13 @@ class MigrationManager:
                 )
             """)
             conn.commit()
+            _ensure_progress_table(conn)
 
     @contextmanager
     def _get_connection(self):
         """Get a database connection"""
-        conn = sqlite3.connect(self.db_path)
+        # Online migrations share the database with running writers; wait for the lock like core.db does
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
         conn.row_factory = sqlite3.Row
         try:
             yield conn
@@ -139,13 +370,15 @@ class MigrationManager:
             cursor.execute(f"DELETE FROM {self.migrations_table} WHERE version = ?", (version,))
             conn.commit()
 
+    def clear_progress(self, version: str):
+        """Forget the step progress of a finished (or abandoned) online migration"""
+        with self._get_connection() as conn:
+            conn.execute(f"DELETE FROM {PROGRESS_TABLE} WHERE version = ?", (version,))
+            conn.commit()
+
     def _get_migration_checksum(self, migration: Migration) -> str:
         """Generate checksum for migration integrity checking"""
-        content = f"{migration.version}:{migration.description}"
-        if migration.upgrade_sql:
-            content += migration.upgrade_sql
-        if migration.downgrade_sql:
-            content += migration.downgrade_sql
+        content = f"{migration.version}:{migration.description}" + migration.checksum_content()
 
         return hashlib.sha256(content.encode()).hexdigest()[:16]
 
@@ -155,13 +388,34 @@ class MigrationManager:
         if not applied_info:
             return True  # Not applied yet
 
-        current_checksum = self._get_migration_checksum(migration)
-        return applied_info['checksum'] == current_checksum
+        if applied_info['checksum'] in migration.previous_checksums:
+            return True  # Equivalent earlier definition; run_migrations re-records it
+        return applied_info['checksum'] == self._get_migration_checksum(migration)
+
+    def _update_previous_checksums(self, migrations: List[Migration]) -> int:
+        """Re-record applied migrations stored under one of their previous checksums; returns how many"""
+        updated = 0
+        with self._get_connection() as conn:
+            recorded = dict(conn.execute(f"SELECT version, checksum FROM {self.migrations_table}").fetchall())
+            for migration in migrations:
+                if recorded.get(migration.version) not in migration.previous_checksums:
+                    continue
+                conn.execute(f"UPDATE {self.migrations_table} SET checksum = ? WHERE version = ?",
+                             (self._get_migration_checksum(migration), migration.version))
+                log.info(f"Migration {migration.version}: recorded checksum {recorded[migration.version]} "
+                         f"updated to its current definition")
+                updated += 1
+            conn.commit()
+        return updated
 
     def run_migrations(self, migrations: List[Migration],
                        target_version: Optional[str] = None,
-                       dry_run: bool = False) -> Dict[str, Any]:
-        """Run pending migrations up to target version"""
+                       dry_run: bool = False,
+                       on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Run pending migrations up to target version; an interrupted online migration resumes"""
+        if not dry_run:
+            self._update_previous_checksums(migrations)
+
         applied_versions = set(self.get_applied_migrations())
         migration_map = {m.version: m for m in migrations}
 
@@ -188,6 +442,7 @@ class MigrationManager:
                 'migrations_applied': len(pending_migrations),
                 'execution_time_ms': 0,
                 'pending_migrations': [m.version for m in pending_migrations],
+                'estimates': self._estimate(pending_migrations, "upgrade"),
                 'message': f'Would apply {len(pending_migrations)} migrations'
             }
 
@@ -202,9 +457,14 @@ class MigrationManager:
             start_time = time.time()
 
             try:
-                migration.upgrade(self._get_connection().__enter__())
+                with self._get_connection() as conn:
+                    if isinstance(migration, OnlineMigration):
+                        migration.upgrade(conn, on_progress=on_progress)
+                    else:
+                        migration.upgrade(conn)
                 execution_time = int((time.time() - start_time) * 1000)
                 self.record_migration(migration, execution_time)
+                self.clear_progress(migration.version)
 
                 total_time += execution_time
                 applied_count += 1
@@ -225,7 +485,8 @@ class MigrationManager:
 
     def rollback_to_version(self, migrations: List[Migration],
                           target_version: str,
-                          dry_run: bool = False) -> Dict[str, Any]:
+                          dry_run: bool = False,
+                          on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """Rollback migrations to target version"""
         applied_versions = set(self.get_applied_migrations())
         migration_map = {m.version: m for m in migrations}
@@ -250,6 +511,7 @@ class MigrationManager:
                 'migrations_rolled_back': len(rollback_migrations),
                 'execution_time_ms': 0,
                 'rollback_migrations': [m.version for m in rollback_migrations],
+                'estimates': self._estimate(rollback_migrations, "downgrade"),
                 'message': f'Would rollback {len(rollback_migrations)} migrations to {target_version}'
             }
 
@@ -261,9 +523,14 @@ class MigrationManager:
             start_time = time.time()
 
             try:
-                migration.downgrade(self._get_connection().__enter__())
+                with self._get_connection() as conn:
+                    if isinstance(migration, OnlineMigration):
+                        migration.downgrade(conn, on_progress=on_progress)
+                    else:
+                        migration.downgrade(conn)
                 execution_time = int((time.time() - start_time) * 1000)
                 self.remove_migration_record(migration.version)
+                self.clear_progress(migration.version)
 
                 total_time += execution_time
                 rolled_back_count += 1
@@ -282,12 +549,33 @@ class MigrationManager:
             'message': f'Rolled back {rolled_back_count} migrations to {target_version}'
         }
 
+    def _estimate(self, migrations: List[Migration], direction: str) -> List[Dict[str, Any]]:
+        """Row and time estimates for the online migrations among `migrations`
+
+        Each times one real chunk per backfill in a rolled-back transaction. The
+        migrations ahead of it are not applied first, so an estimate that needs
+        their schema reports the error instead.
+        """
+        estimates = []
+        with self._get_connection() as conn:
+            for migration in migrations:
+                if not isinstance(migration, OnlineMigration):
+                    continue
+                try:
+                    estimates.append(migration.estimate(conn, direction))
+                except sqlite3.Error as e:
+                    estimates.append({'version': migration.version, 'direction': direction, 'error': str(e)})
+        return estimates
+
     def get_migration_status(self, migrations: List[Migration]) -> Dict[str, Any]:
         """Get current migration status"""
         applied_versions = set(self.get_applied_migrations())
         migration_map = {m.version: m for m in migrations}
 
         current_version = max(applied_versions) if applied_versions else '0'
+        with self._get_connection() as conn:
+            # Online migrations interrupted part-way; running them again resumes
+            in_progress = {row[0] for row in conn.execute(f"SELECT DISTINCT version FROM {PROGRESS_TABLE}")}
 
         pending = []
         applied = []
@@ -304,7 +592,8 @@ class MigrationManager:
             else:
                 pending.append({
                     'version': migration.version,
-                    'description': migration.description
+                    'description': migration.description,
+                    'in_progress': migration.version in in_progress
                 })
 
         return {
@@ -334,7 +623,7 @@ class MigrationManager:
                 issues.append(f"Migration {migration.version}: Invalid version format")
 
             # Check for required upgrade
-            if not migration.upgrade_sql and not migration.upgrade_func:
+            if not migration.has_upgrade():
                 issues.append(f"Migration {migration.version}: No upgrade defined")
 
             # Check description
@@ -7,7 +7,7 @@ Migration versioning scheme: MAJOR.MINOR.PATCH
 - PATCH: Indexes, constraints, or performance changes
 """
 
-from .manager import Migration
+from .manager import Backfill, Migration, OnlineMigration
 
 # Migration definitions
 MIGRATIONS = [
@@ -112,67 +112,127 @@ MIGRATIONS = [
         """
     ),
 
-    Migration(
+    OnlineMigration(
         version="1.1.0",
         description="Add job metadata and render statistics",
-        upgrade_sql="""
-        -- Add metadata columns to jobs table
-        ALTER TABLE jobs ADD COLUMN job_type TEXT DEFAULT 'quick_create';
-        ALTER TABLE jobs ADD COLUMN config_json TEXT;
-        ALTER TABLE jobs ADD COLUMN error_message TEXT;
-        ALTER TABLE jobs ADD COLUMN retry_count INTEGER DEFAULT 0;
-        ALTER TABLE jobs ADD COLUMN priority INTEGER DEFAULT 0;
+        upgrade_steps=[
+            """
+            -- Add metadata columns to jobs table
+            ALTER TABLE jobs ADD COLUMN job_type TEXT DEFAULT 'quick_create';
+            ALTER TABLE jobs ADD COLUMN config_json TEXT;
+            ALTER TABLE jobs ADD COLUMN error_message TEXT;
+            ALTER TABLE jobs ADD COLUMN retry_count INTEGER DEFAULT 0;
+            ALTER TABLE jobs ADD COLUMN priority INTEGER DEFAULT 0;
 
-        -- Add metadata columns to renders table
-        ALTER TABLE renders ADD COLUMN processing_time_ms INTEGER;
-        ALTER TABLE renders ADD COLUMN file_size INTEGER;
-        ALTER TABLE renders ADD COLUMN thumbnail_url TEXT;
-        ALTER TABLE renders ADD COLUMN metadata_json TEXT;
+            -- Add metadata columns to renders table
+            ALTER TABLE renders ADD COLUMN processing_time_ms INTEGER;
+            ALTER TABLE renders ADD COLUMN file_size INTEGER;
+            ALTER TABLE renders ADD COLUMN thumbnail_url TEXT;
+            ALTER TABLE renders ADD COLUMN metadata_json TEXT;
 
-        -- Create indexes for new columns
-        CREATE INDEX IF NOT EXISTS idx_jobs_type ON jobs(job_type);
-        CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs(priority DESC);
-        CREATE INDEX IF NOT EXISTS idx_jobs_retry_count ON jobs(retry_count);
-        CREATE INDEX IF NOT EXISTS idx_renders_processing_time ON renders(processing_time_ms);
-        """,
-        downgrade_sql="""
-        -- Drop new indexes
-        DROP INDEX IF EXISTS idx_jobs_type;
-        DROP INDEX IF EXISTS idx_jobs_priority;
-        DROP INDEX IF EXISTS idx_jobs_retry_count;
-        DROP INDEX IF EXISTS idx_renders_processing_time;
+            -- Create indexes for new columns
+            CREATE INDEX IF NOT EXISTS idx_jobs_type ON jobs(job_type);
+            CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs(priority DESC);
+            CREATE INDEX IF NOT EXISTS idx_jobs_retry_count ON jobs(retry_count);
+            CREATE INDEX IF NOT EXISTS idx_renders_processing_time ON renders(processing_time_ms);
+            """
+        ],
+        # Recorded by 1.1.0 as a plain Migration, then by the first online downgrade;
+        # the upgrade only differs from those in indentation
+        previous_checksums=["e9b5161894739df9", "32c877da2d6c5d26"],
+        # SQLite can't drop these columns, so the downgrade rebuilds both tables online:
+        # triggers mirror live writes into the new table while a Backfill copies the
+        # existing rows in chunks, then a short transaction swaps the tables
+        downgrade_steps=[
+            """
+            -- Drop new indexes
+            DROP INDEX IF EXISTS idx_jobs_type;
+            DROP INDEX IF EXISTS idx_jobs_priority;
+            DROP INDEX IF EXISTS idx_jobs_retry_count;
+            DROP INDEX IF EXISTS idx_renders_processing_time;
 
-        -- Remove new columns (SQLite doesn't support DROP COLUMN, so recreate table)
-        CREATE TABLE jobs_backup AS SELECT job_id, state, progress, created_at, updated_at FROM jobs;
-        DROP TABLE jobs;
-        CREATE TABLE jobs (
-            job_id TEXT PRIMARY KEY,
-            state TEXT NOT NULL CHECK (state IN ('queued', 'processing', 'completed', 'error', 'cancelled')),
-            progress INTEGER DEFAULT 0 CHECK (progress >= 0 AND progress <= 100),
-            created_at INTEGER NOT NULL,
-            updated_at INTEGER,
-            CONSTRAINT valid_progress CHECK (progress >= 0 AND progress <= 100)
-        );
-        INSERT INTO jobs SELECT * FROM jobs_backup;
-        DROP TABLE jobs_backup;
+            -- No state/status value CHECKs: tables created by models.dao hold 'running', 'done', ...
+            -- and a rejected row would drop a job from the copy or abort a live write
+            CREATE TABLE IF NOT EXISTS jobs_rebuild (
+                job_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                progress INTEGER DEFAULT 0 CHECK (progress >= 0 AND progress <= 100),
+                created_at INTEGER NOT NULL,
+                updated_at INTEGER,
+                CONSTRAINT valid_progress CHECK (progress >= 0 AND progress <= 100)
+            );
+            CREATE TRIGGER IF NOT EXISTS jobs_rebuild_insert AFTER INSERT ON jobs BEGIN
+                INSERT OR REPLACE INTO jobs_rebuild VALUES (NEW.job_id, NEW.state, NEW.progress, NEW.created_at, NEW.updated_at);
+            END;
+            CREATE TRIGGER IF NOT EXISTS jobs_rebuild_update AFTER UPDATE ON jobs BEGIN
+                DELETE FROM jobs_rebuild WHERE job_id = OLD.job_id;
+                INSERT OR REPLACE INTO jobs_rebuild VALUES (NEW.job_id, NEW.state, NEW.progress, NEW.created_at, NEW.updated_at);
+            END;
+            CREATE TRIGGER IF NOT EXISTS jobs_rebuild_delete AFTER DELETE ON jobs BEGIN
+                DELETE FROM jobs_rebuild WHERE job_id = OLD.job_id;
+            END;
 
-        CREATE TABLE renders_backup AS SELECT job_id, item_id, hash, quality, url, status, created_at, updated_at FROM renders;
-        DROP TABLE renders;
-        CREATE TABLE renders (
-            job_id TEXT NOT NULL,
-            item_id TEXT NOT NULL,
-            hash TEXT NOT NULL,
-            quality TEXT NOT NULL CHECK (quality IN ('low', 'medium', 'high', 'ultra')),
-            url TEXT,
-            status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'processing', 'completed', 'error')),
-            created_at INTEGER DEFAULT (strftime('%s', 'now')),
-            updated_at INTEGER DEFAULT (strftime('%s', 'now')),
-            PRIMARY KEY (job_id, item_id),
-            FOREIGN KEY (job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
-        );
-        INSERT INTO renders SELECT * FROM renders_backup;
-        DROP TABLE renders_backup;
-        """
+            CREATE TABLE IF NOT EXISTS renders_rebuild (
+                job_id TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                hash TEXT,
+                quality TEXT,
+                url TEXT,
+                status TEXT DEFAULT 'pending',
+                created_at INTEGER DEFAULT (strftime('%s', 'now')),
+                updated_at INTEGER DEFAULT (strftime('%s', 'now')),
+                PRIMARY KEY (job_id, item_id),
+                FOREIGN KEY (job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
+            );
+            CREATE TRIGGER IF NOT EXISTS renders_rebuild_insert AFTER INSERT ON renders BEGIN
+                INSERT OR REPLACE INTO renders_rebuild VALUES (NEW.job_id, NEW.item_id, NEW.hash, NEW.quality, NEW.url,
+                                                               NEW.status, NEW.created_at, NEW.updated_at);
+            END;
+            CREATE TRIGGER IF NOT EXISTS renders_rebuild_update AFTER UPDATE ON renders BEGIN
+                DELETE FROM renders_rebuild WHERE job_id = OLD.job_id AND item_id = OLD.item_id;
+                INSERT OR REPLACE INTO renders_rebuild VALUES (NEW.job_id, NEW.item_id, NEW.hash, NEW.quality, NEW.url,
+                                                               NEW.status, NEW.created_at, NEW.updated_at);
+            END;
+            CREATE TRIGGER IF NOT EXISTS renders_rebuild_delete AFTER DELETE ON renders BEGIN
+                DELETE FROM renders_rebuild WHERE job_id = OLD.job_id AND item_id = OLD.item_id;
+            END;
+            """,
+            # Rows the triggers already mirrored are newer than the copy, so skip exactly
+            # those; any other row that does not fit fails the step instead of vanishing
+            Backfill("jobs", """
+                INSERT INTO jobs_rebuild
+                SELECT job_id, state, progress, created_at, updated_at FROM jobs
+                WHERE rowid > :lo AND rowid <= :hi
+                  AND NOT EXISTS (SELECT 1 FROM jobs_rebuild r WHERE r.job_id = jobs.job_id)
+            """),
+            Backfill("renders", """
+                INSERT INTO renders_rebuild
+                SELECT job_id, item_id, hash, quality, url, status, created_at, updated_at FROM renders
+                WHERE rowid > :lo AND rowid <= :hi
+                  AND NOT EXISTS (SELECT 1 FROM renders_rebuild r
+                                  WHERE r.job_id = renders.job_id AND r.item_id = renders.item_id)
+            """),
+            """
+            -- Swap in the rebuilt tables (their triggers go with the old ones) and restore the 1.0.x indexes
+            DROP TABLE renders;
+            DROP TABLE jobs;
+            ALTER TABLE jobs_rebuild RENAME TO jobs;
+            ALTER TABLE renders_rebuild RENAME TO renders;
+
+            CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state);
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_state_created ON jobs(state, created_at);
+            CREATE INDEX IF NOT EXISTS idx_jobs_active ON jobs(created_at) WHERE state IN ('queued', 'processing');
+            CREATE INDEX IF NOT EXISTS idx_renders_job_id ON renders(job_id);
+            CREATE INDEX IF NOT EXISTS idx_renders_status ON renders(status);
+            CREATE INDEX IF NOT EXISTS idx_renders_hash ON renders(hash);
+            CREATE INDEX IF NOT EXISTS idx_renders_quality ON renders(quality);
+            CREATE INDEX IF NOT EXISTS idx_renders_job_quality ON renders(job_id, quality);
+            CREATE INDEX IF NOT EXISTS idx_renders_job_status ON renders(job_id, status);
+            CREATE INDEX IF NOT EXISTS idx_renders_completed ON renders(created_at) WHERE status = 'completed' AND url IS NOT NULL;
+            """
+        ]
     ),
 
     Migration(
@@ -1,4 +1,4 @@
-import sqlite3, time, json
+import sqlite3, time, json, base64, zlib
 
 def init_db(conn: sqlite3.Connection):
     cur = conn.cursor()
@@ -9,7 +9,9 @@ def init_db(conn: sqlite3.Connection):
         progress INTEGER,
         created_at INTEGER,
         job_type TEXT DEFAULT 'unknown',
-        payload TEXT DEFAULT '{}'
+        payload TEXT DEFAULT '{}',
+        user_id TEXT,
+        updated_at REAL
     )""")
     
     # Simple migration: Check if columns exist, if not add them
@@ -25,6 +27,28 @@ def init_db(conn: sqlite3.Connection):
         print("⚠️ Migrating jobs table: adding payload")
         cur.execute("ALTER TABLE jobs ADD COLUMN payload TEXT DEFAULT '{}'")
 
+    try:
+        cur.execute("SELECT user_id FROM jobs LIMIT 1")
+    except sqlite3.OperationalError:
+        print("⚠️ Migrating jobs table: adding user_id")
+        cur.execute("ALTER TABLE jobs ADD COLUMN user_id TEXT")
+        cur.execute("UPDATE jobs SET user_id = json_extract(payload, '$.user_id') WHERE json_valid(payload)")
+
+    try:
+        cur.execute("SELECT updated_at FROM jobs LIMIT 1")
+    except sqlite3.OperationalError:
+        print("⚠️ Migrating jobs table: adding updated_at")
+        cur.execute("ALTER TABLE jobs ADD COLUMN updated_at REAL")
+        cur.execute("UPDATE jobs SET updated_at = created_at")
+
+    # Listing is newest first, optionally filtered: (filter, created_at, job_id)
+    # lets a keyset page seek straight to its first row
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at, job_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_created ON jobs(state, created_at, job_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_type_created ON jobs(job_type, created_at, job_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at, job_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at)")
+
     cur.execute("""CREATE TABLE IF NOT EXISTS renders(
         job_id TEXT,
         item_id TEXT,
@@ -39,38 +63,373 @@ def init_db(conn: sqlite3.Connection):
         url TEXT,
         created_at INTEGER
     )""")
+    # Outputs of completed job phases, so a retried job resumes instead of starting over
+    cur.execute("""CREATE TABLE IF NOT EXISTS job_checkpoints(
+        job_id TEXT,
+        phase TEXT,
+        data TEXT DEFAULT '{}',
+        created_at INTEGER,
+        PRIMARY KEY(job_id, phase)
+    )""")
+    # Finished jobs moved out of `jobs` by archive_jobs: no secondary indexes and a zlib-compressed
+    # payload, so the hot table keeps only the jobs that are still being looked at
+    cur.execute("""CREATE TABLE IF NOT EXISTS jobs_archive(
+        job_id TEXT PRIMARY KEY,
+        state TEXT,
+        progress INTEGER,
+        created_at INTEGER,
+        job_type TEXT,
+        user_id TEXT,
+        updated_at REAL,
+        archived_at INTEGER,
+        payload BLOB
+    )""")
+    create_job_tombstones(conn)
+    create_job_stats(conn)
+    create_render_stats(conn)
     conn.commit()
 
-def upsert_job(conn, job_id:str, state:str, progress:int, job_type:str='unknown', payload:dict=None):
-    if payload is None: payload = {}
-    payload_json = json.dumps(payload)
-    
-    cur = conn.cursor()
-    # Check if job exists to preserve created_at if updating
-    cur.execute("SELECT created_at FROM jobs WHERE job_id = ?", (job_id,))
-    row = cur.fetchone()
-    
-    if row:
-        # Update
-        cur.execute(
-            "UPDATE jobs SET state=?, progress=?, job_type=?, payload=? WHERE job_id=?",
-            (state, progress, job_type, payload_json, job_id)
+def create_job_tombstones(conn):
+    # One row per job deleted or moved to the archive, stamped like a job write, so list_job_changes
+    # tells polling clients to drop it (state 'deleted' or 'archived'). archive_jobs prunes tombstones
+    # as old as the jobs it archives: a client polling less often than that must reload the list.
+    # Anything else writing to `jobs` (repositories.job) must stamp with UPDATED_AT and tombstone too
+    conn.execute("""CREATE TABLE IF NOT EXISTS job_tombstones(
+        job_id TEXT PRIMARY KEY,
+        state TEXT,
+        updated_at REAL
+    )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_tombstones_updated_at ON job_tombstones(updated_at)")
+
+# Job counters kept up to date by triggers on `jobs` and `jobs_archive`, so dashboards read a handful of
+# rows instead of grouping the whole table. One row per (dimension, value, state): dimension 'state'
+# (value ''), 'job_type' or 'user'. progress_sum is kept on the 'state' rows only, so a progress tick
+# updates a single counter row. Archived jobs stay counted: archive_jobs' DELETE from `jobs` is offset by
+# its INSERT into `jobs_archive`. Maps dimension -> jobs column (None for the per-state totals)
+JOB_STATS_DIMENSIONS = {"state": None, "job_type": "job_type", "user": "user_id"}
+
+def _bump_job_stats(row:str, sign:str, dimensions:dict) -> str:
+    # Trigger statements adding (sign '') or removing (sign '-') the OLD/NEW row to its counters
+    sql = ""
+    for dimension, column in dimensions.items():
+        value = f"COALESCE({row}.{column}, '')" if column else "''"
+        progress = f"{sign}COALESCE({row}.progress, 0)" if dimension == "state" else "0"
+        sql += (
+            f"INSERT INTO job_stats(dimension,value,state,count,progress_sum) "
+            f"VALUES('{dimension}', {value}, COALESCE({row}.state, ''), {sign}1, {progress}) "
+            "ON CONFLICT(dimension,value,state) DO UPDATE SET count=count+excluded.count, "
+            "progress_sum=progress_sum+excluded.progress_sum;\n"
         )
-    else:
-        # Insert
-        cur.execute(
-            "INSERT INTO jobs(job_id,state,progress,created_at,job_type,payload) VALUES(?,?,?,?,?,?)",
-            (job_id, state, progress, int(time.time()), job_type, payload_json)
+    return sql
+
+def _job_stats_triggers(dimensions:dict, archive:bool) -> dict:
+    # name -> CREATE TRIGGER statement, as sqlite_master stores it
+    columns = ["state"] + [column for column in dimensions.values() if column]
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+    triggers = {
+        "jobs_stats_insert": f"CREATE TRIGGER jobs_stats_insert AFTER INSERT ON jobs BEGIN\n"
+                             f"{_bump_job_stats('NEW', '', dimensions)}END",
+        "jobs_stats_delete": f"CREATE TRIGGER jobs_stats_delete AFTER DELETE ON jobs BEGIN\n"
+                             f"{_bump_job_stats('OLD', '-', dimensions)}END",
+        "jobs_stats_update": f"CREATE TRIGGER jobs_stats_update AFTER UPDATE OF {', '.join(columns)} ON jobs "
+                             f"WHEN {changed} BEGIN\n{_bump_job_stats('OLD', '-', dimensions)}"
+                             f"{_bump_job_stats('NEW', '', dimensions)}END",
+        "jobs_stats_progress": f"CREATE TRIGGER jobs_stats_progress AFTER UPDATE OF progress ON jobs "
+                               f"WHEN NOT ({changed}) AND OLD.progress IS NOT NEW.progress BEGIN\n"
+                               "UPDATE job_stats SET progress_sum=progress_sum+COALESCE(NEW.progress, 0)-COALESCE(OLD.progress, 0) "
+                               "WHERE dimension='state' AND value='' AND state=COALESCE(NEW.state, '');\nEND",
+    }
+    if archive:
+        # Archived rows are only ever inserted and deleted (archive_jobs never replaces one in place)
+        triggers["jobs_archive_stats_insert"] = (f"CREATE TRIGGER jobs_archive_stats_insert AFTER INSERT ON jobs_archive "
+                                                 f"BEGIN\n{_bump_job_stats('NEW', '', dimensions)}END")
+        triggers["jobs_archive_stats_delete"] = (f"CREATE TRIGGER jobs_archive_stats_delete AFTER DELETE ON jobs_archive "
+                                                 f"BEGIN\n{_bump_job_stats('OLD', '-', dimensions)}END")
+    return triggers
+
+def create_job_stats(conn):
+    # Creates job_stats and its triggers over whichever JOB_STATS_DIMENSIONS columns `jobs` has (the
+    # repositories' jobs table has no job_type/user_id), counting the existing jobs. When the triggers
+    # differ from an earlier call, e.g. after init_db added job_type/user_id, they are replaced and
+    # the counters recounted, so every caller ends up with the same single trigger set
+    cur = conn.cursor()
+    tables = {row[0] for row in cur.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    job_columns = {row[1] for row in cur.execute("PRAGMA table_info(jobs)")}
+    dimensions = {dimension: column for dimension, column in JOB_STATS_DIMENSIONS.items()
+                  if column is None or column in job_columns}
+    archive = "jobs_archive" in tables
+    triggers = _job_stats_triggers(dimensions, archive)
+    existing = dict(cur.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='trigger' AND name LIKE 'jobs%stats%'"
+    ).fetchall())
+    if "job_stats" in tables and existing == triggers:
+        return
+
+    cur.execute("SAVEPOINT create_job_stats")
+    try:
+        for name in existing:
+            cur.execute(f"DROP TRIGGER {name}")
+        cur.execute("""CREATE TABLE IF NOT EXISTS job_stats(
+            dimension TEXT,
+            value TEXT,
+            state TEXT,
+            count INTEGER NOT NULL DEFAULT 0,
+            progress_sum INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY(dimension, value, state)
+        ) WITHOUT ROWID""")
+        cur.execute("DELETE FROM job_stats")
+        for sql in triggers.values():
+            cur.execute(sql)
+        sources = " UNION ALL ".join(f"SELECT {', '.join(['state', 'progress'] + [c for c in dimensions.values() if c])} "
+                                     f"FROM {table}" for table in (["jobs", "jobs_archive"] if archive else ["jobs"]))
+        for dimension, column in dimensions.items():
+            value = f"COALESCE({column}, '')" if column else "''"
+            progress = "SUM(COALESCE(progress, 0))" if dimension == "state" else "0"
+            cur.execute(f"INSERT INTO job_stats(dimension,value,state,count,progress_sum) "
+                        f"SELECT '{dimension}', {value}, COALESCE(state, ''), COUNT(*), {progress} FROM ({sources}) "
+                        f"GROUP BY 2, 3")
+        cur.execute("RELEASE create_job_stats")
+    except Exception:
+        cur.execute("ROLLBACK TO create_job_stats")
+        cur.execute("RELEASE create_job_stats")
+        raise
+
+def create_render_stats(conn):
+    # Render counters per (status, quality), kept by triggers on `renders` like job_stats
+    cur = conn.cursor()
+    exists = cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='render_stats'").fetchone()
+    cur.execute("""CREATE TABLE IF NOT EXISTS render_stats(
+        status TEXT,
+        quality TEXT,
+        count INTEGER NOT NULL DEFAULT 0,
+        with_url INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY(status, quality)
+    ) WITHOUT ROWID""")
+    def bump(row:str, sign:str) -> str:
+        return (
+            "INSERT INTO render_stats(status,quality,count,with_url) "
+            f"VALUES(COALESCE({row}.status, ''), COALESCE({row}.quality, ''), {sign}1, {sign}({row}.url IS NOT NULL)) "
+            "ON CONFLICT(status,quality) DO UPDATE SET count=count+excluded.count, with_url=with_url+excluded.with_url;\n"
         )
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS renders_stats_insert AFTER INSERT ON renders BEGIN\n{bump('NEW', '')}END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS renders_stats_delete AFTER DELETE ON renders BEGIN\n{bump('OLD', '-')}END")
+    cur.execute("CREATE TRIGGER IF NOT EXISTS renders_stats_update AFTER UPDATE OF status, quality, url ON renders "
+                "WHEN OLD.status IS NOT NEW.status OR OLD.quality IS NOT NEW.quality OR (OLD.url IS NULL) IS NOT (NEW.url IS NULL) "
+                f"BEGIN\n{bump('OLD', '-')}{bump('NEW', '')}END")
+    if not exists:
+        cur.execute("INSERT INTO render_stats(status,quality,count,with_url) "
+                    "SELECT COALESCE(status, ''), COALESCE(quality, ''), COUNT(*), SUM(url IS NOT NULL) FROM renders GROUP BY 1, 2")
+
+# updated_at for a write: the wall clock, but always past the newest stamp in jobs and job_tombstones.
+# A write statement holds the database write lock while this is evaluated, so stamps are unique and
+# follow commit order, and a reader that has seen updated_at <= T will never see a new row stamped <= T
+UPDATED_AT = ("MAX(?, COALESCE((SELECT MAX(updated_at) FROM jobs), 0) + 0.000001, "
+              "COALESCE((SELECT MAX(updated_at) FROM job_tombstones), 0) + 0.000001)")
+
+# Written before the job row goes, so the tombstone is stamped past the job's last write
+TOMBSTONE_SQL = (
+    f"INSERT INTO job_tombstones(job_id,state,updated_at) VALUES(?,?,{UPDATED_AT}) "
+    "ON CONFLICT(job_id) DO UPDATE SET state=excluded.state, updated_at=excluded.updated_at"
+)
+
+# Create-or-replace in one statement; an existing job keeps its created_at
+UPSERT_JOB_SQL = (
+    f"INSERT INTO jobs(job_id,state,progress,created_at,job_type,payload,user_id,updated_at) VALUES(?,?,?,?,?,?,?,{UPDATED_AT}) "
+    "ON CONFLICT(job_id) DO UPDATE SET state=excluded.state, progress=excluded.progress, "
+    "job_type=excluded.job_type, payload=excluded.payload, user_id=excluded.user_id, updated_at=excluded.updated_at"
+)
+
+# Parameters of UPSERT_JOB_SQL, in column order (core.storage reuses them for PostgreSQL)
+def job_row(job_id:str, state:str, progress:int, job_type:str, payload:dict|None, now:float) -> tuple:
+    payload = payload or {}
+    return (job_id, state, progress, int(now), job_type, json.dumps(payload), payload.get("user_id"), now)
+
+def upsert_job(conn, job_id:str, state:str, progress:int, job_type:str='unknown', payload:dict=None):
+    # Creates or fully rewrites a job. State and progress changes should use update_job_state or
+    # update_job_progress, which leave the payload and the job_type/user_id indexes untouched
+    conn.execute(UPSERT_JOB_SQL, job_row(job_id, state, progress, job_type, payload, time.time()))
     conn.commit()
 
-def update_job_state(conn, job_id:str, state:str, progress:int|None=None):
-    cur = conn.cursor()
+def upsert_jobs(conn, rows):
+    # rows: (job_id, state, progress, job_type, payload), written in a single transaction
+    now = time.time()
+    conn.executemany(UPSERT_JOB_SQL, [
+        job_row(job_id, state, progress, job_type, payload, now)
+        for job_id, state, progress, job_type, payload in rows
+    ])
+    conn.commit()
+
+def _unless_finished(sql:str, params:tuple, unless_finished:bool) -> tuple:
+    # Progress ticks pass unless_finished so they never overwrite done, error or cancelled
+    if not unless_finished:
+        return sql, params
+    return f"{sql} AND state NOT IN ({','.join('?' * len(FINISHED_STATES))})", (*params, *FINISHED_STATES)
+
+def update_job_state(conn, job_id:str, state:str, progress:int|None=None, unless_finished:bool=False) -> int:
+    # Narrow write: returns the number of rows updated, 0 if the job does not exist (or is finished,
+    # with unless_finished)
     if progress is None:
-        cur.execute("UPDATE jobs SET state=? WHERE job_id=?", (state, job_id))
+        sql, params = f"UPDATE jobs SET state=?, updated_at={UPDATED_AT} WHERE job_id=?", (state, time.time(), job_id)
     else:
-        cur.execute("UPDATE jobs SET state=?, progress=? WHERE job_id=?", (state, progress, job_id))
+        sql, params = (f"UPDATE jobs SET state=?, progress=?, updated_at={UPDATED_AT} WHERE job_id=?",
+                       (state, progress, time.time(), job_id))
+    cur = conn.execute(*_unless_finished(sql, params, unless_finished))
     conn.commit()
+    return cur.rowcount
+
+def update_job_progress(conn, job_id:str, progress:int, unless_finished:bool=False) -> int:
+    # Progress tick within the same state: does not touch the state index either
+    cur = conn.execute(*_unless_finished(f"UPDATE jobs SET progress=?, updated_at={UPDATED_AT} WHERE job_id=?",
+                                         (progress, time.time(), job_id), unless_finished))
+    conn.commit()
+    return cur.rowcount
+
+# Column order of the job rows returned by get_job, list_jobs_page and list_job_changes
+JOB_COLUMNS = "job_id, state, progress, created_at, job_type, user_id, updated_at"
+
+def _inflate(payload:bytes|None) -> str|None:
+    return zlib.decompress(payload).decode() if payload is not None else None
+
+def get_job(conn, job_id:str):
+    # Hot table first, then the archive; both give JOB_COLUMNS plus the payload JSON
+    row = conn.execute(f"SELECT {JOB_COLUMNS}, payload FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+    if row is None:
+        conn.create_function("inflate", 1, _inflate, deterministic=True)
+        row = conn.execute(
+            f"SELECT {JOB_COLUMNS}, inflate(payload) AS payload FROM jobs_archive WHERE job_id=?", (job_id,)
+        ).fetchone()
+    return row
+
+def delete_job(conn, job_id:str) -> int|None:
+    # Deletes a job, hot or archived, and its checkpoints; None if the job does not exist
+    cur = conn.cursor()
+    if cur.execute("SELECT 1 FROM jobs WHERE job_id=? UNION ALL SELECT 1 FROM jobs_archive WHERE job_id=?",
+                   (job_id, job_id)).fetchone():
+        cur.execute(TOMBSTONE_SQL, (job_id, "deleted", time.time()))
+    deleted = cur.execute("DELETE FROM jobs WHERE job_id=?", (job_id,)).rowcount
+    deleted += cur.execute("DELETE FROM jobs_archive WHERE job_id=?", (job_id,)).rowcount
+    cur.execute("DELETE FROM job_checkpoints WHERE job_id=?", (job_id,))
+    conn.commit()
+    return deleted or None
+
+# States after which a job is never written again
+FINISHED_STATES = ("done", "error", "cancelled")
+
+def archive_jobs(conn, before:float, limit:int=500) -> int:
+    # Moves up to `limit` finished jobs last written before `before` to jobs_archive, leaving a tombstone,
+    # and drops their checkpoints and the tombstones older than `before`, in one transaction. Returns the
+    # number moved; fewer than `limit` means none are left
+    cur = conn.cursor()
+    # Take the write lock up front so no job changes between the SELECT and the DELETE
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        rows = cur.execute(
+            f"SELECT {JOB_COLUMNS}, payload FROM jobs WHERE updated_at < ? "
+            f"AND state IN ({','.join('?' * len(FINISHED_STATES))}) LIMIT ?",
+            (before, *FINISHED_STATES, limit)
+        ).fetchall()
+        archived_at = int(time.time())
+        job_ids = [(row[0],) for row in rows]
+        # Delete then insert rather than INSERT OR REPLACE, whose implicit delete skips the stats triggers
+        cur.executemany("DELETE FROM jobs_archive WHERE job_id=?", job_ids)
+        cur.executemany(
+            "INSERT INTO jobs_archive(job_id,state,progress,created_at,job_type,user_id,updated_at,archived_at,payload) "
+            "VALUES(?,?,?,?,?,?,?,?,?)",
+            [(*row[:7], archived_at, zlib.compress((row[7] or '{}').encode())) for row in rows]
+        )
+        now = time.time()
+        cur.executemany(TOMBSTONE_SQL, [(row[0], "archived", now) for row in rows])
+        cur.executemany("DELETE FROM jobs WHERE job_id=?", job_ids)
+        cur.executemany("DELETE FROM job_checkpoints WHERE job_id=?", job_ids)
+        cur.execute("DELETE FROM job_tombstones WHERE updated_at < ?", (before,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(rows)
+
+def encode_job_cursor(created_at:int, job_id:str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, job_id]).encode()).decode()
+
+def decode_job_cursor(cursor:str) -> tuple:
+    try:
+        created_at, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(created_at), str(job_id)
+    except (ValueError, TypeError):
+        raise ValueError(f"invalid cursor: {cursor!r}")
+
+def list_jobs_page(conn, limit:int=100, cursor:str|None=None, state:str|None=None,
+                   job_type:str|None=None, user_id:str|None=None):
+    # Keyset pagination, newest first: returns (rows, next_cursor), next_cursor is None on the last page.
+    # Seeking past (created_at, job_id) costs the same on page 1 and page 10000, unlike OFFSET
+    where, params = [], []
+    for column, value in (("state", state), ("job_type", job_type), ("user_id", user_id)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    if cursor:
+        where.append("(created_at, job_id) < (?, ?)")
+        params.extend(decode_job_cursor(cursor))
+
+    sql = f"SELECT {JOB_COLUMNS} FROM jobs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY created_at DESC, job_id DESC LIMIT ?"
+    rows = conn.execute(sql, (*params, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_job_cursor(rows[-1][3], rows[-1][0])
+    return rows, next_cursor
+
+def get_changes_cursor(conn) -> float:
+    # Where a client that has just loaded the full list should start polling list_job_changes
+    row = conn.execute(
+        "SELECT MAX(COALESCE((SELECT MAX(updated_at) FROM jobs), 0), "
+        "COALESCE((SELECT MAX(updated_at) FROM job_tombstones), 0))"
+    ).fetchone()
+    return row[0] or 0.0
+
+def list_job_changes(conn, since:float, limit:int=500):
+    # Jobs written after `since`, oldest change first: returns (rows, cursor). Pass cursor back as
+    # `since` on the next poll; a full page means more changes are waiting. Jobs deleted or archived
+    # since come back as tombstones: state 'deleted' or 'archived', only job_id and updated_at set
+    rows = conn.execute(
+        f"SELECT * FROM (SELECT {JOB_COLUMNS} FROM jobs WHERE updated_at > ? ORDER BY updated_at LIMIT ?) "
+        "UNION ALL "
+        "SELECT * FROM (SELECT job_id, state, NULL, NULL, NULL, NULL, updated_at FROM job_tombstones "
+        "WHERE updated_at > ? ORDER BY updated_at LIMIT ?) "
+        "ORDER BY 7 LIMIT ?",
+        (since, limit, since, limit, limit)
+    ).fetchall()
+    return rows, (rows[-1][6] if rows else since)
+
+def fold_job_stats(rows, user_id:str|None=None) -> dict:
+    # job_stats rows (dimension, value, state, count, progress_sum) -> the stats endpoint's dict
+    stats = {"total": 0, "by_state": {}, "by_job_type": {}}
+    if user_id is not None:
+        stats["by_user"] = {}
+    for dimension, value, state, count, progress_sum in rows:
+        if count <= 0:
+            continue  # no job is in that state anymore
+        if dimension == "state":
+            stats["total"] += count
+            stats["by_state"][state] = {"count": count, "avg_progress": round(progress_sum / count, 2)}
+        elif dimension == "job_type":
+            stats["by_job_type"].setdefault(value, {})[state] = count
+        else:
+            stats["by_user"][state] = count
+    return stats
+
+def get_job_stats(conn, user_id:str|None=None) -> dict:
+    # Totals per state and per job_type, plus per state for one user: reads the counters, not the jobs
+    rows = conn.execute(
+        "SELECT dimension, value, state, count, progress_sum FROM job_stats "
+        "WHERE dimension IN ('state', 'job_type') OR (dimension = 'user' AND value = ?)",
+        (user_id,)
+    ).fetchall()
+    return fold_job_stats(rows, user_id)
 
 def insert_or_update_render(conn, job_id:str, item_id:str, h:str, quality:str, url:str|None, status:str):
     cur = conn.cursor()
@@ -100,4 +459,18 @@ def set_cached_asset(conn, h:str, url:str):
     cur = conn.cursor()
     cur.execute("INSERT OR REPLACE INTO assets_cache(hash,url,created_at) VALUES(?,?,?)",
                 (h, url, int(time.time())))
-    conn.commit()
\ No newline at end of file
+    conn.commit()
+
+def save_job_checkpoint(conn, job_id:str, phase:str, data:dict):
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO job_checkpoints(job_id,phase,data,created_at) VALUES(?,?,?,?) "
+        "ON CONFLICT(job_id,phase) DO UPDATE SET data=excluded.data, created_at=excluded.created_at",
+        (job_id, phase, json.dumps(data), int(time.time()))
+    )
+    conn.commit()
+
+def get_job_checkpoints(conn, job_id:str) -> dict:
+    cur = conn.cursor()
+    cur.execute("SELECT phase, data FROM job_checkpoints WHERE job_id=?", (job_id,))
+    return {row[0]: json.loads(row[1]) for row in cur.fetchall()}
\ No newline at end of file
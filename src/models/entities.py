@@ -27,7 +27,8 @@ class Job(BaseModel):
     state: JobState = Field(default=JobState.QUEUED, description="Current job state")
     progress: int = Field(default=0, ge=0, le=100, description="Progress percentage")
     created_at: int = Field(description="Creation timestamp")
-    updated_at: Optional[int] = Field(None, description="Last update timestamp")
+    # Fractional: models.dao.UPDATED_AT keeps stamps unique for the changes feed
+    updated_at: Optional[float] = Field(None, description="Last update timestamp")
 
     class Config:
         use_enum_values = True
@@ -505,15 +505,15 @@ class MetricsCollector:
 
                 cutoff_time = time.time() - (self._retention_hours * 3600)
 
-                # Get all metric keys
+                # Trim every metric key, one SCAN batch (and one pipeline) at a time
                 pattern = f"{self._prefix}metrics:*"
-                keys = await cache_manager._redis.keys(pattern)
-
-                for key in keys:
-                    try:
-                        await cache_manager._redis.zremrangebyscore(key, 0, cutoff_time)
-                    except Exception as e:
-                        log.error(f"❌ Error cleaning up key {key}: {e}")
+                async for keys in cache_manager.scan_batches(pattern):
+                    pipe = cache_manager._redis.pipeline(transaction=False)
+                    for key in keys:
+                        pipe.zremrangebyscore(key, 0, cutoff_time)
+                    for key, result in zip(keys, await pipe.execute(raise_on_error=False)):
+                        if isinstance(result, Exception):
+                            log.error(f"❌ Error cleaning up key {key}: {result}")
 
                 log.debug(f"🧹 Cleaned up old metrics (older than {self._retention_hours}h)")
 
@@ -575,12 +575,12 @@ class MetricsCollector:
 
             # Get all metric keys
             pattern = f"{self._prefix}metrics:*"
-            keys = await cache_manager._redis.keys(pattern)
+            keys = [key async for batch in cache_manager.scan_batches(pattern) for key in batch]
 
             result = {}
             for key in keys:
                 try:
-                    metric_name = key.decode('utf-8').replace(f"{self._prefix}metrics:", "")
+                    metric_name = key.replace(f"{self._prefix}metrics:", "")
                     metrics = await self.get_metrics(metric_name, start_time, end_time)
                     if metrics:
                         result[metric_name] = metrics
@@ -1,5 +1,5 @@
 import time
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from .base import BaseRepository
 from models.entities import AssetsCache
 
@@ -30,28 +30,29 @@ class AssetsCacheRepository(BaseRepository[AssetsCache]):
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_assets_cache_last_accessed ON assets_cache(last_accessed)")
             conn.commit()
 
+    UPSERT_QUERY = """
+    INSERT OR REPLACE INTO assets_cache
+    (hash, url, created_at, expires_at, last_accessed)
+    VALUES (?, ?, ?, ?, ?)
+    """
+
+    @staticmethod
+    def _upsert_params(asset: AssetsCache, now: int, ttl_hours: int) -> tuple:
+        return (asset.hash, asset.url, asset.created_at or now, now + (ttl_hours * 3600), now)
+
     def create(self, asset: AssetsCache, ttl_hours: int = 24) -> str:
         """Create a new cached asset with optional TTL"""
         now = int(time.time())
-        expires_at = now + (ttl_hours * 3600)
-
-        query = """
-        INSERT OR REPLACE INTO assets_cache
-        (hash, url, created_at, expires_at, last_accessed)
-        VALUES (?, ?, ?, ?, ?)
-        """
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, (
-                asset.hash,
-                asset.url,
-                asset.created_at or now,
-                expires_at,
-                now
-            ))
-            conn.commit()
+        self._execute_update(self.UPSERT_QUERY, self._upsert_params(asset, now, ttl_hours))
         return asset.hash
 
+    def create_many(self, assets: Iterable[AssetsCache], ttl_hours: int = 24) -> List[str]:
+        """Create or replace many cached assets with one statement in one transaction"""
+        now = int(time.time())
+        assets = list(assets)
+        self._execute_many(self.UPSERT_QUERY, [self._upsert_params(asset, now, ttl_hours) for asset in assets])
+        return [asset.hash for asset in assets]
+
     def get_by_id(self, hash_value: str) -> Optional[AssetsCache]:
         """Get a cached asset by hash and update access tracking"""
         now = int(time.time())
@@ -85,6 +86,12 @@ class AssetsCacheRepository(BaseRepository[AssetsCache]):
         affected_rows = self._execute_update(query, tuple(values))
         return affected_rows > 0
 
+    def update_many(self, updates: Dict[str, Dict[str, any]]) -> int:
+        """Update many cached assets ({hash: updates}) in one transaction"""
+        return self._update_many("assets_cache", ("hash",), (
+            ((hash_value,), fields) for hash_value, fields in updates.items()
+        ))
+
     def update_url(self, hash_value: str, url: str) -> bool:
         """Update cached asset URL"""
         return self.update(hash_value, {"url": url, "last_accessed": int(time.time())})
@@ -101,6 +108,11 @@ class AssetsCacheRepository(BaseRepository[AssetsCache]):
         affected_rows = self._execute_update(query, (hash_value,))
         return affected_rows > 0
 
+    def delete_many(self, hash_values: Iterable[str]) -> int:
+        """Delete many cached assets by hash in one transaction"""
+        query = "DELETE FROM assets_cache WHERE hash = ?"
+        return self._execute_many(query, [(hash_value,) for hash_value in hash_values])
+
     def delete_expired(self, older_than_hours: int = 24) -> int:
         """Delete all expired assets older than specified hours"""
         cutoff_time = int(time.time()) - (older_than_hours * 3600)
@@ -1,10 +1,12 @@
 import sqlite3
 import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Union, Generic, TypeVar
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union, Generic, TypeVar
 from contextlib import contextmanager
 from pathlib import Path
 from core.config import settings
+from core.db import get_pool, get_read_pool
 
 T = TypeVar('T')
 
@@ -21,9 +23,17 @@ class BaseRepository(ABC, Generic[T]):
 
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections with proper row factory"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Context manager for pooled database connections with proper row factory"""
+        conn = get_pool(self.db_path).acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def get_read_connection(self):
+        """Context manager for a connection from the read-only pool, for SELECTs"""
+        conn = get_read_pool(self.db_path).acquire()
         try:
             yield conn
         finally:
@@ -31,8 +41,8 @@ class BaseRepository(ABC, Generic[T]):
 
     def _execute_query(self, query: str, params: tuple = (), fetch_one: bool = False,
                       fetch_all: bool = True) -> Optional[Union[Dict, List[Dict]]]:
-        """Execute a query and return results"""
-        with self.get_connection() as conn:
+        """Execute a read query on the read-only pool and return results"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
 
@@ -51,6 +61,50 @@ class BaseRepository(ABC, Generic[T]):
             conn.commit()
             return cursor.rowcount
 
+    def _execute_many(self, query: str, params_seq: Iterable[Sequence[Any]]) -> int:
+        """Execute one prepared statement for every parameter set in a single transaction"""
+        return self._execute_batch([(query, params_seq)])[0]
+
+    def _execute_batch(self, statements: Iterable[Tuple[str, Iterable[Sequence[Any]]]]) -> List[int]:
+        """executemany() each (query, params_seq) in one transaction; affected rows per statement"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            affected = []
+            for query, params_seq in statements:
+                cursor.executemany(query, params_seq)
+                affected.append(cursor.rowcount)
+            conn.commit()
+            return affected
+
+    def _update_many(self, table: str, key_columns: Sequence[str],
+                     updates: Iterable[Tuple[Sequence[Any], Dict[str, Any]]],
+                     expressions: Optional[Dict[str, str]] = None) -> int:
+        """
+        UPDATE many rows with their own values in one transaction; one statement per set of columns.
+
+        expressions maps a column to the SQL it is set to instead of a plain
+        `?`; the expression takes the column's value as its one parameter.
+        """
+        expressions = expressions or {}
+        groups: Dict[Tuple[str, ...], List[tuple]] = {}
+        for key, fields in updates:
+            if not fields:
+                continue
+            columns = tuple(sorted(fields))
+            values = tuple(fields[c].value if isinstance(fields[c], Enum) else fields[c] for c in columns)
+            groups.setdefault(columns, []).append(values + tuple(key))
+
+        where = " AND ".join(f"{column} = ?" for column in key_columns)
+
+        def set_clause(columns: Tuple[str, ...]) -> str:
+            return ", ".join(f"{column} = {expressions.get(column, '?')}" for column in columns)
+
+        statements = [
+            (f"UPDATE {table} SET {set_clause(columns)} WHERE {where}", rows)
+            for columns, rows in groups.items()
+        ]
+        return sum(self._execute_batch(statements)) if statements else 0
+
     @abstractmethod
     def create_table(self) -> None:
         """Create the table for this repository"""
@@ -85,6 +139,21 @@ class BaseRepository(ABC, Generic[T]):
         """Count all entities"""
         raise NotImplementedError("Count method must be implemented by subclass")
 
+    @abstractmethod
+    def create_many(self, entities: Iterable[T]) -> List[str]:
+        """Create many entities in one transaction and return their IDs"""
+        pass
+
+    @abstractmethod
+    def update_many(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Apply {entity_id: updates} in one transaction and return the number of rows updated"""
+        pass
+
+    @abstractmethod
+    def delete_many(self, entity_ids: Iterable[str]) -> int:
+        """Delete many entities in one transaction and return the number deleted"""
+        pass
+
     def exists(self, entity_id: str) -> bool:
         """Check if an entity exists"""
         return self.get_by_id(entity_id) is not None
\ No newline at end of file
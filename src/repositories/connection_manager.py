@@ -8,6 +8,7 @@ from pathlib import Path
 from queue import Queue, Empty
 from dataclasses import dataclass
 from core.config import settings
+from core.db import apply_pragmas
 import logging
 
 log = logging.getLogger(__name__)
@@ -130,13 +131,9 @@ class DatabaseConnectionPool:
 
         conn.row_factory = sqlite3.Row
 
-        # SQLite optimizations
+        # SQLite optimizations (same PRAGMAs as the core.db pool)
         conn.execute("PRAGMA foreign_keys = ON")
-        conn.execute("PRAGMA journal_mode = WAL")
-        conn.execute("PRAGMA synchronous = NORMAL")
-        conn.execute("PRAGMA cache_size = 10000")
-        conn.execute("PRAGMA temp_store = MEMORY")
-        conn.execute("PRAGMA mmap_size = 268435456")  # 256MB
+        apply_pragmas(conn)
 
         conn_info = ConnectionInfo(
             connection=conn,
@@ -1,11 +1,18 @@
 import sqlite3
 import time
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from .base import BaseRepository
+from models.dao import UPDATED_AT, create_job_stats, create_job_tombstones
 from models.entities import Job, JobState
 
 class JobRepository(BaseRepository[Job]):
-    """Repository for Job entities with CRUD operations and business logic"""
+    """
+    Repository for Job entities with CRUD operations and business logic.
+
+    Writes go through models.dao's UPDATED_AT stamp and deletes leave a
+    tombstone, so jobs written here show up in the Jobs Hub changes feed
+    (models.dao.list_job_changes) like those written by core.storage.
+    """
 
     def create_table(self) -> None:
         """Create jobs table if it doesn't exist"""
@@ -27,45 +34,59 @@ class JobRepository(BaseRepository[Job]):
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs(updated_at)")
-            conn.commit()
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state_created ON jobs(state, created_at, job_id)")
 
-    def create(self, job: Job) -> str:
-        """Create a new job"""
-        now = int(time.time())
-        job_data = job.dict()
-        job_data['created_at'] = job_data.get('created_at', now)
-        job_data['updated_at'] = now
+            # Per-state counters maintained by triggers, read by get_job_statistics
+            create_job_stats(conn)
+            create_job_tombstones(conn)
+            conn.commit()
 
-        query = """
+    UPSERT_QUERY = f"""
         INSERT INTO jobs (job_id, state, progress, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, {UPDATED_AT})
         ON CONFLICT(job_id) DO UPDATE SET
             state = excluded.state,
             progress = excluded.progress,
             updated_at = excluded.updated_at
         """
+
+    # Tombstone only for jobs that exist; params (job_id, now, job_id)
+    DELETE_TOMBSTONE_QUERY = (
+        f"INSERT INTO job_tombstones (job_id, state, updated_at) SELECT ?, 'deleted', {UPDATED_AT} "
+        "WHERE EXISTS (SELECT 1 FROM jobs WHERE job_id = ?) "
+        "ON CONFLICT(job_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at"
+    )
+
+    @staticmethod
+    def _upsert_params(job: Job, now: float) -> tuple:
+        created_at = job.created_at if job.created_at is not None else int(now)
+        return (job.job_id, JobState(job.state).value, job.progress, created_at, now)
+
+    def create(self, job: Job) -> str:
+        """Create a new job"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, (
-                job.job_id,
-                job.state.value,
-                job.progress,
-                job_data['created_at'],
-                job_data['updated_at']
-            ))
+            cursor.execute(self.UPSERT_QUERY, self._upsert_params(job, time.time()))
             conn.commit()
         return job.job_id
 
+    def create_many(self, jobs: Iterable[Job]) -> List[str]:
+        """Create or update many jobs with one statement in one transaction"""
+        now = time.time()
+        jobs = list(jobs)
+        self._execute_many(self.UPSERT_QUERY, [self._upsert_params(job, now) for job in jobs])
+        return [job.job_id for job in jobs]
+
     def create_new(self, job_id: str, state: JobState = JobState.QUEUED, progress: int = 0) -> str:
         """Create a new job with minimal parameters"""
-        now = int(time.time())
-        query = """
+        now = time.time()
+        query = f"""
         INSERT INTO jobs (job_id, state, progress, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, {UPDATED_AT})
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, (job_id, state.value, progress, now, now))
+            cursor.execute(query, (job_id, state.value, progress, int(now), now))
             conn.commit()
         return job_id
 
@@ -81,9 +102,9 @@ class JobRepository(BaseRepository[Job]):
             return False
 
         # Always update updated_at timestamp
-        updates['updated_at'] = int(time.time())
+        updates['updated_at'] = time.time()
 
-        set_clause = ", ".join([f"{key} = ?" for key in updates.keys()])
+        set_clause = ", ".join([f"{key} = {UPDATED_AT if key == 'updated_at' else '?'}" for key in updates.keys()])
         values = list(updates.values()) + [job_id]
 
         # Convert enum values to strings
@@ -95,6 +116,13 @@ class JobRepository(BaseRepository[Job]):
         affected_rows = self._execute_update(query, tuple(values))
         return affected_rows > 0
 
+    def update_many(self, updates: Dict[str, Dict[str, any]]) -> int:
+        """Update many jobs ({job_id: updates}) in one transaction"""
+        now = time.time()
+        return self._update_many("jobs", ("job_id",), (
+            ((job_id,), {**fields, 'updated_at': now}) for job_id, fields in updates.items() if fields
+        ), expressions={"updated_at": UPDATED_AT})
+
     def update_state(self, job_id: str, state: JobState, progress: Optional[int] = None) -> bool:
         """Update job state and optionally progress"""
         updates = {"state": state}
@@ -115,6 +143,7 @@ class JobRepository(BaseRepository[Job]):
 
             # Delete related renders first (foreign key relationship)
             cursor.execute("DELETE FROM renders WHERE job_id = ?", (job_id,))
+            cursor.execute(self.DELETE_TOMBSTONE_QUERY, (job_id, time.time(), job_id))
 
             # Delete the job
             cursor.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
@@ -122,6 +151,17 @@ class JobRepository(BaseRepository[Job]):
             conn.commit()
             return cursor.rowcount > 0
 
+    def delete_many(self, job_ids: Iterable[str]) -> int:
+        """Delete many jobs and their renders in one transaction"""
+        params = [(job_id,) for job_id in job_ids]
+        now = time.time()
+        _, _, deleted = self._execute_batch([
+            ("DELETE FROM renders WHERE job_id = ?", params),
+            (self.DELETE_TOMBSTONE_QUERY, [(job_id, now, job_id) for (job_id,) in params]),
+            ("DELETE FROM jobs WHERE job_id = ?", params),
+        ])
+        return deleted
+
     def list_all(self, limit: Optional[int] = None, offset: Optional[int] = None,
                  state_filter: Optional[JobState] = None) -> List[Job]:
         """List jobs with optional filtering and pagination"""
@@ -196,15 +236,17 @@ class JobRepository(BaseRepository[Job]):
 
     def get_job_statistics(self) -> Dict[str, any]:
         """Get comprehensive job statistics"""
+        # Counts come from the job_stats counters and earliest/latest from one
+        # idx_jobs_state_created seek each, so this never scans the jobs table
         query = """
         SELECT
             state,
-            COUNT(*) as count,
-            AVG(progress) as avg_progress,
-            MIN(created_at) as earliest,
-            MAX(created_at) as latest
-        FROM jobs
-        GROUP BY state
+            count,
+            CAST(progress_sum AS REAL) / count as avg_progress,
+            (SELECT MIN(created_at) FROM jobs WHERE jobs.state = job_stats.state) as earliest,
+            (SELECT MAX(created_at) FROM jobs WHERE jobs.state = job_stats.state) as latest
+        FROM job_stats
+        WHERE dimension = 'state' AND count > 0
         """
         results = self._execute_query(query)
 
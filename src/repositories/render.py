@@ -1,6 +1,7 @@
 import time
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from .base import BaseRepository
+from models.dao import create_render_stats
 from models.entities import Render, RenderStatus, RenderQuality
 
 class RenderRepository(BaseRepository[Render]):
@@ -31,12 +32,12 @@ class RenderRepository(BaseRepository[Render]):
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_renders_status ON renders(status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_renders_hash ON renders(hash)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_renders_quality ON renders(quality)")
+
+            # Per (status, quality) counters maintained by triggers, read by get_renders_statistics
+            create_render_stats(conn)
             conn.commit()
 
-    def create(self, render: Render) -> str:
-        """Create a new render or update if exists"""
-        now = int(time.time())
-        query = """
+    UPSERT_QUERY = """
         INSERT INTO renders (job_id, item_id, hash, quality, url, status, created_at, updated_at)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ON CONFLICT(job_id, item_id) DO UPDATE SET
@@ -46,21 +47,35 @@ class RenderRepository(BaseRepository[Render]):
             status = excluded.status,
             updated_at = excluded.updated_at
         """
+
+    @staticmethod
+    def _upsert_params(render: Render, now: int) -> tuple:
+        return (
+            render.job_id,
+            render.item_id,
+            render.hash,
+            RenderQuality(render.quality).value,
+            render.url,
+            RenderStatus(render.status).value,
+            render.created_at or now,
+            render.updated_at or now
+        )
+
+    def create(self, render: Render) -> str:
+        """Create a new render or update if exists"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute(query, (
-                render.job_id,
-                render.item_id,
-                render.hash,
-                render.quality.value,
-                render.url,
-                render.status.value,
-                render.created_at or now,
-                render.updated_at or now
-            ))
+            cursor.execute(self.UPSERT_QUERY, self._upsert_params(render, int(time.time())))
             conn.commit()
         return f"{render.job_id}:{render.item_id}"
 
+    def create_many(self, renders: Iterable[Render]) -> List[str]:
+        """Create or update many renders (e.g. a batch's planos) with one statement in one transaction"""
+        now = int(time.time())
+        renders = list(renders)
+        self._execute_many(self.UPSERT_QUERY, [self._upsert_params(render, now) for render in renders])
+        return [f"{render.job_id}:{render.item_id}" for render in renders]
+
     def get_by_id(self, entity_id: str) -> Optional[Render]:
         """Get a render by its composite ID (job_id:item_id)"""
         job_id, item_id = entity_id.split(':', 1)
@@ -114,6 +129,14 @@ class RenderRepository(BaseRepository[Render]):
         affected_rows = self._execute_update(query, tuple(values))
         return affected_rows > 0
 
+    def update_many(self, updates: Dict[str, Dict[str, any]]) -> int:
+        """Update many renders ({"job_id:item_id": updates}) in one transaction"""
+        now = int(time.time())
+        return self._update_many("renders", ("job_id", "item_id"), (
+            (entity_id.split(':', 1), {**fields, 'updated_at': now})
+            for entity_id, fields in updates.items() if fields
+        ))
+
     def update_status(self, job_id: str, item_id: str, status: RenderStatus) -> bool:
         """Update render status"""
         return self.update_by_job_and_item(job_id, item_id, {"status": status})
@@ -135,6 +158,11 @@ class RenderRepository(BaseRepository[Render]):
         affected_rows = self._execute_update(query, (job_id, item_id))
         return affected_rows > 0
 
+    def delete_many(self, entity_ids: Iterable[str]) -> int:
+        """Delete many renders by composite ID (job_id:item_id) in one transaction"""
+        query = "DELETE FROM renders WHERE job_id = ? AND item_id = ?"
+        return self._execute_many(query, [entity_id.split(':', 1) for entity_id in entity_ids])
+
     def delete_by_job_id(self, job_id: str) -> int:
         """Delete all renders for a job"""
         query = "DELETE FROM renders WHERE job_id = ?"
@@ -252,10 +280,10 @@ class RenderRepository(BaseRepository[Render]):
         SELECT
             status,
             quality,
-            COUNT(*) as count,
-            AVG(CASE WHEN url IS NOT NULL THEN 1 ELSE 0 END) * 100 as completion_rate
-        FROM renders
-        GROUP BY status, quality
+            count,
+            CAST(with_url AS REAL) / count * 100 as completion_rate
+        FROM render_stats
+        WHERE count > 0
         ORDER BY status, quality
         """
         results = self._execute_query(query)
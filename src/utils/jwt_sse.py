@@ -157,12 +157,12 @@ async def sse_event_generator_with_heartbeat(job_id: str, connection_id: str, to
             # Check job status
             from core.db import get_conn
             conn = get_conn()
-            cursor = conn.execute("""
-                SELECT state, progress FROM jobs WHERE job_id = ?
-            """, (job_id,))
-
-            row = cursor.fetchone()
-            conn.close()
+            try:
+                row = conn.execute("""
+                    SELECT state, progress FROM jobs WHERE job_id = ?
+                """, (job_id,)).fetchone()
+            finally:
+                conn.close()
 
             if not row:
                 error_data = {
@@ -11,6 +11,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from core.cache import cache_result
 from services.kie_client import generate_image
 
 @dataclass
@@ -146,48 +147,55 @@ class StylePreviewManager:
         if style_id not in self.style_configs:
             raise ValueError(f"Unknown style: {style_id}")
 
-        style_config = self.style_configs[style_id]
-
         # Check cache first
         if not force_refresh and self.is_preview_cached(style_id):
             return await self._load_cached_preview(style_id)
 
-        # Generate new preview
+        # Generate new preview; concurrent requests for one style share a single KIE call
         try:
-            preview_url = await generate_image(
-                prompt=self.generate_preview_prompt(style_config),
-                negative=self.generate_preview_negative(style_config),
-                seed=hash(style_id) % 10000,  # Consistent seed per style
-                aspect_ratio="9:16",
-                quality="high",
-                model="gpt4o-image"
-            )
-
-            # Save metadata
-            metadata = {
-                "style_id": style_id,
-                "style_name": style_config.style_name,
-                "category": style_config.category,
-                "demo_scene": style_config.demo_scene,
-                "prompt_used": self.generate_preview_prompt(style_config),
-                "negative_used": self.generate_preview_negative(style_config),
-                "preview_url": preview_url,
-                "generated_at": time.time(),
-                "color_palette": style_config.color_palette,
-                "keywords": style_config.keywords
-            }
-
-            # Save metadata file
-            metadata_path = self.get_preview_metadata_path(style_id)
-            with open(metadata_path, 'w') as f:
-                json.dump(metadata, f, indent=2)
-
-            return metadata
-
+            if force_refresh:
+                return await StylePreviewManager._render_preview.refresh(self, style_id)
+            return await self._render_preview(style_id)
         except Exception as e:
             # Return fallback preview
             return await self._generate_fallback_preview(style_id, str(e))
 
+    @cache_result("style_preview:{style_id}", ttl=24 * 3600, namespace="style_previews",
+                  serialize_args=False, stale_ttl=3600)
+    async def _render_preview(self, style_id: str) -> Dict[str, any]:
+        """Generate a style's preview image with KIE and save its metadata"""
+        style_config = self.style_configs[style_id]
+
+        preview_url = await generate_image(
+            prompt=self.generate_preview_prompt(style_config),
+            negative=self.generate_preview_negative(style_config),
+            seed=hash(style_id) % 10000,  # Consistent seed per style
+            aspect_ratio="9:16",
+            quality="high",
+            model="gpt4o-image"
+        )
+
+        # Save metadata
+        metadata = {
+            "style_id": style_id,
+            "style_name": style_config.style_name,
+            "category": style_config.category,
+            "demo_scene": style_config.demo_scene,
+            "prompt_used": self.generate_preview_prompt(style_config),
+            "negative_used": self.generate_preview_negative(style_config),
+            "preview_url": preview_url,
+            "generated_at": time.time(),
+            "color_palette": style_config.color_palette,
+            "keywords": style_config.keywords
+        }
+
+        # Save metadata file
+        metadata_path = self.get_preview_metadata_path(style_id)
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+        return metadata
+
     async def _load_cached_preview(self, style_id: str) -> Dict[str, any]:
         """Load cached preview metadata"""
         metadata_path = self.get_preview_metadata_path(style_id)
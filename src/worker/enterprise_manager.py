@@ -1,15 +1,19 @@
 import asyncio
+import hashlib
 import time
 import uuid
 import logging
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
 import json
 import os
 from pathlib import Path
 from core.config import settings
+from core.cancellation import job_cancellation
 from core.db import get_conn
-from core.queue import job_queue # Redis Queue import
-from models.dao import upsert_job
+from core.job_status import job_status_store
+from core.queue import job_queue, JobPriority # Redis Queue import
+from core.storage import storage
 import subprocess
 import aiohttp
 try:
@@ -187,6 +191,31 @@ def get_style_model_mapping() -> Dict[str, str]:
     """Retorna el mapeo de estilos a modelos"""
     return STYLE_TO_MODEL
 
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def _file_matches(path: Path, sha256: Optional[str]) -> bool:
+    """True if a checkpointed file is still on disk with the recorded checksum"""
+    if not sha256 or not path.exists():
+        return False
+    return await asyncio.to_thread(_sha256_file, path) == sha256
+
+async def _run_subprocess(*cmd: str):
+    """Run a command without blocking the loop; killed if the job is cancelled meanwhile"""
+    process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        return await process.communicate()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+            log.info(f"🛑 Killed {cmd[0]} (pid {process.pid}) for cancelled job")
+        raise
+
 class EnterpriseJob:
     """Enhanced job with enterprise features"""
 
@@ -257,22 +286,11 @@ class EnterpriseJobManager:
 
         log.info("🔌 Enterprise Job Manager closed")
 
-    async def enqueue_job(self, job_type: str, payload: Dict[str, Any]) -> str:
+    async def enqueue_job(self, job_type: str, payload: Dict[str, Any],
+                          priority: JobPriority = JobPriority.NORMAL) -> str:
         """Add a job to the processing queue"""
         # Extract job_id from payload if present, otherwise create new with prefix
-        job_id = payload.get("job_id")
-        if not job_id:
-            raw_uuid = str(uuid.uuid4())
-            if job_type == "quick_create":
-                job_id = f"qc-{raw_uuid[:12]}"
-            elif job_type == "quick_create_full_universe":
-                job_id = f"qcf-{raw_uuid[:12]}"
-            elif job_type == "compose":
-                job_id = f"compose-{raw_uuid[:12]}"
-            elif job_type == "tts":
-                job_id = f"tts-{raw_uuid[:12]}"
-            else:
-                job_id = f"{raw_uuid[:12]}"
+        job_id = payload.get("job_id") or self._new_job_id(job_type)
 
         # =========================================================================
         # CREDITS SYSTEM: VALIDATION AND DEDUCTION
@@ -289,21 +307,20 @@ class EnterpriseJobManager:
             job_cost = calculate_job_cost(job_type, payload)
             
             if job_cost > 0:
-                conn = get_conn()
-                credits_repo = CreditsRepository(conn)
-                
                 # Attempt to deduct credits
                 idea_text = payload.get('request', {}).get('idea_text', '') or payload.get('idea_text', 'No description')
                 description = f"Job {job_type}: {str(idea_text)[:40]}"
                 
-                success, message = credits_repo.deduct_credits(
-                    user_id=user_id,
-                    amount=job_cost,
-                    job_id=job_id,
-                    description=description
-                )
-                
-                conn.close()
+                conn = get_conn()
+                try:
+                    success, message = CreditsRepository(conn).deduct_credits(
+                        user_id=user_id,
+                        amount=job_cost,
+                        job_id=job_id,
+                        description=description
+                    )
+                finally:
+                    conn.close()
                 
                 if not success:
                     log.warning(f"❌ Insufficient credits for user {user_id}: {message}")
@@ -327,19 +344,132 @@ class EnterpriseJobManager:
         
         # Store in DB (Source of Truth)
         try:
-            conn = get_conn()
-            upsert_job(conn, job_id, "queued", 0, job_type=job_type, payload=payload)
-            conn.close()
+            await storage.upsert_job(job_id, "queued", 0, job_type=job_type, payload=payload)
         except Exception as e:
             log.error(f"Failed to persist job {job_id}: {e}")
         
         # Add to Redis processing queue
-        await job_queue.enqueue(job_id, job_type, payload)
+        await job_queue.enqueue(job_id, job_type, payload, priority)
         self._stats["total_jobs"] += 1
         
         log.info(f"📥 Enqueued job {job_id} to Redis (type={job_type})")
         return job_id
 
+    async def enqueue_jobs(self, jobs: List[Tuple[str, Dict[str, Any]]],
+                           priority: JobPriority = JobPriority.NORMAL) -> List[Dict[str, Any]]:
+        """
+        Add many (job_type, payload) jobs at once: one credits connection,
+        one DB transaction and one Redis pipeline. Returns a result per job,
+        in order, with status "queued" or "rejected".
+        """
+        results = []
+        pending = []
+        for job_type, payload in jobs:
+            job_id = payload.get("job_id") or self._new_job_id(job_type)
+            payload["job_id"] = job_id
+            payload["user_id"] = payload.get("user_id", "default_user")
+            result = {"job_id": job_id, "job_type": job_type, "status": "queued"}
+            results.append(result)
+            pending.append((result, job_type, payload))
+
+        # =========================================================================
+        # CREDITS SYSTEM: VALIDATION AND DEDUCTION (single connection for the batch)
+        # =========================================================================
+        try:
+            from services.credits_calculator import calculate_job_cost
+            from repositories.credits_repository import CreditsRepository
+
+            conn = get_conn()
+            try:
+                credits_repo = CreditsRepository(conn)
+                for result, job_type, payload in pending:
+                    try:
+                        job_cost = calculate_job_cost(job_type, payload)
+                        if job_cost <= 0:
+                            continue
+
+                        idea_text = payload.get('request', {}).get('idea_text', '') or payload.get('idea_text', 'No description')
+                        success, message = credits_repo.deduct_credits(
+                            user_id=payload["user_id"],
+                            amount=job_cost,
+                            job_id=result["job_id"],
+                            description=f"Job {job_type}: {str(idea_text)[:40]}"
+                        )
+                        if not success:
+                            result["status"] = "rejected"
+                            result["error"] = f"Insufficient credits: {message}"
+                            continue
+                        payload["credits_cost"] = job_cost
+                    except Exception as e:
+                        # Same policy as enqueue_job: system errors do not block the job
+                        log.error(f"⚠️ Error in credits validation for {result['job_id']}: {e}")
+            finally:
+                conn.close()
+        except ImportError:
+            log.warning("⚠️ Credits system modules not found, skipping validation")
+
+        accepted = [(result, job_type, payload) for result, job_type, payload in pending if result["status"] == "queued"]
+        if accepted:
+            try:
+                # Store in DB (Source of Truth) in one transaction
+                await storage.upsert_jobs([
+                    (result["job_id"], "queued", 0, job_type, payload) for result, job_type, payload in accepted
+                ])
+
+                # Add to Redis processing queue in one pipeline
+                await job_queue.enqueue_many(
+                    [(result["job_id"], job_type, payload) for result, job_type, payload in accepted],
+                    priority
+                )
+            except Exception as e:
+                # The deductions are already committed: give them back before failing the batch
+                log.error(f"❌ Failed to queue batch of {len(accepted)} jobs: {e}")
+                self._refund_batch([payload for _, _, payload in accepted], e)
+                raise
+            self._stats["total_jobs"] += len(accepted)
+
+        log.info(f"📥 Enqueued batch: {len(accepted)} queued, {len(results) - len(accepted)} rejected")
+        return results
+
+    def _refund_batch(self, payloads: List[Dict[str, Any]], error: Exception) -> None:
+        """Refund the credits deducted for a batch of jobs that never got queued"""
+        charged = [payload for payload in payloads if payload.get("credits_cost", 0) > 0 and payload.get("user_id")]
+        if not charged:
+            return
+        try:
+            from repositories.credits_repository import CreditsRepository
+
+            conn = get_conn()
+            try:
+                credits_repo = CreditsRepository(conn)
+                for payload in charged:
+                    try:
+                        credits_repo.add_credits(
+                            user_id=payload["user_id"],
+                            amount=payload["credits_cost"],
+                            transaction_type="refund",
+                            description=f"Refund for unqueued job {payload['job_id']}: {str(error)[:50]}"
+                        )
+                    except Exception as refund_error:
+                        log.error(f"❌ Failed to process refund for job {payload['job_id']}: {refund_error}")
+            finally:
+                conn.close()
+            log.info(f"💸 Refunded {len(charged)} jobs of the failed batch")
+        except Exception as refund_error:
+            log.error(f"❌ Failed to process refunds for batch: {refund_error}")
+
+    def _new_job_id(self, job_type: str) -> str:
+        raw_uuid = str(uuid.uuid4())
+        if job_type == "quick_create":
+            return f"qc-{raw_uuid[:12]}"
+        elif job_type == "quick_create_full_universe":
+            return f"qcf-{raw_uuid[:12]}"
+        elif job_type == "compose":
+            return f"compose-{raw_uuid[:12]}"
+        elif job_type == "tts":
+            return f"tts-{raw_uuid[:12]}"
+        return f"{raw_uuid[:12]}"
+
     async def start_workers(self, num_workers: int = 4):
         """Start worker processes"""
         if self._running:
@@ -397,10 +527,9 @@ class EnterpriseJobManager:
             # Store in memory
             self._jobs[job.job_id] = job
 
-            # Update database
-            conn = get_conn()
-            upsert_job(conn, job.job_id, "processing", 0, job_type=job.job_type, payload=job.payload)
-            conn.close()
+            # Update live status and database
+            if not await job_status_store.set_state(job.job_id, "processing", 0):
+                await storage.upsert_job(job.job_id, "processing", 0, job_type=job.job_type, payload=job.payload)
 
             # Process based on job type
             if job.job_type == "quick_create":
@@ -419,10 +548,8 @@ class EnterpriseJobManager:
             job.completed_at = time.time()
             job.progress = 100
 
-            # Update database
-            conn = get_conn()
-            upsert_job(conn, job.job_id, "done", 100, job_type=job.job_type, payload=job.payload)
-            conn.close()
+            # Update live status and database
+            await job_status_store.set_state(job.job_id, "done", 100, job.metadata)
 
             # Update stats
             self._stats["completed_jobs"] += 1
@@ -434,10 +561,8 @@ class EnterpriseJobManager:
             job.status = "error"
             job.error_message = str(e)
 
-            # Update database
-            conn = get_conn()
-            upsert_job(conn, job.job_id, "error", job.progress, job_type=job.job_type, payload=job.payload)
-            conn.close()
+            # Update live status and database
+            await job_status_store.set_state(job.job_id, "error", job.progress, job.metadata)
 
             # Update stats
             self._stats["failed_jobs"] += 1
@@ -458,15 +583,15 @@ class EnterpriseJobManager:
                     from repositories.credits_repository import CreditsRepository
                     
                     conn = get_conn()
-                    repo = CreditsRepository(conn)
-                    
-                    repo.add_credits(
-                        user_id=user_id,
-                        amount=credits_cost,
-                        transaction_type="refund",
-                        description=f"Refund for failed job {job.job_id}: {str(e)[:50]}"
-                    )
-                    conn.close()
+                    try:
+                        CreditsRepository(conn).add_credits(
+                            user_id=user_id,
+                            amount=credits_cost,
+                            transaction_type="refund",
+                            description=f"Refund for failed job {job.job_id}: {str(e)[:50]}"
+                        )
+                    finally:
+                        conn.close()
                     log.info(f"✅ Refund processed successfully for {job.job_id}")
                     
             except Exception as refund_error:
@@ -491,7 +616,7 @@ class EnterpriseJobManager:
             job.metadata["current_phase"] = description
 
             # Update database
-            self._save_job_state(job)
+            await self._save_job_state(job)
             # conn = get_conn()
             # upsert_job(conn, job.job_id, "running", progress)
             # conn.close()
@@ -545,18 +670,45 @@ class EnterpriseJobManager:
         job.metadata["style_key"] = style_key
         job.metadata["aspect_ratio"] = aspect_ratio
         job.metadata["dimensions"] = f"{width}x{height}"
+
+        image_path = media_dir / "concept.jpg"
+        output_path = media_dir / "universe_complete.mp4"
+
+        # Resume: work out which paid phases already completed on a previous attempt
+        checkpoints = await self._load_checkpoints(job.job_id)
+        concept_cp = checkpoints.get("concept_image")
+        crop_cp = checkpoints.get("crop")
+        video_cp = checkpoints.get("video")
+        mix_cp = checkpoints.get("audio_mix")
+
+        mix_done = bool(mix_cp) and await _file_matches(output_path, mix_cp["sha256"])
+        video_done = mix_done or (bool(video_cp) and (
+            await _file_matches(output_path, video_cp["sha256"])
+            or await self._download_file(video_cp["video_url"], output_path)
+        ))
+        crop_done = video_done or (bool(crop_cp) and await _file_matches(image_path, crop_cp["sha256"]))
+        if checkpoints:
+            log.info(f"♻️ Resuming job {job.job_id} (checkpoints: {', '.join(checkpoints)})")
         
         # Phase 1: AI Generation
         job.progress = 10
         job.metadata["current_phase"] = "🧠 Dreaming up concept (Kie.ai)..."
-        self._save_job_state(job) # Helper to update DB
+        await self._save_job_state(job) # Helper to update DB
         
-        image_path = media_dir / "concept.jpg"
         # Preserve image URL for video generation
         concept_image_url = None
         
         try:
-            if KIE_AVAILABLE:
+            if video_done:
+                log.info("⏭️ Video already generated on a previous attempt, skipping concept image")
+            elif crop_done:
+                concept_image_url = crop_cp["concept_image_url"]
+                log.info("⏭️ Reusing checkpointed cropped concept image")
+            elif concept_cp and (await _file_matches(image_path, concept_cp["sha256"])
+                                 or await self._download_file(concept_cp["concept_image_url"], image_path)):
+                concept_image_url = concept_cp["concept_image_url"]
+                log.info("⏭️ Reusing checkpointed concept image")
+            elif KIE_AVAILABLE:
                 log.info(f"🎨 Requesting AI Image for: {idea} ({width}x{height})")
                 concept_image_url = await kie_generate_image(
                     prompt=f"Cinematic shot, masterpiece: {idea}",
@@ -577,17 +729,26 @@ class EnterpriseJobManager:
                             log.info(f"🔗 Image URL preserved for video generation: {concept_image_url[:50]}...")
                         else:
                             raise Exception("Failed to download generated image")
+
+                await self._checkpoint(job, checkpoints, "concept_image", {
+                    "concept_image_url": concept_image_url,
+                    "image_path": str(image_path),
+                    "sha256": await asyncio.to_thread(_sha256_file, image_path)
+                })
             else:
                 raise Exception("KIE_AVAILABLE is False")
                 
         except Exception as e:
             log.error(f"⚠️ AI Generation failed: {e}. Using fallback.")
             # Create a simple colored image as fallback
-            subprocess.run(["ffmpeg", "-y", "-f", "lavfi", "-i", f"color=c=blue:s={width}x{height}:d=0.1", "-frames:v", "1", str(image_path)], check=False)
+            # (async subprocess so other jobs in this worker keep running)
+            await _run_subprocess(
+                "ffmpeg", "-y", "-f", "lavfi", "-i", f"color=c=blue:s={width}x{height}:d=0.1", "-frames:v", "1", str(image_path)
+            )
 
         # Phase 1.5: Normalize Image for Vertical Video (CRITICAL FIX)
         # Force crop to ensure 9:16 if requested, preventing horizontal images in vertical video
-        if aspect_ratio == "9:16" and image_path.exists():
+        if aspect_ratio == "9:16" and image_path.exists() and not crop_done:
             try:
                 log.info(f"📐 Enforcing 9:16 Aspect Ratio ({width}x{height}) on source image...")
                 temp_crop_path = media_dir / "concept_cropped.jpg"
@@ -609,32 +770,42 @@ class EnterpriseJobManager:
                     str(temp_crop_path)
                 ]
                 
-                process = await asyncio.create_subprocess_exec(*cmd_smart_crop, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                await process.communicate()
+                await _run_subprocess(*cmd_smart_crop)
                 
                 if temp_crop_path.exists() and temp_crop_path.stat().st_size > 0:
                     os.replace(temp_crop_path, image_path)
                     log.info("✅ Image successfully transformed to 9:16 vertical format")
                     
-                    # Force usage of local cropped image
-                    # Ensure path matches where FastAPI serves static files
-                    relative_path = f"media/{job_id}/{image_filename}"
-                    concept_image_url = f"{settings.PUBLIC_BASE_URL}/{relative_path}"
-                    log.info(f"🔄 Switched to local cropped image URL: {concept_image_url}")
+                    # Only a real AI image is checkpointed, the fallback color frame must
+                    # not be sent to video generation. The KIE image URL stays the video
+                    # input unless the cropped copy (served from /files) is asked for
+                    if concept_image_url:
+                        if settings.VIDEO_INPUT_CROPPED_IMAGE:
+                            relative_path = f"files/{job.job_id}/{image_path.name}"
+                            concept_image_url = f"{settings.PUBLIC_BASE_URL}/{relative_path}"
+                            log.info(f"🔄 Switched to local cropped image URL: {concept_image_url}")
+                        await self._checkpoint(job, checkpoints, "crop", {
+                            "concept_image_url": concept_image_url,
+                            "image_path": str(image_path),
+                            "sha256": await asyncio.to_thread(_sha256_file, image_path)
+                        })
             except Exception as e:
                 log.error(f"❌ Failed to crop image: {e}")
 
         # Phase 2: AI Video Generation
         job.progress = 50
         job.metadata["current_phase"] = "🎬 Generating AI video with motion..."
-        self._save_job_state(job)
+        await self._save_job_state(job)
         
-        output_path = media_dir / "universe_complete.mp4"
         video_generated = False
         
         # Try AI video generation first
         try:
-            if VIDEO_AVAILABLE and concept_image_url:  # Use image-to-video if we have the image
+            if video_done:
+                log.info("⏭️ Reusing checkpointed AI video")
+                video_generated = True
+                job.metadata["video_source"] = "ai_generated"
+            elif VIDEO_AVAILABLE and concept_image_url:  # Use image-to-video if we have the image
                 # KIE.ai Wan 2.6 only supports 5s or 10s blocks. Force 5s to save credits.
                 final_duration = 5
                 # if video_duration > 5:
@@ -661,6 +832,11 @@ class EnterpriseJobManager:
                                 log.info(f"✅ AI Video downloaded to {output_path}")
                                 video_generated = True
                                 job.metadata["video_source"] = "ai_generated"
+                                await self._checkpoint(job, checkpoints, "video", {
+                                    "video_url": video_url,
+                                    "video_path": str(output_path),
+                                    "sha256": await asyncio.to_thread(_sha256_file, output_path)
+                                })
                             else:
                                 log.warning(f"⚠️ Failed to download video: {resp.status}")
                 else:
@@ -683,8 +859,7 @@ class EnterpriseJobManager:
                     "-vf", f"scale={width}:{height}",
                     str(output_path)
                 ]
-                process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                await process.communicate()
+                await _run_subprocess(*cmd)
                 log.info(f"📼 Fallback video rendered at {output_path}")
             except Exception as e:
                 log.error(f"❌ FFmpeg failed: {e}")
@@ -692,7 +867,7 @@ class EnterpriseJobManager:
         # Phase 3: Audio & Finalizing (Music Mixing)
         job.progress = 80
         job.metadata["current_phase"] = "🎵 Adding soundtrack..."
-        self._save_job_state(job)
+        await self._save_job_state(job)
         
         final_output_path = media_dir / "universe_final.mp4"
         
@@ -708,18 +883,21 @@ class EnterpriseJobManager:
         audio_path = media_dir / "soundtrack.mp3"
         
         has_audio = False
-        try:
-            log.info(f"🎵 Downloading audio for style '{style_key}': {audio_url}")
-            async with aiohttp.ClientSession() as session:
-                async with session.get(audio_url) as resp:
-                    if resp.status == 200:
-                        with open(audio_path, 'wb') as f:
-                            f.write(await resp.read())
-                        has_audio = True
-                    else:
-                        log.warning(f"⚠️ Failed to download audio: {resp.status}")
-        except Exception as e:
-            log.warning(f"⚠️ Audio download failed: {e}")
+        if mix_done:
+            log.info("⏭️ Soundtrack already mixed on a previous attempt")
+        else:
+            try:
+                log.info(f"🎵 Downloading audio for style '{style_key}': {audio_url}")
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(audio_url) as resp:
+                        if resp.status == 200:
+                            with open(audio_path, 'wb') as f:
+                                f.write(await resp.read())
+                            has_audio = True
+                        else:
+                            log.warning(f"⚠️ Failed to download audio: {resp.status}")
+            except Exception as e:
+                log.warning(f"⚠️ Audio download failed: {e}")
 
         # Mix Audio with Video
         if has_audio and os.path.exists(output_path):
@@ -739,14 +917,17 @@ class EnterpriseJobManager:
                     str(final_output_path)
                 ]
                 
-                process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-                await process.communicate()
+                await _run_subprocess(*cmd)
                 
                 # Verify success
                 if final_output_path.exists() and final_output_path.stat().st_size > 0:
                     log.info(f"✅ Audio mix successful: {final_output_path}")
                     # Replace origin output with final version for the user
                     os.replace(final_output_path, output_path) 
+                    await self._checkpoint(job, checkpoints, "audio_mix", {
+                        "video_path": str(output_path),
+                        "sha256": await asyncio.to_thread(_sha256_file, output_path)
+                    })
             except Exception as e:
                 log.error(f"❌ Audio mix failed: {e}")
         
@@ -762,10 +943,49 @@ class EnterpriseJobManager:
             "series_url": f"/files/{job.job_id}/series.json"
         })
         
-    def _save_job_state(self, job):
-        conn = get_conn()
-        upsert_job(conn, job.job_id, "running", job.progress, job_type=job.job_type, payload=job.payload)
-        conn.close()
+    async def _save_job_state(self, job):
+        await job_status_store.update_progress(
+            job.job_id, "running", job.progress,
+            job_type=job.job_type, payload=job.payload, metadata=job.metadata
+        )
+
+    async def _load_checkpoints(self, job_id: str) -> Dict[str, Dict[str, Any]]:
+        """Get the outputs of phases completed by earlier attempts of a job"""
+        try:
+            return await storage.get_job_checkpoints(job_id)
+        except Exception as e:
+            log.warning(f"⚠️ Could not load checkpoints for {job_id}, starting from scratch: {e}")
+            return {}
+
+    async def _checkpoint(self, job: EnterpriseJob, checkpoints: Dict[str, Any], phase: str, data: Dict[str, Any]):
+        """Durably record a completed phase so a retry can skip it"""
+        checkpoints[phase] = data
+        try:
+            await storage.save_job_checkpoint(job.job_id, phase, data)
+            log.info(f"💾 Checkpointed phase '{phase}' for job {job.job_id}")
+        except Exception as e:
+            # Not fatal: the job still completes, a retry just redoes this phase
+            log.warning(f"⚠️ Failed to checkpoint phase '{phase}' for {job.job_id}: {e}")
+
+    async def _download_file(self, url: Optional[str], path: Path) -> bool:
+        """Re-fetch an already generated asset; written atomically so a partial file never passes as done"""
+        if not url:
+            return False
+        tmp_path = path.with_name(path.name + ".part")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as resp:
+                    if resp.status != 200:
+                        log.warning(f"⚠️ Checkpointed asset no longer available ({resp.status}): {url[:50]}...")
+                        return False
+                    with open(tmp_path, 'wb') as f:
+                        f.write(await resp.read())
+            os.replace(tmp_path, path)
+            log.info(f"⬇️ Restored checkpointed asset to {path}")
+            return True
+        except Exception as e:
+            log.warning(f"⚠️ Failed to restore checkpointed asset {url[:50]}...: {e}")
+            return False
 
     async def _process_compose(self, worker_id: str, job: EnterpriseJob):
         """Process video composition job"""
@@ -782,7 +1002,7 @@ class EnterpriseJobManager:
             job.metadata["current_phase"] = description
 
             # Update database
-            self._save_job_state(job)
+            await self._save_job_state(job)
             # conn = get_conn()
             # upsert_job(conn, job.job_id, "running", progress)
             # conn.close()
@@ -801,7 +1021,7 @@ class EnterpriseJobManager:
         job.metadata["current_phase"] = "Converting text to speech..."
 
         # Update database
-        self._save_job_state(job)
+        await self._save_job_state(job)
         # conn = get_conn()
         # upsert_job(conn, job.job_id, "running", 30)
         # conn.close()
@@ -812,7 +1032,7 @@ class EnterpriseJobManager:
         job.metadata["current_phase"] = "Optimizing audio..."
 
         # Update database
-        self._save_job_state(job)
+        await self._save_job_state(job)
         # conn = get_conn()
         # upsert_job(conn, job.job_id, "running", 80)
         # conn.close()
@@ -828,45 +1048,51 @@ class EnterpriseJobManager:
 
 
     async def get_job_status(self, job_id: str) -> Optional[EnterpriseJob]:
-        """Get current job status"""
-        return self._jobs.get(job_id)
+        """Get current job status, from the shared store when the job runs in another process"""
+        job = self._jobs.get(job_id)
+        if job:
+            return job
+
+        live = await job_status_store.get(job_id)
+        if not live:
+            return None
+        job = EnterpriseJob(job_id, live.get("job_type", "unknown"), {})
+        job.status = live.get("state", job.status)
+        job.progress = live.get("progress", 0)
+        job.metadata = live["metadata"]
+        return job
 
     async def cancel_job(self, job_id: str) -> bool:
-        """Cancel a job if it hasn't started processing"""
-        job = self._jobs.get(job_id)
-        if not job:
+        """Cancel a queued or running job on whichever worker process owns it"""
+        row = await storage.get_job(job_id)
+        if not row or row[1] not in ("queued", "processing", "running"):
+            log.warning(f"⚠️ Cannot cancel job {job_id} - status: {row[1] if row else 'not found'}")
             return False
 
-        if job.status == "queued":
+        await job_status_store.set_state(job_id, "cancelled")
+
+        # Queued jobs see the marker before starting; running ones get the broadcast
+        await job_cancellation.request(job_id)
+
+        job = self._jobs.get(job_id)
+        if job:
             job.status = "cancelled"
             job.completed_at = time.time()
 
-            # Update database
-            conn = get_conn()
-            upsert_job(conn, job_id, "cancelled", job.progress, job_type=job.job_type, payload=job.payload)
-            conn.close()
-
-            self._stats["cancelled_jobs"] += 1
-            log.info(f"🚫 Cancelled job {job_id}")
-            return True
-        else:
-            log.warning(f"⚠️ Cannot cancel job {job_id} - status: {job.status}")
-            return False
+        self._stats["cancelled_jobs"] += 1
+        log.info(f"🚫 Cancelled job {job_id}")
+        return True
 
     async def get_queue_stats(self) -> Dict[str, Any]:
         """Get queue statistics"""
-        queued_count = sum(1 for job in self._jobs.values() if job.status == "queued")
-        processing_count = sum(1 for job in self._jobs.values() if job.status == "processing")
-        completed_count = sum(1 for job in self._jobs.values() if job.status == "completed")
-        failed_count = sum(1 for job in self._jobs.values() if job.status == "error")
-        cancelled_count = sum(1 for job in self._jobs.values() if job.status == "cancelled")
+        counts = Counter(job.status for job in self._jobs.values())
 
         return {
-            "queued": queued_count,
-            "processing": processing_count,
-            "completed": completed_count,
-            "failed": failed_count,
-            "cancelled": cancelled_count,
+            "queued": counts["queued"],
+            "processing": counts["processing"],
+            "completed": counts["completed"],
+            "failed": counts["error"],
+            "cancelled": counts["cancelled"],
             "total": len(self._jobs),
             "workers_running": self._running,
             "active_workers": len(self._workers),
@@ -0,0 +1,143 @@
+"""
+Bounded-concurrency job executor for the Redis worker process.
+
+Jobs spend most of their time waiting on KIE polling and downloads, so a
+single worker overlaps many of them as asyncio tasks. A global semaphore caps
+the total in flight and optional per-job-type semaphores cap expensive types
+(e.g. ffmpeg-heavy compose jobs). The worker loop asks saturated_types()
+before dequeuing so a job of a capped type never holds a global slot while
+waiting for its type slot.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+log = logging.getLogger(__name__)
+
+class JobExecutor:
+    """Runs jobs as background tasks under a global and per-job-type limit"""
+
+    def __init__(self, max_concurrent: int, type_limits: Optional[Dict[str, int]] = None):
+        self.max_concurrent = max_concurrent
+        self.type_limits = type_limits or {}
+        self._global_slots = asyncio.Semaphore(max_concurrent)
+        self._type_slots: Dict[str, asyncio.Semaphore] = {
+            job_type: asyncio.Semaphore(limit) for job_type, limit in self.type_limits.items()
+        }
+        self._tasks: Set[asyncio.Task] = set()
+        self._by_key: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+        self._running: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._admitted: Dict[str, int] = defaultdict(int)
+
+    async def acquire_slot(self):
+        """Wait for a free global slot; call before dequeuing so we never over-fetch"""
+        await self._global_slots.acquire()
+
+    def release_slot(self):
+        """Give back a slot acquired with acquire_slot() that was not used"""
+        self._global_slots.release()
+
+    def submit(self, job_type: str, func: Callable[..., Awaitable[Any]], *args,
+               key: Optional[str] = None) -> asyncio.Task:
+        """Run func(*args) in the background; the caller must hold a global slot"""
+        task = asyncio.create_task(self._run(job_type, func, *args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        # Counted until the task is done, even if it is cancelled before it starts
+        self._admitted[job_type] += 1
+        task.add_done_callback(lambda _: self._discharge(job_type))
+        if key:
+            self._by_key[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return task
+
+    def saturated_types(self) -> Set[str]:
+        """Job types whose limit is taken up by submitted jobs; dequeue none of these"""
+        return {
+            job_type for job_type, limit in self.type_limits.items()
+            if self._admitted[job_type] >= limit
+        }
+
+    def _discharge(self, job_type: str):
+        self._admitted[job_type] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._by_key.get(key) is task:
+            del self._by_key[key]
+            self._cancel_requested.discard(key)
+
+    def cancel(self, key: str) -> bool:
+        """Cancel the task submitted under key, if it runs here; frees its slots immediately"""
+        task = self._by_key.get(key)
+        if task is None or task.done():
+            return False
+        self._cancel_requested.add(key)
+        task.cancel()
+        return True
+
+    def is_cancel_requested(self, key: str) -> bool:
+        """Whether a CancelledError in this task came from cancel() rather than shutdown"""
+        return key in self._cancel_requested
+
+    async def _run(self, job_type: str, func: Callable[..., Awaitable[Any]], *args):
+        try:
+            type_slot = self._type_slots.get(job_type)
+            if type_slot is None:
+                await self._execute(job_type, func, *args)
+                return
+
+            self._waiting[job_type] += 1
+            try:
+                await type_slot.acquire()
+            finally:
+                self._waiting[job_type] -= 1
+            try:
+                await self._execute(job_type, func, *args)
+            finally:
+                type_slot.release()
+        finally:
+            self._global_slots.release()
+
+    async def _execute(self, job_type: str, func: Callable[..., Awaitable[Any]], *args):
+        self._running[job_type] += 1
+        try:
+            await func(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"❌ Unhandled error in {job_type} task: {e}", exc_info=True)
+        finally:
+            self._running[job_type] -= 1
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait for in-flight jobs to finish, cancelling whatever is left after timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        # Loop because a job dequeued just before shutdown may be submitted late
+        while self._tasks:
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            log.info(f"⏳ Waiting for {len(self._tasks)} in-flight jobs...")
+            await asyncio.wait(set(self._tasks), timeout=remaining)
+
+        pending = set(self._tasks)
+        for task in pending:
+            task.cancel()
+        if pending:
+            log.warning(f"🛑 Cancelled {len(pending)} jobs still running after drain timeout")
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current executor occupancy"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": len(self._tasks),
+            "running_by_type": {k: v for k, v in self._running.items() if v},
+            "waiting_by_type": {k: v for k, v in self._waiting.items() if v},
+            "type_limits": dict(self.type_limits)
+        }
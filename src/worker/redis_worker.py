@@ -19,6 +19,7 @@ from redis.asyncio import ConnectionPool
 from core.config import settings
 from core.cache import cache_manager, CacheError
 from core.logging import setup_logging
+from core.queue import JobPriority
 
 log = setup_logging()
 
@@ -30,12 +31,6 @@ class JobStatus(str, Enum):
     CANCELLED = "cancelled"
     RETRYING = "retrying"
 
-class JobPriority(int, Enum):
-    LOW = 1
-    NORMAL = 2
-    HIGH = 3
-    CRITICAL = 4
-
 @dataclass
 class Job:
     """Job data structure"""
@@ -464,10 +459,11 @@ class RedisWorkerManager:
                 count = await self._redis.llen(queue_key)
                 stats['queued'][priority.name.lower()] = count
 
-            # Count processing jobs
+            # Count processing jobs (SCAN, so counting never blocks the queue)
             processing_pattern = f"{self._processing_queue_name}:*"
-            processing_keys = await self._redis.keys(processing_pattern)
-            stats['processing'] = len(processing_keys)
+            stats['processing'] = 0
+            async for _ in self._redis.scan_iter(match=processing_pattern, count=settings.CACHE_SCAN_BATCH_SIZE):
+                stats['processing'] += 1
 
             # Count failed jobs
             stats['failed'] = await self._redis.llen(self._failed_queue_name)
@@ -517,23 +513,13 @@ class RedisWorkerManager:
         try:
             cutoff_time = datetime.utcnow() - timedelta(days=days)
 
-            # Get all job keys from cache
-            job_keys = await cache_manager._redis.keys(f"{cache_manager._prefix}jobs:job:*")
-
-            cleaned = 0
-            for key in job_keys:
-                try:
-                    job_data = await cache_manager._redis.get(key)
-                    if job_data:
-                        job_dict = json.loads(job_data.decode('utf-8'))
-                        job = Job.from_dict(job_dict)
-
-                        if (job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED] and
-                            job.created_at < cutoff_time):
-                            await cache_manager._redis.delete(key)
-                            cleaned += 1
-                except Exception:
-                    continue
+            def is_old_finished_job(job_dict) -> bool:
+                job = Job.from_dict(job_dict)
+                return (job.status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED] and
+                        job.created_at < cutoff_time)
+
+            # SCAN-based sweep; KEYS would block the queue sharing this Redis
+            cleaned = await cache_manager.sweep("job:*", is_old_finished_job, namespace="jobs")
 
             log.info(f"🧹 Cleaned up {cleaned} old jobs from cache")
 
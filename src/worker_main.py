@@ -3,24 +3,48 @@ import asyncio
 import logging
 import signal
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
+from core.archive import job_archiver
+from core.cancellation import job_cancellation
+from core.config import settings
+from core.job_status import job_status_store
 from core.logging import setup_logging
 from core.queue import job_queue
+from core.retry import TRANSIENT_FIELDS, retry_scheduler
+from core.storage import storage
 from worker.enterprise_manager import enterprise_job_manager, EnterpriseJob
+from worker.executor import JobExecutor
 
 # Configure Logging
 log = setup_logging()
 
+executor = JobExecutor(settings.WORKER_MAX_CONCURRENT_JOBS, settings.worker_job_type_limits)
+
+# Seconds to let in-flight jobs finish on SIGTERM before cancelling them
+SHUTDOWN_GRACE_SECONDS = 20
+
+# Set on SIGTERM so the loop stops pulling new jobs while in-flight ones drain
+stop_requested = asyncio.Event()
+
 async def shutdown(signal, loop):
     """Cleanup tasks tied to the service's shutdown."""
     log.info(f"Received exit signal {signal.name}...")
+
+    # Unfinished jobs are not acked, so with the streams backend they are
+    # reclaimed by another worker after cancellation
+    stop_requested.set()
+    log.info("Draining in-flight jobs...")
+    await executor.drain(timeout=SHUTDOWN_GRACE_SECONDS)
     
     log.info("Closing Redis connection...")
     await job_queue.close()
+    await job_cancellation.close()
+    await job_status_store.close()
     
     log.info("Closing Enterprise Manager...")
     await enterprise_job_manager.close()
+    await storage.close()
     
     tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
     [task.cancel() for task in tasks]
@@ -29,58 +53,138 @@ async def shutdown(signal, loop):
     await asyncio.gather(*tasks, return_exceptions=True)
     loop.stop()
 
+async def keep_alive(job_data: Dict[str, Any]):
+    """Periodically refresh queue ownership of a running job so it is not reclaimed"""
+    interval = max(settings.QUEUE_CLAIM_IDLE_MS / 3000, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job_queue.touch(job_data)
+        except Exception as e:
+            log.warning(f"⚠️ Failed to refresh queue lease for {job_data.get('job_id')}: {e}")
+
+async def set_job_state(job_id: str, state: str, progress: Optional[int] = None,
+                        metadata: Optional[Dict[str, Any]] = None):
+    """Record a job outcome (done, retry, dead-letter, cancelled) in the status store"""
+    try:
+        await job_status_store.set_state(job_id, state, progress, metadata)
+    except Exception as e:
+        log.warning(f"⚠️ Failed to set state '{state}' for job {job_id}: {e}")
+
+async def dead_letter_reclaimed(job_data: Dict[str, Any], error: str):
+    """Dead-letter a reclaimed job that keeps killing its worker instead of running it again"""
+    message = {k: v for k, v in job_data.items() if k not in TRANSIENT_FIELDS}
+    await retry_scheduler.dead_letter(message, error)
+    await set_job_state(job_data.get("job_id"), "error")
+
+async def on_cancel(job_id: str):
+    """Stop a job cancelled from the API if this worker is running it"""
+    if executor.cancel(job_id):
+        log.info(f"🛑 Cancelling running job {job_id}")
+
+async def handle_job(job_data: Dict[str, Any]):
+    """Run a single dequeued job through the enterprise manager and ack it"""
+    job_id = job_data.get("job_id")
+    job_type = job_data.get("type")
+    payload = job_data.get("payload", {})
+
+    log.info(f"📥 Received job: {job_id} ({job_type})")
+
+    # Cancelled while still queued: drop it without doing any work
+    if await job_cancellation.is_cancelled(job_id):
+        log.info(f"🚫 Skipping cancelled job {job_id}")
+        await job_queue.ack(job_data)
+        return
+
+    # Reconstruct Job Object
+    # EnterpriseJob expects (job_id, job_type, payload)
+    job = EnterpriseJob(job_id, job_type, payload)
+
+    # Inject into manager's processing pipeline
+    # We call the internal dispatcher directly
+    try:
+        # Add to local tracking so manager knows about it (for logging/stats)
+        enterprise_job_manager._jobs[job_id] = job
+
+        # Dispatch depending on type
+        final_state = "done"
+        if job_type == "quick_create_full_universe":
+             await enterprise_job_manager._process_quick_create_full_universe("worker-redis", job)
+        elif job_type == "compose":
+             await enterprise_job_manager._process_compose("worker-redis", job)
+        elif job_type == "tts":
+             await enterprise_job_manager._process_tts("worker-redis", job)
+        else:
+            log.error(f"❌ Unknown job type: {job_type}")
+            final_state = "error"
+
+        # Final metadata (output_url...) is only set after the last progress tick
+        await set_job_state(job_id, final_state, 100 if final_state == "done" else None, job.metadata)
+        log.info(f"✅ Job {job_id} processed successfully")
+
+    except asyncio.CancelledError:
+        # Shutdown cancellations propagate so the message stays unacked and is redelivered
+        if not executor.is_cancel_requested(job_id):
+            raise
+        log.info(f"🚫 Job {job_id} cancelled by user")
+        await set_job_state(job_id, "cancelled")
+    except Exception as e:
+        log.error(f"❌ Error processing job {job_id}: {e}", exc_info=True)
+        # If this raises the message is not acked and gets redelivered instead
+        retried = await retry_scheduler.handle_failure(job_data, str(e))
+        await set_job_state(job_id, "queued" if retried else "error")
+    finally:
+        # Clean up local memory
+        enterprise_job_manager._jobs.pop(job_id, None)
+
+    # Ack only after the handler returned: a crash before this point
+    # leaves the message pending so another worker can reclaim it
+    await job_queue.ack(job_data)
+
 async def worker_loop():
     """Main worker loop consuming from Redis"""
-    log.info("🚀 Worker started. Waiting for jobs in Redis queue...")
-    
-    # Initialize Manager (DB connection, etc)
+    log.info(
+        f"🚀 Worker started (max {executor.max_concurrent} concurrent jobs, "
+        f"limits {executor.type_limits}). Waiting for jobs in Redis queue..."
+    )
+
+    # Initialize storage and manager
+    await storage.initialize()
     await enterprise_job_manager.initialize()
-    
-    while True:
+
+    # Reclaimed entries count toward the retry limit like failures do
+    job_queue.on_exhausted = dead_letter_reclaimed
+
+    # Every worker runs the promoter; the Lua script makes concurrent runs safe
+    asyncio.create_task(retry_scheduler.run(stop_requested))
+    asyncio.create_task(job_cancellation.listen(on_cancel, stop_requested))
+    # Keeps the jobs table small; concurrent archivers never move the same job twice
+    asyncio.create_task(job_archiver.run(stop_requested))
+
+    while not stop_requested.is_set():
         try:
-            # Blocking pop with 5s timeout to allow clean shutdown checks
-            job_data = await job_queue.dequeue(timeout=5)
-            
+            # Only pull a job when there is capacity to start it
+            await executor.acquire_slot()
+
+            try:
+                # Blocking pop with 5s timeout to allow clean shutdown checks; types
+                # already at their limit stay queued instead of waiting here on a slot
+                saturated = executor.saturated_types()
+                job_data = await job_queue.dequeue(timeout=1 if saturated else 5, skip_types=saturated)
+            except BaseException:
+                executor.release_slot()
+                raise
+
             if not job_data:
+                executor.release_slot()
                 continue
-                
-            job_id = job_data.get("job_id")
-            job_type = job_data.get("type")
-            payload = job_data.get("payload", {})
-            
-            log.info(f"📥 Received job: {job_id} ({job_type})")
-            
-            # Reconstruct Job Object
-            # EnterpriseJob expects (job_id, job_type, payload)
-            job = EnterpriseJob(job_id, job_type, payload)
-            
-            # Inject into manager's processing pipeline
-            # We call the internal dispatcher directly
-            # Note: In a cleaner refactor, this would be a public 'handle_job' method
-            try:
-                # Add to local tracking so manager knows about it (for logging/stats)
-                enterprise_job_manager._jobs[job_id] = job
-                
-                # Dispatch depending on type
-                if job_type == "quick_create_full_universe":
-                     await enterprise_job_manager._process_quick_create_full_universe("worker-redis", job)
-                elif job_type == "compose":
-                     await enterprise_job_manager._process_compose("worker-redis", job)
-                elif job_type == "tts":
-                     await enterprise_job_manager._process_tts("worker-redis", job)
-                else:
-                    log.error(f"❌ Unknown job type: {job_type}")
-                    
-                log.info(f"✅ Job {job_id} processed successfully")
-                
-            except Exception as e:
-                log.error(f"❌ Error processing job {job_id}: {e}", exc_info=True)
-                # Ideally, move to Dead Letter Queue (DLQ)
-            
-            # Clean up local memory
-            if job_id in enterprise_job_manager._jobs:
-                del enterprise_job_manager._jobs[job_id]
-                
+
+            # Heartbeat from submission on: the job may wait for its type slot
+            # longer than the claim idle time before handle_job even starts
+            heartbeat = asyncio.create_task(keep_alive(job_data))
+            task = executor.submit(job_data.get("type"), handle_job, job_data, key=job_data.get("job_id"))
+            task.add_done_callback(lambda _, heartbeat=heartbeat: heartbeat.cancel())
+
         except asyncio.CancelledError:
             log.info("Worker loop cancelled")
             break
@@ -0,0 +1,82 @@
+"""
+Encode/decode time and stored size of the cache codecs on typical values.
+
+"job" is a worker Job.to_dict() with a quick_create payload and result,
+"metrics" a flushed metrics blob, "small" a counter-sized dict. The stored
+size (header included) is what a value adds to Redis used_memory, give or
+take the per-key overhead that is the same for every codec.
+"""
+
+import time
+
+import pytest
+
+from core import cache_codecs
+
+ROUNDS = 2000
+
+
+def _job() -> dict:
+    planos = [
+        {"item_id": f"plano-{i:03d}", "prompt": f"Wide shot of the harbour at dusk, scene {i}, cinematic lighting",
+         "duration": 4.5, "status": "completed", "url": f"https://cdn.example.com/renders/qcf-1/plano-{i:03d}.mp4"}
+        for i in range(40)
+    ]
+    return {
+        "job_id": "qcf-1", "job_type": "quick_create_full_universe", "status": "completed", "priority": 2,
+        "created_at": "2026-10-16T12:00:00", "started_at": "2026-10-16T12:00:01", "completed_at": "2026-10-16T12:03:12",
+        "retry_count": 0, "max_retries": 3, "error": None,
+        "payload": {"universe": "harbour", "style": "noir", "planos": [p["prompt"] for p in planos]},
+        "result": {"planos": planos}, "metadata": {"user_id": "user-42", "credits": 120},
+    }
+
+
+def _metrics() -> dict:
+    return {
+        "name": "job_duration_seconds",
+        "points": [{"timestamp": 1760616000 + i, "value": 3.0 + (i % 17) / 10, "tags": {"job_type": "tts"}}
+                   for i in range(500)],
+    }
+
+
+VALUES = {"small": {"job_id": "qcf-1", "state": "running", "progress": 40}, "job": _job(), "metrics": _metrics()}
+
+
+def _measure(value, codec: str, compression: str):
+    codec, compressor = cache_codecs.resolve(codec, compression)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        encoded = cache_codecs.encode(value, codec, compressor, min_bytes=1024)
+    encode_us = (time.perf_counter() - start) / ROUNDS * 1e6
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        cache_codecs.decode(encoded)
+    decode_us = (time.perf_counter() - start) / ROUNDS * 1e6
+    return encoded, encode_us, decode_us
+
+
+class TestCacheCodecBenchmarks:
+    """Size and speed benchmarks for the cache codecs."""
+
+    @pytest.mark.performance
+    @pytest.mark.slow
+    @pytest.mark.parametrize("name", list(VALUES))
+    def test_codec_sizes_and_speed(self, name):
+        """Test: Compression shrinks the large values; every combination round-trips"""
+        value = VALUES[name]
+        sizes = {}
+        print(f"\n{name}:")
+        for codec in cache_codecs.CODECS:
+            for compression in cache_codecs.COMPRESSORS:
+                encoded, encode_us, decode_us = _measure(value, codec, compression)
+                sizes[codec, compression] = len(encoded)
+                print(f"  {codec:>7}/{compression:<4} {len(encoded):>7} B  "
+                      f"encode {encode_us:8.1f}us  decode {decode_us:8.1f}us")
+                assert cache_codecs.decode(encoded) == value
+
+        if name == "small":
+            assert sizes["pickle", "zlib"] == sizes["pickle", "none"]
+        else:
+            # The job and metrics blobs are repetitive enough to shrink several times over
+            assert sizes["pickle", "zlib"] * 3 < sizes["pickle", "none"]
+            assert sizes["json", "zlib"] * 3 < sizes["json", "none"]
@@ -0,0 +1,97 @@
+"""
+Write amplification of job progress writes in models.dao.
+
+Progress ticks used to go through a full upsert: a SELECT, then an UPDATE
+that re-serialized the payload and rewrote every indexed column. They now
+use update_job_progress. Bytes appended to the WAL per tick are measured
+for both, on payloads the size of real quick-create requests.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from models.dao import UPDATED_AT, init_db, upsert_jobs, update_job_progress
+
+NUM_JOBS = 500
+TICKS_PER_JOB = 5
+PAYLOAD_SIZES = (1_000, 4_000, 16_000)
+
+
+def _legacy_upsert_job(conn, job_id, state, progress, job_type='unknown', payload=None):
+    """upsert_job as it was: SELECT, then a full-row UPDATE"""
+    payload = payload or {}
+    cur = conn.cursor()
+    cur.execute("SELECT created_at FROM jobs WHERE job_id = ?", (job_id,))
+    cur.fetchone()
+    cur.execute(
+        f"UPDATE jobs SET state=?, progress=?, job_type=?, payload=?, user_id=?, updated_at={UPDATED_AT} WHERE job_id=?",
+        (state, progress, job_type, json.dumps(payload), payload.get("user_id"), time.time(), job_id)
+    )
+    conn.commit()
+
+
+def _payload(size: int) -> dict:
+    """Quick-create style payload whose JSON is about `size` bytes"""
+    payload = {
+        "job_id": "qcf-0",
+        "user_id": "user-42",
+        "request": {"idea_text": "", "style_key": "cinematic_realism", "duration": "30s", "auto_create_universe": True},
+        "credits_cost": 25,
+    }
+    payload["request"]["idea_text"] = "a" * (size - len(json.dumps(payload)))
+    return payload
+
+
+def _measure(tmp_path, name: str, size: int, tick) -> dict:
+    """WAL bytes and time per progress tick"""
+    path = tmp_path / f"{name}-{size}.db"
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    init_db(conn)
+    payload = _payload(size)
+    upsert_jobs(conn, [(f"qcf-{i}", "running", 0, "quick_create_full_universe", payload) for i in range(NUM_JOBS)])
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    wal = f"{path}-wal"
+    wal_before = os.path.getsize(wal)
+    start = time.perf_counter()
+    for progress in range(1, TICKS_PER_JOB + 1):
+        for i in range(NUM_JOBS):
+            tick(conn, f"qcf-{i}", progress * 10, payload)
+    elapsed = time.perf_counter() - start
+    writes = NUM_JOBS * TICKS_PER_JOB
+    wal_bytes = os.path.getsize(wal) - wal_before
+    conn.close()
+
+    return {"wal_bytes_per_write": wal_bytes / writes, "us_per_write": elapsed / writes * 1e6}
+
+
+class TestDaoWriteAmplification:
+    """Write amplification benchmarks for the job progress write path."""
+
+    @pytest.mark.performance
+    @pytest.mark.slow
+    def test_progress_update_writes_less_than_full_upsert(self, tmp_path):
+        """Test: update_job_progress appends fewer WAL bytes per tick than the full upsert"""
+        def full_upsert(conn, job_id, progress, payload):
+            _legacy_upsert_job(conn, job_id, "running", progress, job_type="quick_create_full_universe", payload=payload)
+
+        def narrow_update(conn, job_id, progress, payload):
+            update_job_progress(conn, job_id, progress)
+
+        print(f"\nProgress ticks ({NUM_JOBS} jobs x {TICKS_PER_JOB}):")
+        for size in PAYLOAD_SIZES:
+            before = _measure(tmp_path, "upsert", size, full_upsert)
+            after = _measure(tmp_path, "progress", size, narrow_update)
+
+            print(f"  payload {size // 1000}KB: full upsert {before['wal_bytes_per_write']:.0f} B/write "
+                  f"{before['us_per_write']:.0f}us, progress-only {after['wal_bytes_per_write']:.0f} B/write "
+                  f"{after['us_per_write']:.0f}us "
+                  f"({1 - after['wal_bytes_per_write'] / before['wal_bytes_per_write']:.0%} fewer bytes)")
+
+            assert after["wal_bytes_per_write"] < before["wal_bytes_per_write"]
@@ -0,0 +1,71 @@
+"""
+Write throughput of per-call commits versus the group-commit writer.
+
+Many job coroutines report state changes at once, the way the worker's
+executor runs them. "per-call" is AsyncDB.run(update_job_state, ...), one
+transaction per write. "group commit" is GroupCommitWriter.submit, which
+folds the writes waiting at the same moment into one transaction.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from core.db import SQLitePool
+from core.db_async import AsyncDB
+from core.db_writer import GroupCommitWriter
+from models.dao import init_db, upsert_jobs, update_job_state
+
+NUM_JOBS = 64
+WRITES_PER_JOB = 40
+
+
+async def _run(write) -> float:
+    """NUM_JOBS coroutines each writing WRITES_PER_JOB state changes; returns writes/s"""
+    async def job(i: int):
+        for n in range(WRITES_PER_JOB):
+            await write(update_job_state, f"job-{i}", "running", n)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(job(i) for i in range(NUM_JOBS)))
+    return NUM_JOBS * WRITES_PER_JOB / (time.perf_counter() - start)
+
+
+def _pool(tmp_path, name: str) -> SQLitePool:
+    pool = SQLitePool(tmp_path / f"{name}.db", size=8)
+    conn = pool.acquire()
+    init_db(conn)
+    upsert_jobs(conn, [(f"job-{i}", "queued", 0, "quick_create_full_universe", {}) for i in range(NUM_JOBS)])
+    conn.close()
+    return pool
+
+
+class TestGroupCommitThroughput:
+    """Throughput benchmarks for the group-commit writer."""
+
+    @pytest.mark.performance
+    @pytest.mark.slow
+    async def test_group_commit_outperforms_per_call_commits(self, tmp_path):
+        """Test: Batching concurrent writes into shared transactions raises write throughput"""
+        per_call_pool = _pool(tmp_path, "per-call")
+        db = AsyncDB(pool_size=4, connect=per_call_pool.acquire)
+        group_pool = _pool(tmp_path, "group")
+        writer = GroupCommitWriter(connect=group_pool.acquire)
+        try:
+            per_call = await _run(db.run)
+            grouped = await _run(writer.submit)
+            stats = writer.stats()
+        finally:
+            db.close()
+            writer.close()
+            per_call_pool.close_all()
+            group_pool.close_all()
+
+        print(f"\n{NUM_JOBS} jobs x {WRITES_PER_JOB} state writes:")
+        print(f"  per-call commits: {per_call:.0f} writes/s")
+        print(f"  group commit: {grouped:.0f} writes/s ({grouped / per_call:.1f}x), "
+              f"{stats['batches']} transactions, avg {stats['avg_batch']} writes each")
+
+        assert stats["writes"] == NUM_JOBS * WRITES_PER_JOB
+        assert grouped > per_call
@@ -0,0 +1,91 @@
+"""
+Throughput of the job write and status read paths per connection provider.
+
+"legacy" is the provider core.db used to have: a fresh default-journal
+connection per call. "pooled" is core.db.SQLitePool with the production
+PRAGMAs. Both run upsert_job and the /api/status lookup from several
+threads, the way the API thread pool and the worker hit the database.
+"""
+
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.db import SQLitePool
+from models.dao import init_db, upsert_job
+
+NUM_THREADS = 4
+OPS_PER_THREAD = 250
+
+
+def _legacy_provider(path):
+    def get_conn():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return get_conn
+
+
+def _run(get_conn, prefix: str) -> dict:
+    """Upsert then look up OPS_PER_THREAD jobs per thread; returns ops/s for each"""
+    def upserts(thread: int):
+        for i in range(OPS_PER_THREAD):
+            conn = get_conn()
+            upsert_job(conn, f"{prefix}-{thread}-{i}", "running", i % 100, job_type="compose")
+            conn.close()
+
+    def lookups(thread: int):
+        for i in range(OPS_PER_THREAD):
+            conn = get_conn()
+            row = conn.execute(
+                "SELECT job_id, state, progress, created_at FROM jobs WHERE job_id = ?",
+                (f"{prefix}-{thread}-{i}",)
+            ).fetchone()
+            conn.close()
+            assert row is not None
+
+    results = {}
+    total = NUM_THREADS * OPS_PER_THREAD
+    for name, op in (("upsert_job", upserts), ("status_lookup", lookups)):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=NUM_THREADS) as pool:
+            list(pool.map(op, range(NUM_THREADS)))
+        results[name] = total / (time.perf_counter() - start)
+    return results
+
+
+class TestDatabasePoolThroughput:
+    """Throughput benchmarks for the SQLite connection providers."""
+
+    @pytest.mark.performance
+    @pytest.mark.slow
+    def test_pooled_provider_outperforms_per_call_connections(self, tmp_path):
+        """Test: Pooled WAL connections beat a new connection per call on writes and reads"""
+        legacy_path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(legacy_path)
+        init_db(conn)
+        conn.close()
+        legacy = _run(_legacy_provider(legacy_path), "legacy")
+
+        pool = SQLitePool(tmp_path / "pooled.db", size=NUM_THREADS)
+        conn = pool.acquire()
+        init_db(conn)
+        conn.close()
+        try:
+            pooled = _run(pool.acquire, "pooled")
+            stats = pool.stats()
+        finally:
+            pool.close_all()
+
+        print(f"\n{NUM_THREADS} threads x {OPS_PER_THREAD} ops:")
+        for name in ("upsert_job", "status_lookup"):
+            print(f"  {name}: legacy {legacy[name]:.0f} ops/s, pooled {pooled[name]:.0f} ops/s "
+                  f"({pooled[name] / legacy[name]:.1f}x)")
+        print(f"  pool: {stats['checkouts']} checkouts, {stats['open']} connections, "
+              f"{stats['waits']} waits, max wait {stats['max_wait_ms']}ms")
+
+        assert stats["open"] <= NUM_THREADS
+        assert pooled["upsert_job"] > legacy["upsert_job"]
+        assert pooled["status_lookup"] > legacy["status_lookup"]
@@ -0,0 +1,55 @@
+"""
+Render batch inserts: one create() per plano versus a single create_many().
+
+A RenderBatchIn carries dozens of planos. "per-item" stores them the way
+the repository used to, one checkout and commit per render. "bulk" is
+RenderRepository.create_many: one prepared statement run by executemany
+inside a single transaction.
+"""
+
+import time
+
+import pytest
+
+from models.entities import Job, Render, RenderQuality, RenderStatus
+from repositories.job import JobRepository
+from repositories.render import RenderRepository
+
+
+def _renders(job_id: str, count: int) -> list:
+    return [
+        Render(job_id=job_id, item_id=f"plano-{i:04d}", hash=f"hash-{job_id}-{i}",
+               quality=RenderQuality.HIGH, status=RenderStatus.PENDING)
+        for i in range(count)
+    ]
+
+
+class TestRepositoryBulkThroughput:
+    """Throughput benchmarks for the bulk repository operations."""
+
+    @pytest.mark.performance
+    @pytest.mark.slow
+    @pytest.mark.parametrize("batch_size", [10, 100, 1000])
+    def test_create_many_outperforms_per_item_creates(self, tmp_path, batch_size):
+        """Test: Inserting a render batch with executemany in one transaction is faster"""
+        db_path = str(tmp_path / "renders.db")
+        jobs = JobRepository(db_path)
+        jobs.create_table()
+        repo = RenderRepository(db_path)
+        repo.create_table()
+        jobs.create_many([Job(job_id=job_id, created_at=0) for job_id in ("per-item", "bulk")])
+
+        start = time.perf_counter()
+        for render in _renders("per-item", batch_size):
+            repo.create(render)
+        per_item = time.perf_counter() - start
+
+        start = time.perf_counter()
+        repo.create_many(_renders("bulk", batch_size))
+        bulk = time.perf_counter() - start
+
+        print(f"\n{batch_size} renders: per-item {per_item * 1000:.1f}ms, "
+              f"create_many {bulk * 1000:.1f}ms ({per_item / bulk:.1f}x)")
+
+        assert len(repo.get_by_job_id("bulk")) == batch_size
+        assert bulk < per_item
@@ -0,0 +1,224 @@
+"""
+Contract tests for the core.storage backends.
+
+Every backend must behave the same for the callers in main.py, the worker
+and core.job_status. The suite runs against SQLite on a temporary file and,
+when TEST_POSTGRES_URL points at a disposable database and asyncpg is
+installed, against PostgreSQL as well.
+"""
+
+import os
+import time
+import pytest
+
+from core.storage import PostgresBackend, SQLiteBackend
+from models import dao
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+async def backend(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteBackend(tmp_path / "jobs.db")
+    else:
+        if not POSTGRES_URL:
+            pytest.skip("TEST_POSTGRES_URL not set")
+        pytest.importorskip("asyncpg")
+        backend = PostgresBackend(POSTGRES_URL, pool_size=2)
+
+    await backend.initialize()
+    if request.param == "postgres":
+        pool = await backend._get_pool()
+        await pool.execute("TRUNCATE jobs, renders, assets_cache, job_checkpoints, job_tombstones")
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.integration
+@pytest.mark.database
+class TestStorageContract:
+    """Contract tests shared by all StorageBackend implementations."""
+
+    async def test_upsert_keeps_created_at(self, backend):
+        """Test: Rewriting a job keeps created_at and replaces everything else"""
+        await backend.upsert_job("qcf-1", "queued", 0, job_type="quick_create_full_universe",
+                                 payload={"user_id": "user-1"})
+        created_at = (await backend.get_job("qcf-1"))[3]
+
+        await backend.upsert_job("qcf-1", "running", 20, job_type="quick_create_full_universe",
+                                 payload={"user_id": "user-2"})
+        row = await backend.get_job("qcf-1")
+
+        assert (row[0], row[1], row[2], row[3]) == ("qcf-1", "running", 20, created_at)
+        assert row["user_id"] == "user-2"
+        assert row["updated_at"] >= created_at
+
+    async def test_missing_job(self, backend):
+        """Test: Unknown jobs read as None and narrow writes update nothing"""
+        assert await backend.get_job("nope") is None
+        assert await backend.update_job_state("nope", "done", 100) == 0
+        assert await backend.update_job_progress("nope", 50) == 0
+        assert await backend.delete_job("nope") is None
+
+    async def test_narrow_writes(self, backend):
+        """Test: State and progress writes touch only their columns"""
+        await backend.upsert_job("tts-1", "queued", 0, job_type="tts", payload={"text": "hi"})
+
+        assert await backend.update_job_state("tts-1", "running") == 1
+        assert (await backend.get_job("tts-1"))[2] == 0
+        assert await backend.update_job_progress("tts-1", 60) == 1
+        row = await backend.get_job("tts-1")
+
+        assert (row[1], row[2], row[4]) == ("running", 60, "tts")
+
+    async def test_guarded_writes_skip_finished_jobs(self, backend):
+        """Test: unless_finished writes leave a cancelled job as it is"""
+        await backend.upsert_job("tts-1", "cancelled", 40)
+
+        assert await backend.update_job_state("tts-1", "running", 60, unless_finished=True) == 0
+        assert await backend.update_job_progress("tts-1", 60, unless_finished=True) == 0
+        row = await backend.get_job("tts-1")
+
+        assert (row[1], row[2]) == ("cancelled", 40)
+
+    async def test_list_jobs_page(self, backend):
+        """Test: Pages are newest first, filtered, and chained by cursor"""
+        await backend.upsert_jobs([
+            (f"job-{i}", "done" if i % 2 else "queued", 0, "tts" if i < 3 else "compose", {"user_id": "user-1"})
+            for i in range(5)
+        ])
+
+        rows, cursor = await backend.list_jobs_page(limit=2)
+        more, last = await backend.list_jobs_page(limit=2, cursor=cursor)
+        rest, end = await backend.list_jobs_page(limit=2, cursor=last)
+        queued, _ = await backend.list_jobs_page(state="queued", job_type="tts", user_id="user-1")
+
+        assert [row[0] for row in rows + more + rest] == ["job-4", "job-3", "job-2", "job-1", "job-0"]
+        assert end is None
+        assert sorted(row[0] for row in queued) == ["job-0", "job-2"]
+
+    async def test_bad_cursor_is_rejected(self, backend):
+        """Test: A malformed cursor raises ValueError"""
+        with pytest.raises(ValueError):
+            await backend.list_jobs_page(cursor="not-a-cursor")
+
+    async def test_changes_follow_write_order(self, backend):
+        """Test: The changes feed returns each job once, in the order it was last written"""
+        await backend.upsert_job("a", "queued", 0)
+        since = await backend.get_changes_cursor()
+        await backend.upsert_job("b", "queued", 0)
+        await backend.update_job_progress("a", 40)
+
+        rows, cursor = await backend.list_job_changes(since)
+        after, final = await backend.list_job_changes(cursor)
+
+        assert [(row[0], row[2]) for row in rows] == [("b", 0), ("a", 40)]
+        assert list(after) == []
+        assert final == cursor
+
+    async def test_bad_changes_cursor_is_rejected(self, backend):
+        """Test: A changes cursor that is not one the backend handed out raises ValueError"""
+        with pytest.raises(ValueError):
+            await backend.list_job_changes("not-a-cursor")
+
+    async def test_changes_wait_for_older_writers(self, backend):
+        """Test: A write committed while an older transaction is still open is held back until it ends"""
+        if not isinstance(backend, PostgresBackend):
+            pytest.skip("SQLite has a single writer")
+        since = await backend.get_changes_cursor()
+        pool = await backend._get_pool()
+        async with pool.acquire() as conn:
+            tx = conn.transaction()
+            await tx.start()
+            await conn.execute(backend.UPSERT_JOB_SQL, *dao.job_row("a", "queued", 0, "unknown", None, time.time()))
+            await backend.upsert_job("b", "queued", 0)
+
+            held, cursor = await backend.list_job_changes(since)
+            await tx.commit()
+        rows, _ = await backend.list_job_changes(cursor)
+
+        assert list(held) == []
+        assert [row[0] for row in rows] == ["a", "b"]
+
+    async def test_deleted_job_leaves_tombstone_in_changes(self, backend):
+        """Test: A deleted job comes back from the changes feed as a 'deleted' entry"""
+        await backend.upsert_job("a", "done", 100)
+        since = await backend.get_changes_cursor()
+
+        await backend.delete_job("a")
+        rows, cursor = await backend.list_job_changes(since)
+
+        assert [(row[0], row[1]) for row in rows] == [("a", "deleted")]
+        assert list((await backend.list_job_changes(cursor))[0]) == []
+
+    async def test_delete_removes_checkpoints(self, backend):
+        """Test: Deleting a job drops its checkpoints too"""
+        await backend.upsert_job("qcf-1", "done", 100)
+        await backend.save_job_checkpoint("qcf-1", "video", {"url": "https://cdn/x.mp4"})
+
+        assert await backend.delete_job("qcf-1") == 1
+        assert await backend.get_job("qcf-1") is None
+        assert await backend.get_job_checkpoints("qcf-1") == {}
+
+    async def test_checkpoints_are_replaced_per_phase(self, backend):
+        """Test: Saving a phase twice keeps the latest data"""
+        await backend.save_job_checkpoint("qcf-1", "crop", {"path": "a.png"})
+        await backend.save_job_checkpoint("qcf-1", "crop", {"path": "b.png"})
+        await backend.save_job_checkpoint("qcf-1", "video", {"url": "v.mp4"})
+
+        assert await backend.get_job_checkpoints("qcf-1") == {
+            "crop": {"path": "b.png"},
+            "video": {"url": "v.mp4"},
+        }
+
+    async def test_renders_and_asset_cache(self, backend):
+        """Test: Render rows and cached assets round-trip"""
+        await backend.insert_or_update_render("compose-1", "s2", "h2", "hd", None, "pending")
+        await backend.insert_or_update_render("compose-1", "s1", "h1", "hd", "/files/s1.mp4", "done")
+        await backend.insert_or_update_render("compose-1", "s2", "h2", "hd", "/files/s2.mp4", "done")
+        await backend.set_cached_asset("h1", "/files/old.mp4")
+        await backend.set_cached_asset("h1", "/files/s1.mp4")
+
+        outputs = await backend.list_job_outputs("compose-1")
+
+        assert [(o["id"], o["url"], o["status"]) for o in outputs] == [
+            ("s1", "/files/s1.mp4", "done"),
+            ("s2", "/files/s2.mp4", "done"),
+        ]
+        assert await backend.get_cached_asset("h1") == "/files/s1.mp4"
+        assert await backend.get_cached_asset("h2") is None
+
+    async def test_archived_jobs_stay_readable(self, backend):
+        """Test: Archival moves only old finished jobs, and get_job and delete_job still find them"""
+        await backend.upsert_job("qcf-1", "done", 100, payload={"user_id": "user-1"})
+        await backend.upsert_job("qcf-2", "running", 50)
+        before = await backend.get_job("qcf-1")
+
+        assert await backend.archive_jobs(before=before["updated_at"] + 1e9, limit=10) == 1
+        rows, _ = await backend.list_jobs_page()
+        archived = await backend.get_job("qcf-1")
+
+        assert [row[0] for row in rows] == ["qcf-2"]
+        assert tuple(archived) == tuple(before)
+        assert await backend.delete_job("qcf-1") == 1
+        assert await backend.get_job("qcf-1") is None
+
+    async def test_job_stats_follow_writes(self, backend):
+        """Test: The maintained counters match the jobs written, moved and deleted"""
+        await backend.upsert_jobs([
+            ("tts-1", "queued", 0, "tts", {"user_id": "user-1"}),
+            ("tts-2", "queued", 0, "tts", {"user_id": "user-2"}),
+            ("compose-1", "queued", 0, "compose", {"user_id": "user-1"}),
+        ])
+        await backend.update_job_state("tts-1", "running", 20)
+        await backend.update_job_progress("tts-1", 60)
+        await backend.update_job_state("compose-1", "done", 100)
+        await backend.delete_job("tts-2")
+
+        assert await backend.get_job_stats("user-1") == {
+            "total": 2,
+            "by_state": {"running": {"count": 1, "avg_progress": 60}, "done": {"count": 1, "avg_progress": 100}},
+            "by_job_type": {"tts": {"running": 1}, "compose": {"done": 1}},
+            "by_user": {"running": 1, "done": 1},
+        }
@@ -0,0 +1,44 @@
+"""
+Unit tests for the job archiver.
+
+The storage backend is mocked so the tests only check batching and the
+retention cutoff.
+"""
+
+import pytest
+from unittest.mock import AsyncMock
+
+import core.archive as archive
+from core.archive import JobArchiver
+
+
+@pytest.fixture
+def archive_jobs(monkeypatch) -> AsyncMock:
+    archive_jobs = AsyncMock(return_value=0)
+    monkeypatch.setattr(archive.storage, "archive_jobs", archive_jobs)
+    monkeypatch.setattr(archive.asyncio, "sleep", AsyncMock())
+    return archive_jobs
+
+
+class TestJobArchiver:
+    """Unit tests for JobArchiver."""
+
+    async def test_archives_until_a_short_batch(self, archive_jobs):
+        """Test: Full batches are followed by another one until the backlog is drained"""
+        archive_jobs.side_effect = [100, 100, 30]
+
+        assert await JobArchiver(retention_days=14, batch_size=100).archive_once() == 230
+        assert archive_jobs.await_count == 3
+
+    async def test_cutoff_follows_retention(self, archive_jobs, monkeypatch):
+        """Test: Only jobs last written more than RETENTION_DAYS ago are eligible"""
+        monkeypatch.setattr(archive.time, "time", lambda: 10 * 86400)
+
+        await JobArchiver(retention_days=7, batch_size=100).archive_once()
+
+        assert archive_jobs.call_args.args == (3 * 86400, 100)
+
+    async def test_zero_retention_disables_archival(self, archive_jobs):
+        """Test: RETENTION_DAYS=0 keeps every job in the hot table"""
+        assert await JobArchiver(retention_days=0).archive_once() == 0
+        archive_jobs.assert_not_awaited()
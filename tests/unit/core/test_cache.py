@@ -0,0 +1,408 @@
+"""
+Unit tests for the two-tier (in-process L1 + Redis) cache and its codecs.
+
+Redis is replaced by a small in-memory stand-in that records every command,
+so the tests can tell whether a read was answered by L1 or reached Redis.
+"""
+
+import asyncio
+import fnmatch
+import json
+import pickle
+import threading
+import time
+import pytest
+import redis.asyncio as redis
+
+import core.cache as cache
+from core import cache_codecs
+from core.cache import CacheError, CacheManager, LocalCache, cache_result
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        self.commands.append("get")
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self.commands.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    async def pttl(self, key):
+        return 60_000 if key in self.data else -2
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+        return True
+
+    async def set(self, key, value, px=None, xx=False):
+        if xx and key not in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def scan_iter(self, match, count=None):
+        for key in list(self.data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def unlink(self, *keys):
+        self.commands.append("unlink")
+        return await self.delete(*keys)
+
+    async def hgetall(self, key):
+        return {name.encode(): str(value).encode() for name, value in self.data.get(key, {}).items()}
+
+    async def hincrby(self, key, field, amount):
+        versions = self.data.setdefault(key, {})
+        versions[field] = versions.get(field, 0) + amount
+        return versions[field]
+
+    async def keys(self, pattern):
+        raise AssertionError("KEYS blocks Redis")
+
+    async def publish(self, channel, message):
+        self.published.append(json.loads(message))
+        return 1
+
+
+@pytest.fixture
+def manager(monkeypatch) -> CacheManager:
+    monkeypatch.setattr(cache.settings, "CACHE_L1_ENABLED", True)
+    manager = CacheManager()
+    manager._redis = FakeRedis()
+    manager._subscribed = True  # as if subscribed to the invalidation channel
+    return manager
+
+
+class TestLocalCache:
+    """Unit tests for LocalCache."""
+
+    def test_evicts_least_recently_used_by_entries_and_bytes(self):
+        """Test: the entry and byte bounds evict the least recently used values"""
+        local = LocalCache(max_entries=3, max_bytes=10)
+        local.put("a", b"1111", 60)
+        local.put("b", b"2222", 60)
+        local.get("a")
+        local.put("c", b"33", 60)
+        local.put("d", b"44", 60)
+
+        assert local.get("b") is None
+        assert [local.get(key) for key in "acd"] == [b"1111", b"33", b"44"]
+        assert (local.nbytes, local.evictions) == (8, 1)
+
+        local.put("huge", b"x" * 11, 60)
+        assert local.get("huge") is None and len(local) == 3
+
+    def test_entries_expire(self, monkeypatch):
+        """Test: an entry is dropped once its TTL has passed"""
+        clock = {"now": 100.0}
+        monkeypatch.setattr(cache.time, "monotonic", lambda: clock["now"])
+        local = LocalCache(max_entries=10, max_bytes=100)
+        local.put("a", b"1", 5)
+
+        clock["now"] += 4
+        assert local.get("a") == b"1"
+        clock["now"] += 2
+        assert local.get("a") is None and local.nbytes == 0
+
+
+class TestTwoTierCache:
+    """Unit tests for CacheManager with the L1 tier enabled."""
+
+    async def test_repeated_reads_are_served_from_l1(self, manager):
+        """Test: after the first read a key is answered without Redis"""
+        await manager._redis.setex("genscene_cache:default:k", 60, manager._serialize({"v": 1}))
+
+        assert await manager.get("k") == {"v": 1}
+        assert await manager.get("k") == {"v": 1}
+
+        assert manager._redis.commands == ["get"]
+        stats = manager.get_tier_stats()
+        assert (stats["l1_hits"], stats["l1_misses"], stats["l2_hits"]) == (1, 1, 1)
+        assert stats["l1_hit_ratio"] == 0.5
+
+    async def test_writes_publish_invalidations(self, manager):
+        """Test: set and delete announce the key to the other processes"""
+        await manager.set("k", "value")
+        assert await manager.get("k") == "value"
+        await manager.delete("k")
+
+        assert [message["keys"] for message in manager._redis.published] == [["genscene_cache:default:k"]] * 2
+        assert await manager.get("k") is None
+        assert manager._redis.commands == ["get"]
+
+    async def test_retried_pipeline_resends_its_commands(self, manager, monkeypatch):
+        """Test: a pipeline retried after a connection error is rebuilt, not executed empty"""
+        manager._retry_delay = 0
+        execute = FakePipeline.execute
+        failures = [redis.ConnectionError("reset")]
+
+        async def flaky_execute(pipeline):
+            if failures:
+                pipeline.calls.clear()  # redis-py resets the pipeline whatever the outcome
+                raise failures.pop()
+            return await execute(pipeline)
+
+        monkeypatch.setattr(FakePipeline, "execute", flaky_execute)
+
+        assert await manager.set("k", "value") is True
+        assert manager._redis.data["genscene_cache:default:k"] == manager._serialize("value")
+
+    async def test_remote_invalidation_drops_l1_entry(self, manager):
+        """Test: an invalidation from another process makes the next read go to Redis"""
+        await manager.set("k", "old")
+        manager._redis.data["genscene_cache:default:k"] = manager._serialize("new")
+
+        manager._apply_invalidation(json.dumps({"origin": "replica-2", "keys": ["genscene_cache:default:k"]}))
+
+        assert await manager.get("k") == "new"
+
+    async def test_read_racing_an_invalidation_is_not_cached(self, manager):
+        """Test: a value fetched before an invalidation arrived is not stored in L1"""
+        await manager._redis.setex("genscene_cache:default:k", 60, manager._serialize("stale"))
+        original_get = manager._redis.get
+
+        async def get_then_invalidate(key):
+            value = await original_get(key)
+            manager._apply_invalidation(json.dumps({"origin": "replica-2", "keys": [key]}))
+            return value
+        manager._redis.get = get_then_invalidate
+
+        assert await manager.get("k") == "stale"
+        assert len(manager._local) == 0
+
+    async def test_get_many_mixes_tiers(self, manager):
+        """Test: get_many answers cached keys from L1 and fetches only the rest"""
+        await manager.set_many({"a": 1, "b": 2})
+        await manager._redis.setex("genscene_cache:default:c", 60, manager._serialize(3))
+
+        assert await manager.get_many(["a", "b", "c", "d"]) == {"a": 1, "b": 2, "c": 3}
+        assert await manager.get_many(["a", "c"]) == {"a": 1, "c": 3}
+
+        stats = manager.get_tier_stats()
+        assert (stats["l1_hits"], stats["l1_misses"]) == (4, 2)
+        assert (stats["l2_hits"], stats["l2_misses"]) == (1, 1)
+
+    async def test_l1_bypassed_while_not_subscribed(self, manager):
+        """Test: without a live invalidation subscription every read goes to Redis"""
+        await manager.set("k", "value")
+        manager._subscribed = False
+
+        assert await manager.get("k") == "value"
+        assert manager._redis.commands == ["get"]
+
+
+class TestCacheCodecs:
+    """Unit tests for the tagged cache value encodings."""
+
+    @pytest.mark.parametrize("codec", list(cache_codecs.CODECS))
+    def test_round_trip_with_and_without_compression(self, codec):
+        """Test: every codec decodes its own output, compressed or not"""
+        value = {"job_id": "qcf-1", "state": "running", "metadata": {"planos": ["plano"] * 200}}
+        for compression in cache_codecs.COMPRESSORS:
+            encoded = cache_codecs.encode(value, *cache_codecs.resolve(codec, compression), min_bytes=64)
+            assert cache_codecs.decode(encoded) == value
+            assert cache_codecs.header(encoded) == (codec, compression)
+
+    def test_small_values_are_not_compressed(self):
+        """Test: payloads under min_bytes are stored as is"""
+        encoded = cache_codecs.encode({"a": 1}, *cache_codecs.resolve("json", "zlib"), min_bytes=1024)
+
+        assert encoded[cache_codecs.HEADER_SIZE:] == b'{"a":1}'
+        assert cache_codecs.header(encoded) == ("json", "none")
+
+    def test_headerless_values_decode_as_pickle(self):
+        """Test: values written before the codec header still load"""
+        legacy = pickle.dumps({"a": 1}, protocol=pickle.HIGHEST_PROTOCOL)
+
+        assert cache_codecs.header(legacy) is None
+        assert cache_codecs.decode(legacy) == {"a": 1}
+
+    def test_unknown_codec_is_rejected(self, manager):
+        """Test: configuring an unavailable codec raises instead of writing unreadable values"""
+        with pytest.raises(CacheError):
+            manager.configure_namespace("jobs", "bson")
+
+    async def test_recode_namespace_rewrites_other_encodings(self, manager):
+        """Test: recode_namespace re-encodes only the namespace's values in other formats"""
+        job = {"job_id": "qcf-1", "metrics": list(range(500))}
+        await manager.set("job:qcf-1", job, namespace="jobs")
+        await manager.set("other", job)
+        manager._redis.data["genscene_cache:jobs:legacy"] = pickle.dumps(job)
+        manager.configure_namespace("jobs", "json", "zlib")
+
+        assert await manager.recode_namespace("jobs") == 2
+        assert await manager.recode_namespace("jobs") == 0
+
+        stored = manager._redis.data
+        assert cache_codecs.header(stored["genscene_cache:jobs:job:qcf-1"]) == ("json", "zlib")
+        assert cache_codecs.header(stored["genscene_cache:jobs:legacy"]) == ("json", "zlib")
+        assert cache_codecs.header(stored["genscene_cache:default:other"]) == ("pickle", "zlib")
+        assert cache_codecs.decode(stored["genscene_cache:jobs:legacy"]) == job
+
+
+class TestCacheResult:
+    """Unit tests for the cache_result decorator."""
+
+    async def test_concurrent_misses_share_one_call(self, monkeypatch):
+        """Test: concurrent calls for one key run the function once, other keys separately"""
+        monkeypatch.setattr(cache.cache_manager, "_redis", None)
+        calls = []
+
+        @cache_result("preview:{style_id}", ttl=60, serialize_args=False)
+        async def preview(style_id):
+            calls.append(style_id)
+            await asyncio.sleep(0.01)
+            return {"style_id": style_id}
+
+        results = await asyncio.gather(*(preview("noir") for _ in range(10)), preview("anime"))
+
+        assert calls == ["noir", "anime"]
+        assert results[0] == {"style_id": "noir"} and results[-1] == {"style_id": "anime"}
+
+    async def test_stale_result_is_served_while_refreshing(self, manager, monkeypatch):
+        """Test: past its ttl a result is returned at once and refreshed in the background"""
+        monkeypatch.setattr(cache, "cache_manager", manager)
+        clock = {"now": 1000.0}
+        monkeypatch.setattr(cache.time, "time", lambda: clock["now"])
+        versions = iter(range(1, 10))
+
+        @cache_result("models", ttl=60, serialize_args=False, stale_ttl=600)
+        async def list_models():
+            return next(versions)
+
+        assert await list_models() == 1
+        assert await list_models() == 1
+        clock["now"] += 61
+        assert await list_models() == 1  # stale, refresh started
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert await list_models() == 2
+        assert await list_models.refresh() == 3
+
+    async def test_none_results_are_negatively_cached(self, manager, monkeypatch):
+        """Test: a None result is cached only when negative_ttl is set"""
+        monkeypatch.setattr(cache, "cache_manager", manager)
+        calls = []
+
+        @cache_result("lookup", ttl=60, serialize_args=False)
+        async def uncached():
+            calls.append("uncached")
+
+        @cache_result("negative", ttl=60, serialize_args=False, negative_ttl=5)
+        async def negative():
+            calls.append("negative")
+
+        for _ in range(3):
+            assert await uncached() is None
+            assert await negative() is None
+
+        assert calls.count("uncached") == 3 and calls.count("negative") == 1
+
+    async def test_sync_functions_use_in_process_cache(self):
+        """Test: sync functions are cached in process, even when called inside a running loop"""
+        calls = []
+
+        @cache_result("models", ttl=60, serialize_args=False)
+        def list_models():
+            calls.append(1)
+            time.sleep(0.05)
+            return ["veo3", "kling"]
+
+        threads = [threading.Thread(target=list_models) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert list_models() == ["veo3", "kling"]
+        assert len(calls) == 1
+
+
+class TestNamespaceInvalidation:
+    """Unit tests for generation-based namespace clearing and SCAN sweeps."""
+
+    async def test_clear_namespace_moves_to_new_generation(self, manager):
+        """Test: clearing a namespace hides its keys without touching them, other namespaces unaffected"""
+        await manager.set("job:1", {"state": "done"}, namespace="jobs")
+        await manager.set("other", 1)
+
+        assert await manager.clear_namespace("jobs") == 1
+
+        assert await manager.get("job:1", namespace="jobs") is None
+        assert await manager.get("other") == 1
+        assert "genscene_cache:jobs:job:1" in manager._redis.data  # left to expire
+        await manager.set("job:1", {"state": "queued"}, namespace="jobs")
+        assert "genscene_cache:jobs@1:job:1" in manager._redis.data
+        assert manager._redis.published[-2] == {"origin": manager._instance_id, "namespace": "jobs", "version": 1}
+
+    async def test_remote_namespace_bump_is_applied(self, manager):
+        """Test: a generation bump from another process switches this one to the new prefix"""
+        await manager.set("job:1", "cached", namespace="jobs")
+
+        manager._apply_invalidation(json.dumps({"origin": "replica-2", "namespace": "jobs", "version": 3}))
+
+        assert manager._make_key("job:1", "jobs") == "genscene_cache:jobs@3:job:1"
+        assert len(manager._local) == 0
+        assert await manager.get("job:1", namespace="jobs") is None
+
+    async def test_versions_polled_while_unsubscribed(self, manager, monkeypatch):
+        """Test: without the invalidation channel, generations are re-read from Redis"""
+        manager._subscribed = False
+        await manager._redis.hincrby(manager._versions_key, "jobs", 2)
+
+        await manager.get("job:1", namespace="jobs")
+
+        assert manager._namespace_versions == {"jobs": 2}
+
+    async def test_delete_pattern_scans_in_batches(self, manager):
+        """Test: delete_pattern unlinks matching keys batch by batch, without KEYS"""
+        await manager.set_many({f"preview:{i}": i for i in range(7)})
+        await manager.set("model:1", 1)
+        manager._scan_batch_size = 3
+
+        assert await manager.delete_pattern("preview:*") == 7
+
+        assert manager._redis.commands.count("unlink") == 3
+        assert await manager.get("model:1") == 1
+        assert await manager.get("preview:1") is None
+
+    async def test_sweep_deletes_matching_values_only(self, manager):
+        """Test: sweep unlinks the keys whose value passes the predicate and invalidates just those"""
+        await manager.set_many({f"job:{i}": {"state": "done" if i % 2 else "queued"} for i in range(6)}, namespace="jobs")
+        manager._redis.data[manager._make_key("job:corrupt", "jobs")] = b"\x00not a cached value"
+        manager._scan_batch_size = 4
+        published = len(manager._redis.published)
+
+        swept = await manager.sweep("job:*", lambda job: job["state"] == "done", namespace="jobs")
+
+        assert swept == 3
+        assert await manager.get("job:1", namespace="jobs") is None
+        assert await manager.get("job:2", namespace="jobs") == {"state": "queued"}
+        assert manager._make_key("job:corrupt", "jobs") in manager._redis.data
+        invalidated = [key for message in manager._redis.published[published:] for key in message["keys"]]
+        assert sorted(invalidated) == [manager._make_key(f"job:{i}", "jobs") for i in (1, 3, 5)]
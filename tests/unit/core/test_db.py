@@ -0,0 +1,128 @@
+"""
+Unit tests for the pooled SQLite connection provider.
+"""
+
+import gc
+import sqlite3
+import threading
+import time
+import pytest
+
+from core.db import SQLitePool
+
+
+@pytest.fixture
+def pool(tmp_path) -> SQLitePool:
+    pool = SQLitePool(tmp_path / "jobs.db", size=2, timeout=0.2)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, state TEXT)")
+    conn.commit()
+    conn.close()
+    yield pool
+    pool.close_all()
+
+
+class TestSQLitePool:
+    """Unit tests for SQLitePool."""
+
+    def test_close_returns_connection_to_pool(self, pool):
+        """Test: conn.close() hands the same connection to the next caller"""
+        first = pool.acquire()
+        first.close()
+        second = pool.acquire()
+
+        assert second is first
+        assert pool.stats()["open"] == 1
+        second.close()
+
+    def test_connections_use_production_pragmas(self, pool):
+        """Test: pooled connections run in WAL mode with a busy timeout and Row factory"""
+        conn = pool.acquire()
+
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 30000
+        assert isinstance(conn.execute("SELECT 1 AS one").fetchone(), sqlite3.Row)
+        conn.close()
+
+    def test_read_only_pool_rejects_writes(self, pool):
+        """Test: read pool connections are query_only with the bigger page cache"""
+        read_pool = SQLitePool(pool.path, size=1, readonly=True)
+        conn = read_pool.acquire()
+        try:
+            assert conn.execute("PRAGMA query_only").fetchone()[0] == 1
+            assert conn.execute("PRAGMA cache_size").fetchone()[0] == -128000
+            assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO jobs VALUES ('qcf-1', 'queued')")
+        finally:
+            conn.close()
+            read_pool.close_all()
+
+    def test_release_discards_uncommitted_work(self, pool):
+        """Test: a connection returned mid-transaction is rolled back"""
+        conn = pool.acquire()
+        conn.execute("INSERT INTO jobs VALUES ('qcf-1', 'queued')")
+        conn.close()
+
+        conn = pool.acquire()
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+        conn.close()
+
+    def test_double_close_is_harmless(self, pool):
+        """Test: closing twice does not put the connection in the pool twice"""
+        conn = pool.acquire()
+        conn.close()
+        conn.close()
+
+        assert pool.stats()["idle"] == 1
+
+    def test_exhausted_pool_waits_and_records_it(self, pool):
+        """Test: a checkout waits for a connection to be returned and the wait is measured"""
+        held = [pool.acquire(), pool.acquire()]
+        threading.Timer(0.05, held[0].close).start()
+
+        conn = pool.acquire()
+        stats = pool.stats()
+
+        assert conn is held[0]
+        assert stats["waits"] == 1
+        assert stats["max_wait_ms"] >= 40
+        assert stats["in_use"] == 2
+        conn.close()
+        held[1].close()
+
+    def test_exhausted_pool_times_out(self, pool):
+        """Test: checkout fails after the pool timeout instead of hanging"""
+        held = [pool.acquire(), pool.acquire()]
+
+        start = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError):
+            pool.acquire()
+
+        assert time.perf_counter() - start >= 0.2
+        assert pool.stats()["timeouts"] == 1
+        for conn in held:
+            conn.close()
+
+    def test_dropped_connections_give_their_slot_back(self, pool):
+        """Test: connections lost without close() (e.g. on an exception path) do not exhaust the pool"""
+        def leak():
+            conn = pool.acquire()
+            conn.execute("INSERT INTO jobs VALUES ('qcf-1', 'queued')")
+            raise RuntimeError("deduct_credits failed")
+
+        pool.close_all()  # the fixture still references its idle connection
+        for _ in range(2):
+            try:
+                leak()
+            except RuntimeError:
+                pass
+            gc.collect()  # sqlite3 connections sit in a reference cycle with their statement cache
+
+        stats = pool.stats()
+        assert (stats["in_use"], stats["reclaimed"]) == (0, 2)
+        conn = pool.acquire()
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+        conn.close()
+        assert pool.stats()["reclaimed"] == 2
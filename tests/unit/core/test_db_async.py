@@ -0,0 +1,128 @@
+"""
+Unit tests for the async SQLite access layer.
+
+Each test gets its own AsyncDB backed by a pool on a temporary database file.
+"""
+
+import sqlite3
+import threading
+import pytest
+
+import core.db_async as db_async
+from core.db import SQLitePool
+from core.db_async import AsyncDB
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path) -> AsyncDB:
+    pool = SQLitePool(tmp_path / "jobs.db", size=2)
+    monkeypatch.setattr(db_async, "get_conn", pool.acquire)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, state TEXT, progress INTEGER)")
+    conn.commit()
+    conn.close()
+
+    db = AsyncDB(pool_size=2)
+    yield db
+    db.close()
+    pool.close_all()
+
+
+@pytest.fixture
+def read_db(db, tmp_path) -> AsyncDB:
+    pool = SQLitePool(tmp_path / "jobs.db", size=2, readonly=True)
+    read_db = AsyncDB(pool_size=2, connect=pool.acquire, readonly=True)
+    yield read_db
+    read_db.close()
+    pool.close_all()
+
+
+class TestAsyncDB:
+    """Unit tests for AsyncDB."""
+
+    async def test_calls_run_off_the_event_loop_thread(self, db):
+        """Test: DAO functions run on the dedicated pool, not the loop thread"""
+        def whoami(conn):
+            return threading.current_thread().name
+
+        name = await db.run(whoami)
+
+        assert name != threading.current_thread().name
+        assert name.startswith("sqlite")
+
+    async def test_run_passes_connection_and_arguments(self, db):
+        """Test: run() calls func(conn, *args, **kwargs) like the DAO signatures expect"""
+        def insert(conn, job_id, state, progress=0):
+            conn.execute("INSERT INTO jobs VALUES (?, ?, ?)", (job_id, state, progress))
+            conn.commit()
+
+        await db.run(insert, "qcf-1", "queued", progress=5)
+        row = await db.fetchone("SELECT state, progress FROM jobs WHERE job_id = ?", ("qcf-1",))
+
+        assert tuple(row) == ("queued", 5)
+
+    async def test_execute_commits_and_returns_rowcount(self, db):
+        """Test: execute() commits so writes are visible from other connections"""
+        await db.execute("INSERT INTO jobs VALUES (?, ?, ?)", ("qcf-1", "queued", 0))
+        await db.execute("INSERT INTO jobs VALUES (?, ?, ?)", ("qcf-2", "queued", 0))
+
+        updated = await db.execute("UPDATE jobs SET state = ?", ("running",))
+        rows = await db.fetchall("SELECT job_id FROM jobs WHERE state = 'running' ORDER BY job_id")
+
+        assert updated == 2
+        assert [row["job_id"] for row in rows] == ["qcf-1", "qcf-2"]
+
+    async def test_failed_call_rolls_back(self, db):
+        """Test: an exception rolls back the pooled connection's open transaction"""
+        def insert_then_fail(conn):
+            conn.execute("INSERT INTO jobs VALUES ('qcf-1', 'queued', 0)")
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await db.run(insert_then_fail)
+        await db.run(lambda conn: conn.commit())
+
+        row = await db.fetchone("SELECT COUNT(*) FROM jobs")
+        assert row[0] == 0
+
+    async def test_stats_record_call_latency(self, db):
+        """Test: stats() counts calls and failures with their latency"""
+        await db.fetchone("SELECT 1")
+        with pytest.raises(ValueError):
+            await db.run(lambda conn: int("boom"))
+
+        stats = db.stats()
+        assert stats["calls"] == 2
+        assert stats["errors"] == 1
+        assert 0 < stats["avg_ms"] <= stats["max_ms"]
+
+
+class TestReadOnlyAsyncDB:
+    """Unit tests for AsyncDB on the read-only pool."""
+
+    async def test_reads_run_on_read_threads(self, read_db):
+        """Test: read calls get their own thread pool"""
+        name = await read_db.run(lambda conn: threading.current_thread().name)
+
+        assert name.startswith("sqlite-read")
+
+    async def test_call_reads_one_snapshot(self, db, read_db, tmp_path):
+        """Test: a commit landing mid-call is not seen until the next call"""
+        await db.execute("INSERT INTO jobs VALUES ('qcf-1', 'queued', 0)")
+
+        def count_twice(conn):
+            before = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            writer = sqlite3.connect(tmp_path / "jobs.db")
+            writer.execute("INSERT INTO jobs VALUES ('qcf-2', 'queued', 0)")
+            writer.commit()
+            writer.close()
+            return before, conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+        assert await read_db.run(count_twice) == (1, 1)
+        row = await read_db.fetchone("SELECT COUNT(*) FROM jobs")
+        assert row[0] == 2
+
+    async def test_writes_are_rejected(self, read_db):
+        """Test: the read pool cannot write"""
+        with pytest.raises(sqlite3.OperationalError):
+            await read_db.execute("INSERT INTO jobs VALUES ('qcf-1', 'queued', 0)")
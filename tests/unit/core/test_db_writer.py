@@ -0,0 +1,82 @@
+"""
+Unit tests for the group-commit writer.
+
+Each test gets its own GroupCommitWriter backed by a pool on a temporary
+database file.
+"""
+
+import asyncio
+import pytest
+
+from core.db import SQLitePool
+from core.db_writer import GroupCommitWriter
+
+
+@pytest.fixture
+def pool(tmp_path) -> SQLitePool:
+    pool = SQLitePool(tmp_path / "jobs.db", size=2)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, state TEXT)")
+    conn.commit()
+    conn.close()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def writer(pool) -> GroupCommitWriter:
+    writer = GroupCommitWriter(connect=pool.acquire, max_batch=50, max_delay=0.01)
+    yield writer
+    writer.close()
+
+
+def insert_job(conn, job_id: str) -> int:
+    cur = conn.execute("INSERT INTO jobs VALUES (?, 'queued')", (job_id,))
+    conn.commit()
+    return cur.rowcount
+
+
+class TestGroupCommitWriter:
+    """Unit tests for GroupCommitWriter."""
+
+    async def test_concurrent_writes_share_transactions(self, writer, pool):
+        """Test: Writes submitted together are committed in one batch each"""
+        results = await asyncio.gather(*(writer.submit(insert_job, f"job-{i}") for i in range(120)))
+
+        conn = pool.acquire()
+        count = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        conn.close()
+        stats = writer.stats()
+
+        assert results == [1] * 120
+        assert count == 120
+        assert stats["batches"] == 3
+        assert stats["max_batch"] == 50
+
+    async def test_failed_write_is_isolated(self, writer, pool):
+        """Test: A failing write raises to its caller and the rest of the batch commits"""
+        results = await asyncio.gather(
+            writer.submit(insert_job, "job-1"),
+            writer.submit(insert_job, "job-1"),
+            writer.submit(insert_job, "job-2"),
+            return_exceptions=True
+        )
+
+        conn = pool.acquire()
+        rows = [row[0] for row in conn.execute("SELECT job_id FROM jobs ORDER BY job_id")]
+        conn.close()
+
+        assert results[0] == 1 and results[2] == 1
+        assert isinstance(results[1], Exception)
+        assert rows == ["job-1", "job-2"]
+        assert writer.stats()["batches"] == 1
+
+    async def test_write_is_visible_once_submit_returns(self, writer, pool):
+        """Test: submit() resolves only after the batch has committed"""
+        await writer.submit(insert_job, "job-1")
+
+        conn = pool.acquire()
+        row = conn.execute("SELECT state FROM jobs WHERE job_id = 'job-1'").fetchone()
+        conn.close()
+
+        assert row[0] == "queued"
@@ -0,0 +1,164 @@
+"""
+Unit tests for the coalescing job status store.
+
+Redis and the storage backend are mocked so the tests count how often a
+progress tick actually reaches the jobs table or Redis.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+import core.job_status as job_status
+from core.job_status import JobStatusStore
+
+
+@pytest.fixture
+def store(monkeypatch) -> JobStatusStore:
+    storage = MagicMock()
+    storage.upsert_job = AsyncMock()
+    storage.update_job_state = AsyncMock(return_value=1)
+    storage.update_job_progress = AsyncMock(return_value=1)
+    storage.get_job = AsyncMock(return_value=None)
+    monkeypatch.setattr(job_status, "storage", storage)
+    store = JobStatusStore()
+    store.flush_interval = 10
+    store.client = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    store.client.pipeline = MagicMock(return_value=pipe)
+    # Progress ticks go through WRITE_PROGRESS_SCRIPT; 1 = written
+    store.client.register_script = MagicMock(return_value=AsyncMock(return_value=1))
+    return store
+
+
+def _script(store: JobStatusStore) -> AsyncMock:
+    return store.client.register_script.return_value
+
+
+class TestJobStatusStore:
+    """Unit tests for JobStatusStore."""
+
+    async def test_progress_ticks_are_coalesced(self, store, monkeypatch):
+        """Test: Only the first tick of a state and ticks after the interval hit SQLite"""
+        clock = {"now": 1000.0}
+        monkeypatch.setattr(job_status.time, "time", lambda: clock["now"])
+
+        await store.update_progress("qcf-1", "running", 10)
+        for progress in (20, 30, 40):
+            clock["now"] += 1
+            await store.update_progress("qcf-1", "running", progress)
+        clock["now"] += 10
+        await store.update_progress("qcf-1", "running", 50)
+
+        job_status.storage.update_job_state.assert_called_once()
+        assert job_status.storage.update_job_state.call_args.args == ("qcf-1", "running", 10)
+        job_status.storage.update_job_progress.assert_called_once()
+        assert job_status.storage.update_job_progress.call_args.args == ("qcf-1", 50)
+        job_status.storage.upsert_job.assert_not_called()
+        # Every tick still reaches Redis
+        assert _script(store).await_count == 5
+
+    async def test_state_transition_is_written_through(self, store):
+        """Test: set_state() always persists and restarts coalescing"""
+        await store.update_progress("qcf-1", "running", 10)
+        await store.set_state("qcf-1", "done", 100)
+
+        assert job_status.storage.update_job_state.call_args.args == ("qcf-1", "done", 100)
+        assert "qcf-1" not in store._persisted
+
+    async def test_set_state_reports_missing_row(self, store):
+        """Test: set_state() returns 0 when the job has no row, so the caller can create it"""
+        job_status.storage.update_job_state.return_value = 0
+
+        assert await store.set_state("qcf-1", "processing", 0) == 0
+
+    async def test_tick_after_cancellation_is_dropped(self, store):
+        """Test: A progress tick for a job already cancelled leaves Redis and SQLite alone"""
+        await store.set_state("qcf-1", "cancelled")
+        _script(store).return_value = 0
+
+        await store.update_progress("qcf-1", "running", 60)
+
+        job_status.storage.update_job_state.assert_called_once_with("qcf-1", "cancelled", None)
+        job_status.storage.update_job_progress.assert_not_called()
+
+    async def test_redis_outage_falls_back_to_sqlite(self, store):
+        """Test: Without Redis every tick is persisted"""
+        _script(store).side_effect = ConnectionError("down")
+
+        await store.update_progress("qcf-1", "running", 10)
+        await store.update_progress("qcf-1", "running", 20)
+
+        assert job_status.storage.update_job_state.call_count == 1
+        assert job_status.storage.update_job_progress.call_count == 1
+
+    async def test_redis_outage_does_not_revive_cancelled_job(self, store):
+        """Test: Without Redis, a tick for a cancelled job is guarded in SQL and not upserted back"""
+        _script(store).side_effect = ConnectionError("down")
+        job_status.storage.update_job_state.return_value = 0
+        job_status.storage.get_job.return_value = ("qcf-1", "cancelled", 40)
+
+        await store.update_progress("qcf-1", "running", 60)
+
+        assert job_status.storage.update_job_state.call_args.kwargs == {"unless_finished": True}
+        job_status.storage.upsert_job.assert_not_called()
+        assert "qcf-1" not in store._persisted
+
+    async def test_missing_row_is_created(self, store):
+        """Test: A narrow write that finds no job row falls back to a full upsert"""
+        job_status.storage.update_job_state.return_value = 0
+
+        await store.update_progress("qcf-1", "running", 10, job_type="tts", payload={"text": "hi"})
+
+        job_status.storage.upsert_job.assert_called_once()
+        assert job_status.storage.upsert_job.call_args.kwargs == {"job_type": "tts", "payload": {"text": "hi"}}
+
+    async def test_overlay_prefers_live_status(self, store):
+        """Test: Readers see Redis progress ahead of the SQLite row"""
+        store.client.hgetall.return_value = {"state": "running", "progress": "70", "updated_at": "1.0"}
+
+        assert await store.overlay("qcf-1", "running", 10) == ("running", 70)
+
+    async def test_metadata_is_mirrored_for_other_processes(self, store):
+        """Test: Worker metadata (current_phase, output_url) is readable from the hash"""
+        await store.update_progress("qcf-1", "running", 50, metadata={"current_phase": "🎬 Generating"})
+        args = _script(store).call_args.kwargs["args"][1:]
+        fields = dict(zip(args[::2], args[1::2]))
+        store.client.hgetall.return_value = fields
+
+        status = await store.get("qcf-1")
+
+        assert json.loads(fields["metadata"]) == {"current_phase": "🎬 Generating"}
+        assert status["metadata"]["current_phase"] == "🎬 Generating"
+
+    async def test_polling_burst_hits_redis_once(self, store):
+        """Test: Repeated reads within the local TTL are served from the LRU"""
+        store.local_ttl = 60
+        store.client.hgetall.return_value = {"state": "running", "progress": "10"}
+
+        for _ in range(20):
+            await store.get("qcf-1")
+
+        assert store.client.hgetall.await_count == 1
+
+    async def test_local_write_invalidates_cached_entry(self, store):
+        """Test: A status written by this process is not hidden by the LRU"""
+        store.local_ttl = 60
+        store.client.hgetall.return_value = {"state": "running", "progress": "10"}
+        await store.get("qcf-1")
+
+        await store.set_state("qcf-1", "cancelled")
+        store.client.hgetall.return_value = {"state": "cancelled", "progress": "10"}
+
+        assert (await store.get("qcf-1"))["state"] == "cancelled"
+
+    async def test_local_cache_is_bounded(self, store):
+        """Test: The LRU never holds more than local_size jobs"""
+        store.local_size = 3
+        store.client.hgetall.return_value = {}
+
+        for i in range(10):
+            await store.get(f"job-{i}")
+
+        assert list(store._local) == ["job-7", "job-8", "job-9"]
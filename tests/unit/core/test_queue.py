@@ -0,0 +1,254 @@
+"""
+Unit tests for the Redis queue backends and the lane scheduler.
+
+The Redis client is mocked so these tests cover the consumer-group
+bookkeeping (claim, read, ack) and lane selection without a running
+Redis server.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.queue import JobPriority, RedisQueue, RedisStreamQueue, WeightedFairScheduler
+
+LANE = "genscene:jobs:stream:tts:2"
+
+
+def _pipeline(results: list) -> MagicMock:
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=results)
+    return pipe
+
+
+def _entry(job_id: str, job_type: str = "tts") -> dict:
+    return {"data": json.dumps({"job_id": job_id, "type": job_type, "payload": {}})}
+
+
+@pytest.fixture
+def stream_queue() -> RedisStreamQueue:
+    queue = RedisStreamQueue()
+    queue.client = AsyncMock()
+    queue.client.smembers.return_value = {LANE}
+    queue.client.xautoclaim.return_value = ["0-0", [], []]
+    queue.client.xreadgroup.return_value = []
+    queue.client.xread.return_value = []
+    # XINFO GROUPS: nothing undelivered, so dequeue falls through to the blocking wait
+    queue.client.pipeline = MagicMock(return_value=_pipeline(
+        [[{"name": queue.group, "lag": 0, "last-delivered-id": "7-0"}]] * 2
+    ))
+    return queue
+
+
+class TestRedisStreamQueue:
+    """Unit tests for RedisStreamQueue."""
+
+    async def test_dequeue_returns_new_entry_with_message_id(self, stream_queue):
+        """Test: New entries are read through the consumer group"""
+        stream_queue.client.pipeline = MagicMock(return_value=_pipeline(
+            [[{"name": stream_queue.group, "lag": 1, "last-delivered-id": "0-0"}]] * 2
+        ))
+        stream_queue.client.xreadgroup.return_value = [
+            [LANE, [("1-0", _entry("tts-1"))]]
+        ]
+
+        message = await stream_queue.dequeue(timeout=1)
+
+        assert message["job_id"] == "tts-1"
+        assert message["message_id"] == "1-0"
+        assert message["lane"] == LANE
+        stream_queue.client.xack.assert_not_called()
+
+    async def test_dequeue_prefers_stale_pending_entry(self, stream_queue):
+        """Test: Entries abandoned by a dead consumer are reclaimed first"""
+        stream_queue.client.xautoclaim.return_value = ["0-0", [("5-0", _entry("qcf-1"))], []]
+
+        message = await stream_queue.dequeue(timeout=1)
+
+        assert message["job_id"] == "qcf-1"
+        stream_queue.client.xreadgroup.assert_not_called()
+
+    async def test_dequeue_skips_saturated_types(self, stream_queue):
+        """Test: Lanes of skipped job types are neither read nor reclaimed; the legacy stream still is"""
+        message = await stream_queue.dequeue(timeout=1, skip_types={"tts"})
+
+        assert message is None
+        claimed = {call.args[0] for call in stream_queue.client.xautoclaim.call_args_list}
+        assert claimed == {stream_queue.queue_key}
+        stream_queue.client.xreadgroup.assert_not_called()
+        assert set(stream_queue.client.xread.call_args.args[0]) == {stream_queue.queue_key}
+
+    async def test_blocking_wait_delivers_nothing_itself(self, stream_queue):
+        """Test: The wait for new entries is a plain XREAD; the entry is then read from one lane only"""
+        idle = [{"name": stream_queue.group, "lag": 0, "last-delivered-id": "7-0"}]
+        ready = [{"name": stream_queue.group, "lag": 1, "last-delivered-id": "7-0"}]
+        stream_queue.client.pipeline = MagicMock(side_effect=[
+            _pipeline([idle, idle]),
+            _pipeline([ready, idle]),
+        ])
+        stream_queue.client.smembers.return_value = {LANE}
+        stream_queue.client.xread.return_value = [[LANE, [("8-0", _entry("tts-2"))]]]
+        stream_queue.client.xreadgroup.return_value = [[LANE, [("8-0", _entry("tts-2"))]]]
+
+        message = await stream_queue.dequeue(timeout=1)
+
+        assert message["job_id"] == "tts-2"
+        positions = stream_queue.client.xread.call_args.args[0]
+        assert set(positions.values()) == {"7-0"}
+        for call in stream_queue.client.xreadgroup.call_args_list:
+            assert len(call.args[2]) == 1
+
+    async def test_trimmed_pending_entry_is_acked_and_skipped(self, stream_queue):
+        """Test: Pending entries whose payload was trimmed do not block the group"""
+        stream_queue.client.xautoclaim.side_effect = [
+            ["0-0", [("5-0", None)], []],
+            ["0-0", [], []],
+        ]
+
+        message = await stream_queue.dequeue(timeout=1)
+
+        assert message is None
+        stream_queue.client.xack.assert_awaited_once_with(
+            LANE, stream_queue.group, "5-0"
+        )
+
+    async def test_reclaimed_entry_out_of_retries_is_dead_lettered(self, stream_queue):
+        """Test: An entry redelivered more often than the retry limit is dead-lettered and acked"""
+        stream_queue.max_retries = 3
+        stream_queue.on_exhausted = AsyncMock()
+        stream_queue.client.xautoclaim.side_effect = [
+            ["0-0", [("5-0", _entry("qcf-1"))], []],
+            ["0-0", [], []],
+        ]
+        stream_queue.client.xpending_range.return_value = [{"message_id": "5-0", "times_delivered": 5}]
+        pipe = _pipeline([1, 1])
+        stream_queue.client.pipeline = MagicMock(side_effect=[pipe, _pipeline([[{"name": stream_queue.group, "lag": 0}]])])
+
+        message = await stream_queue.dequeue(timeout=1)
+
+        assert message is None
+        dead, error = stream_queue.on_exhausted.await_args.args
+        assert dead["job_id"] == "qcf-1"
+        assert dead["retry"] == 4
+        pipe.xack.assert_called_once_with(LANE, stream_queue.group, "5-0")
+
+    async def test_reclaimed_entry_within_retries_is_returned(self, stream_queue):
+        """Test: Earlier failures and redeliveries add up but stay under the limit"""
+        stream_queue.max_retries = 3
+        stream_queue.on_exhausted = AsyncMock()
+        entry = {"data": json.dumps({"job_id": "qcf-1", "type": "tts", "payload": {}, "retry": 1})}
+        stream_queue.client.xautoclaim.return_value = ["0-0", [("5-0", entry)], []]
+        stream_queue.client.xpending_range.return_value = [{"message_id": "5-0", "times_delivered": 3}]
+
+        message = await stream_queue.dequeue(timeout=1)
+
+        assert message["job_id"] == "qcf-1"
+        stream_queue.on_exhausted.assert_not_awaited()
+
+    async def test_ack_removes_entry_atomically(self, stream_queue):
+        """Test: ack() issues XACK and XDEL in a single transaction"""
+        pipe = _pipeline([])
+        stream_queue.client.pipeline = MagicMock(return_value=pipe)
+
+        await stream_queue.ack({"job_id": "tts-1", "message_id": "1-0", "lane": LANE})
+
+        pipe.xack.assert_called_once_with(LANE, stream_queue.group, "1-0")
+        pipe.xdel.assert_called_once_with(LANE, "1-0")
+        pipe.execute.assert_awaited_once()
+
+    async def test_list_backend_ack_is_noop(self):
+        """Test: The BLPOP backend accepts ack()/touch() without Redis calls"""
+        queue = RedisQueue()
+        queue.client = AsyncMock()
+
+        await queue.ack({"job_id": "tts-1"})
+        await queue.touch({"job_id": "tts-1"})
+
+        assert queue.client.method_calls == []
+
+    async def test_list_backend_enqueues_to_type_and_priority_lane(self):
+        """Test: Jobs are pushed to their own lane and the lane is registered"""
+        queue = RedisQueue()
+        queue.client = AsyncMock()
+        pipe = _pipeline([1, 1])
+        queue.client.pipeline = MagicMock(return_value=pipe)
+
+        await queue.enqueue("tts-1", "tts", {}, JobPriority.HIGH)
+
+        pipe.sadd.assert_called_once_with(queue.lanes_key, "genscene:jobs:tts:3")
+        lane, raw = pipe.rpush.call_args.args
+        assert lane == "genscene:jobs:tts:3"
+        assert json.loads(raw)["priority"] == JobPriority.HIGH
+
+    async def test_enqueue_many_uses_one_round_trip(self):
+        """Test: A batch is pushed with a single pipeline execution"""
+        queue = RedisQueue()
+        queue.client = AsyncMock()
+        pipe = _pipeline([])
+        queue.client.pipeline = MagicMock(return_value=pipe)
+
+        await queue.enqueue_many([(f"qcf-{i}", "quick_create_full_universe", {}) for i in range(100)], JobPriority.LOW)
+
+        pipe.execute.assert_awaited_once()
+        pipe.sadd.assert_called_once_with(queue.lanes_key, "genscene:jobs:quick_create_full_universe:1")
+        assert pipe.rpush.call_count == 100
+
+    async def test_list_backend_pops_only_non_empty_lanes(self):
+        """Test: Empty lanes are never picked even if they carry more weight"""
+        queue = RedisQueue()
+        queue.client = AsyncMock()
+        queue.client.smembers.return_value = {"genscene:jobs:tts:4", "genscene:jobs:compose:1"}
+        # LLEN per lane: compose:1, tts:4, legacy list
+        queue.client.pipeline = MagicMock(return_value=_pipeline([3, 0, 0]))
+        queue.client.lpop.return_value = json.dumps({"job_id": "compose-1", "type": "compose"})
+
+        message = await queue.dequeue(timeout=1)
+
+        assert message["job_id"] == "compose-1"
+        queue.client.lpop.assert_awaited_once_with("genscene:jobs:compose:1")
+        queue.client.blpop.assert_not_called()
+
+    async def test_list_backend_skips_saturated_types(self):
+        """Test: Lanes of skipped job types are neither popped nor blocked on"""
+        queue = RedisQueue()
+        queue.client = AsyncMock()
+        queue.client.smembers.return_value = {"genscene:jobs:tts:2", "genscene:jobs:compose:2"}
+        # LLEN per remaining lane: tts:2, legacy list
+        queue.client.pipeline = MagicMock(return_value=_pipeline([0, 0]))
+        queue.client.blpop.return_value = None
+
+        message = await queue.dequeue(timeout=1, skip_types={"compose"})
+
+        assert message is None
+        queue.client.lpop.assert_not_called()
+        blocked_on = queue.client.blpop.call_args.args[0]
+        assert "genscene:jobs:compose:2" not in blocked_on
+        assert set(blocked_on) == {"genscene:jobs:tts:2", queue.queue_key}
+
+
+class TestWeightedFairScheduler:
+    """Unit tests for WeightedFairScheduler."""
+
+    def test_picks_follow_weights_within_each_round(self):
+        """Test: Every lane is picked exactly weight times per round"""
+        scheduler = WeightedFairScheduler()
+        weights = {"tts": 8, "compose": 2, "batch": 1}
+
+        for _ in range(5):
+            picks = [scheduler.pick(weights) for _ in range(sum(weights.values()))]
+            assert {lane: picks.count(lane) for lane in weights} == weights
+
+    def test_light_lane_wait_is_bounded(self):
+        """Test: A weight-1 lane is served within one round however busy the others are"""
+        scheduler = WeightedFairScheduler()
+        weights = {"video": 1, "tts": 16}
+
+        picks = [scheduler.pick(weights) for _ in range(17 * 4)]
+        positions = [i for i, lane in enumerate(picks) if lane == "video"]
+
+        assert positions[0] < 17
+        assert all(b - a <= 17 for a, b in zip(positions, positions[1:]))
+
+    def test_no_eligible_lanes(self):
+        """Test: Nothing to pick when all lanes are empty"""
+        assert WeightedFairScheduler().pick({}) is None
@@ -0,0 +1,79 @@
+"""
+Unit tests for the retry scheduler and dead-letter queue.
+
+The Redis client is mocked; the Lua promotion itself runs server-side.
+"""
+
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from core.queue import JobPriority, RedisQueue
+from core.retry import RetryPolicy, RetryScheduler
+
+
+@pytest.fixture
+def scheduler() -> RetryScheduler:
+    queue = RedisQueue()
+    queue.client = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    queue.client.pipeline = MagicMock(return_value=pipe)
+    return RetryScheduler(queue, RetryPolicy(max_retries=2, base_delay=10, max_delay=60))
+
+
+def _message(**extra) -> dict:
+    return {"job_id": "qcf-1", "type": "quick_create_full_universe", "priority": 3, "payload": {}, **extra}
+
+
+class TestRetryPolicy:
+    """Unit tests for RetryPolicy."""
+
+    def test_delay_grows_exponentially_with_jitter(self):
+        """Test: Each retry waits between half and all of base * 2^(n-1)"""
+        policy = RetryPolicy(max_retries=5, base_delay=10, max_delay=1000)
+
+        for retry, ceiling in [(1, 10), (2, 20), (3, 40)]:
+            delay = policy.next_delay(retry)
+            assert ceiling / 2 <= delay <= ceiling
+
+    def test_delay_is_capped(self):
+        """Test: Backoff never exceeds max_delay"""
+        policy = RetryPolicy(max_retries=50, base_delay=10, max_delay=60)
+
+        assert policy.next_delay(30) <= 60
+
+
+class TestRetryScheduler:
+    """Unit tests for RetryScheduler."""
+
+    async def test_failure_schedules_retry_into_original_lane(self, scheduler):
+        """Test: A failed job is parked in the retry set, targeting its lane"""
+        retried = await scheduler.handle_failure(_message(message_id="1-0", lane="x"), "boom")
+
+        assert retried is True
+        (key, members), _ = scheduler.queue.client.zadd.call_args
+        assert key == scheduler.retry_key
+        entry = json.loads(next(iter(members)))
+        assert entry["lane"] == scheduler.queue.lane_key("quick_create_full_universe", JobPriority.HIGH)
+        data = json.loads(entry["data"])
+        assert data["retry"] == 1
+        assert "message_id" not in data and "lane" not in data
+
+    async def test_exhausted_job_is_dead_lettered(self, scheduler):
+        """Test: After max_retries the job goes to the capped dead-letter list"""
+        retried = await scheduler.handle_failure(_message(retry=2), "still broken")
+
+        assert retried is False
+        scheduler.queue.client.zadd.assert_not_called()
+        pipe = scheduler.queue.client.pipeline.return_value
+        key, raw = pipe.lpush.call_args.args
+        assert key == scheduler.dead_key
+        assert json.loads(raw)["job_id"] == "qcf-1"
+        pipe.ltrim.assert_called_once_with(scheduler.dead_key, 0, scheduler.dead_maxlen - 1)
+
+    async def test_replay_unknown_job_returns_false(self, scheduler):
+        """Test: Replaying a job that is not dead-lettered is a no-op"""
+        scheduler.queue.client.lrange.return_value = []
+
+        assert await scheduler.replay_dead_letter("qcf-404") is False
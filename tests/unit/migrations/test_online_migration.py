@@ -0,0 +1,181 @@
+"""
+Unit tests for online (chunked, resumable) migrations.
+
+Each test gets a MigrationManager on a temporary database file.
+"""
+
+import sqlite3
+import pytest
+
+from migrations.manager import Backfill, MigrationManager, OnlineMigration
+from migrations.versions import MIGRATIONS
+
+
+@pytest.fixture
+def manager(tmp_path) -> MigrationManager:
+    manager = MigrationManager(str(tmp_path / "jobs.db"))
+    with manager._get_connection() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.executemany("INSERT INTO items (name) VALUES (?)", [(f"item-{i}",) for i in range(25)])
+        conn.commit()
+    return manager
+
+
+def copy_items(batch_size: int = 10) -> OnlineMigration:
+    return OnlineMigration(
+        version="9.0.0",
+        description="Copy items",
+        upgrade_steps=[
+            "CREATE TABLE items_copy (id INTEGER PRIMARY KEY, name TEXT);",
+            Backfill("items", "INSERT INTO items_copy SELECT id, name FROM items WHERE id > :lo AND id <= :hi", key="id"),
+            "DROP TABLE items; ALTER TABLE items_copy RENAME TO items;",
+        ],
+        batch_size=batch_size,
+        throttle_ms=0,
+    )
+
+
+def item_names(manager: MigrationManager):
+    with manager._get_connection() as conn:
+        return [row[0] for row in conn.execute("SELECT name FROM items ORDER BY id")]
+
+
+class TestOnlineMigration:
+    """Unit tests for OnlineMigration and its MigrationManager support."""
+
+    def test_backfill_runs_in_chunks_with_progress(self, manager):
+        """Test: a backfill copies every row in batch_size chunks and reports each one"""
+        reports = []
+
+        result = manager.run_migrations([copy_items()], on_progress=lambda *report: reports.append(report))
+
+        assert result['status'] == 'success'
+        assert [(done, total) for _, _, done, total in reports] == [(10, 25), (20, 25), (25, 25)]
+        assert item_names(manager) == [f"item-{i}" for i in range(25)]
+        assert manager.get_applied_migrations() == ["9.0.0"]
+
+    def test_interrupted_migration_resumes_after_last_chunk(self, manager):
+        """Test: running again after a failure continues from the last committed chunk"""
+        def interrupt(version, step, done, total):
+            if done == 10:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            manager.run_migrations([copy_items()], on_progress=interrupt)
+        status = manager.get_migration_status([copy_items()])
+        assert status['pending_migrations'][0]['in_progress'] is True
+
+        reports = []
+        manager.run_migrations([copy_items()], on_progress=lambda *report: reports.append(report))
+
+        assert [done for _, _, done, _ in reports] == [20, 25]
+        assert item_names(manager) == [f"item-{i}" for i in range(25)]
+        assert manager.get_migration_status([copy_items()])['applied_count'] == 1
+
+    def test_dry_run_estimates_without_changes(self, manager):
+        """Test: a dry run reports rows and chunks for online migrations and leaves the schema alone"""
+        result = manager.run_migrations([copy_items(batch_size=4)], dry_run=True)
+
+        estimate, = result['estimates']
+        assert (estimate['rows'], estimate['chunks']) == (25, 7)
+        assert estimate['estimated_seconds'] >= 0
+        with manager._get_connection() as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert "items_copy" not in tables
+        assert manager.get_applied_migrations() == []
+
+    def test_rebuild_downgrade_keeps_writes_made_during_backfill(self, tmp_path, monkeypatch):
+        """Test: 1.1.0's online downgrade mirrors writes that land between chunks"""
+        manager = MigrationManager(str(tmp_path / "app.db"))
+        manager.run_migrations(MIGRATIONS, target_version="1.1.0")
+        with manager._get_connection() as conn:
+            conn.executemany("INSERT INTO jobs (job_id, state, progress, created_at, job_type) VALUES (?, 'queued', 0, ?, 'tts')",
+                             [(f"job-{i}", i) for i in range(30)])
+            conn.commit()
+        rebuild = next(m for m in MIGRATIONS if m.version == "1.1.0")
+        monkeypatch.setattr(rebuild, "batch_size", 10)
+        monkeypatch.setattr(rebuild, "throttle_ms", 0)
+
+        def write_between_chunks(version, step, done, total):
+            if step.endswith("(jobs)") and done == 10:
+                with manager._get_connection() as conn:
+                    conn.execute("UPDATE jobs SET state = 'completed', progress = 100 WHERE job_id = 'job-25'")
+                    conn.execute("DELETE FROM jobs WHERE job_id = 'job-26'")
+                    conn.execute("INSERT INTO jobs (job_id, state, progress, created_at) VALUES ('job-new', 'queued', 0, 99)")
+                    conn.commit()
+
+        manager.rollback_to_version(MIGRATIONS, "1.0.1", on_progress=write_between_chunks)
+
+        with manager._get_connection() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            jobs = {row["job_id"]: (row["state"], row["progress"]) for row in conn.execute("SELECT * FROM jobs")}
+            indexes = {row[1] for row in conn.execute("PRAGMA index_list(jobs)")}
+        assert columns == ["job_id", "state", "progress", "created_at", "updated_at"]
+        assert len(jobs) == 30
+        assert jobs["job-25"] == ("completed", 100)
+        assert "job-26" not in jobs and "job-new" in jobs
+        assert "idx_jobs_state" in indexes
+        assert manager.get_applied_migrations() == ["1.0.0", "1.0.1"]
+
+    def test_rebuild_downgrade_keeps_app_job_states(self, tmp_path, monkeypatch):
+        """Test: jobs in states the app writes ('running', 'done') survive the downgrade and live updates"""
+        manager = MigrationManager(str(tmp_path / "app.db"))
+        with manager._get_connection() as conn:
+            # Table as models.dao creates it, before any migration ran: no state CHECK
+            conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, state TEXT NOT NULL, progress INTEGER DEFAULT 0, "
+                         "created_at INTEGER NOT NULL, updated_at INTEGER)")
+            conn.commit()
+        manager.run_migrations(MIGRATIONS, target_version="1.1.0")
+        with manager._get_connection() as conn:
+            conn.executemany("INSERT INTO jobs (job_id, state, progress, created_at) VALUES (?, ?, 0, ?)",
+                             [(f"job-{i}", "done" if i % 2 else "running", i) for i in range(20)])
+            conn.commit()
+        rebuild = next(m for m in MIGRATIONS if m.version == "1.1.0")
+        monkeypatch.setattr(rebuild, "batch_size", 10)
+        monkeypatch.setattr(rebuild, "throttle_ms", 0)
+
+        def write_between_chunks(version, step, done, total):
+            if step.endswith("(jobs)") and done == 10:
+                with manager._get_connection() as conn:
+                    conn.execute("UPDATE jobs SET progress = 50 WHERE job_id = 'job-18'")
+                    conn.commit()
+
+        manager.rollback_to_version(MIGRATIONS, "1.0.1", on_progress=write_between_chunks)
+
+        with manager._get_connection() as conn:
+            jobs = {row["job_id"]: (row["state"], row["progress"]) for row in conn.execute("SELECT * FROM jobs")}
+        assert len(jobs) == 20
+        assert jobs["job-18"] == ("running", 50)
+        assert jobs["job-19"] == ("done", 0)
+
+    def test_previous_checksum_is_accepted_and_updated(self, manager):
+        """Test: a listed previous checksum passes the read-only check and run_migrations re-records it"""
+        migration = copy_items()
+        manager.run_migrations([migration])
+        with manager._get_connection() as conn:
+            conn.execute("UPDATE schema_migrations SET checksum = 'old' WHERE version = '9.0.0'")
+            conn.commit()
+
+        assert manager.validate_migrations([migration])['is_valid'] is False
+        migration.previous_checksums = {"old"}
+        assert manager.validate_migrations([migration])['is_valid'] is True
+        assert manager.get_migration_info("9.0.0")['checksum'] == "old"
+
+        assert manager.run_migrations([migration], dry_run=True)['status'] == 'up_to_date'
+        assert manager.get_migration_info("9.0.0")['checksum'] == "old"
+        assert manager.run_migrations([migration])['status'] == 'up_to_date'
+        assert manager.get_migration_info("9.0.0")['checksum'] == manager._get_migration_checksum(migration)
+
+    def test_failed_step_is_rolled_back(self, manager):
+        """Test: a SQL step that fails leaves no partial schema behind"""
+        broken = OnlineMigration(
+            version="9.0.1",
+            description="Broken",
+            upgrade_steps=["CREATE TABLE half_done (id INTEGER); INSERT INTO missing VALUES (1);"],
+        )
+
+        with pytest.raises(Exception):
+            manager.run_migrations([broken])
+
+        with manager._get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'half_done'").fetchone()[0] == 0
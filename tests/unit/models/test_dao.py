@@ -0,0 +1,369 @@
+"""
+Unit tests for the job batch, listing, change feed, checkpoint, archive and stats helpers in models.dao.
+
+Uses an in-memory SQLite database initialised with init_db().
+"""
+
+import sqlite3
+import pytest
+
+from models.dao import (
+    init_db, upsert_job, upsert_jobs, update_job_state, update_job_progress, list_jobs_page, get_changes_cursor, list_job_changes,
+    save_job_checkpoint, get_job_checkpoints, get_job, delete_job, archive_jobs, get_job_stats, create_job_stats,
+    insert_or_update_render
+)
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(":memory:")
+    init_db(connection)
+    yield connection
+    connection.close()
+
+
+class TestUpsertJobs:
+    """Unit tests for the bulk job upsert."""
+
+    def test_inserts_all_rows(self, conn):
+        """Test: Every row of the batch is persisted"""
+        upsert_jobs(conn, [(f"qcf-{i}", "queued", 0, "quick_create_full_universe", {"i": i}) for i in range(50)])
+
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 50
+
+    def test_existing_job_keeps_created_at(self, conn):
+        """Test: Upserting an existing job updates it without resetting created_at"""
+        upsert_job(conn, "qcf-1", "error", 40, job_type="quick_create_full_universe")
+        conn.execute("UPDATE jobs SET created_at = 1 WHERE job_id = 'qcf-1'")
+
+        upsert_jobs(conn, [("qcf-1", "queued", 0, "quick_create_full_universe", {"retry": True})])
+
+        row = conn.execute("SELECT state, progress, created_at, payload FROM jobs WHERE job_id = 'qcf-1'").fetchone()
+        assert row == ("queued", 0, 1, '{"retry": true}')
+
+
+class TestJobWrites:
+    """Unit tests for the single-job upsert and the narrow state/progress writes."""
+
+    def test_upsert_job_updates_in_place_keeping_created_at(self, conn):
+        """Test: upsert_job on an existing job rewrites it but keeps created_at"""
+        upsert_job(conn, "qcf-1", "queued", 0, job_type="tts", payload={"text": "a"})
+        conn.execute("UPDATE jobs SET created_at = 1 WHERE job_id = 'qcf-1'")
+
+        upsert_job(conn, "qcf-1", "running", 20, job_type="tts", payload={"text": "b"})
+
+        row = conn.execute("SELECT state, progress, created_at, payload FROM jobs WHERE job_id = 'qcf-1'").fetchone()
+        assert row == ("running", 20, 1, '{"text": "b"}')
+
+    def test_progress_update_leaves_payload_and_state_alone(self, conn):
+        """Test: update_job_progress only changes progress and updated_at"""
+        upsert_job(conn, "qcf-1", "running", 10, job_type="tts", payload={"text": "a"})
+        before = conn.execute("SELECT updated_at FROM jobs").fetchone()[0]
+
+        assert update_job_progress(conn, "qcf-1", 60) == 1
+
+        row = conn.execute("SELECT state, progress, payload, updated_at FROM jobs").fetchone()
+        assert row[:3] == ("running", 60, '{"text": "a"}')
+        assert row[3] > before
+
+    def test_narrow_writes_report_missing_jobs(self, conn):
+        """Test: Narrow writes return 0 when the job row does not exist"""
+        assert update_job_state(conn, "missing", "running", 10) == 0
+        assert update_job_progress(conn, "missing", 10) == 0
+
+    def test_guarded_writes_leave_finished_jobs_alone(self, conn):
+        """Test: With unless_finished, narrow writes do not overwrite a cancelled job"""
+        upsert_job(conn, "qcf-1", "cancelled", 40)
+
+        assert update_job_state(conn, "qcf-1", "running", 60, unless_finished=True) == 0
+        assert update_job_progress(conn, "qcf-1", 60, unless_finished=True) == 0
+        assert conn.execute("SELECT state, progress FROM jobs").fetchone() == ("cancelled", 40)
+        assert update_job_state(conn, "qcf-1", "queued", unless_finished=False) == 1
+
+
+class TestListJobsPage:
+    """Unit tests for keyset-paginated job listing."""
+
+    @pytest.fixture
+    def jobs(self, conn):
+        # 25 jobs over 5 distinct seconds, so pages have to break created_at ties
+        upsert_jobs(conn, [
+            (f"job-{i:02d}", "done" if i % 2 else "queued", 0, "tts" if i % 3 else "compose", {"user_id": f"u{i % 2}"})
+            for i in range(25)
+        ])
+        conn.execute("UPDATE jobs SET created_at = CAST(substr(job_id, 5) AS INTEGER) / 5")
+        return conn
+
+    def _all_pages(self, conn, **filters):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = list_jobs_page(conn, limit=4, cursor=cursor, **filters)
+            pages.append([row[0] for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_cover_every_job_once_newest_first(self, jobs):
+        """Test: Following next_cursor visits every job exactly once in (created_at, job_id) order"""
+        pages = self._all_pages(jobs)
+        job_ids = [job_id for page in pages for job_id in page]
+
+        assert len(pages) == 7
+        assert job_ids == [f"job-{i:02d}" for i in reversed(range(25))]
+
+    def test_filters_combine_with_cursor(self, jobs):
+        """Test: state, job_type and user_id filters apply on every page"""
+        job_ids = [job_id for page in self._all_pages(jobs, state="done", job_type="tts") for job_id in page]
+
+        assert job_ids == [f"job-{i:02d}" for i in reversed(range(25)) if i % 2 and i % 3]
+        assert [job_id for page in self._all_pages(jobs, user_id="u0") for job_id in page] == \
+            [f"job-{i:02d}" for i in reversed(range(25)) if i % 2 == 0]
+
+    def test_last_page_has_no_cursor(self, jobs):
+        """Test: A page that reaches the end returns next_cursor None"""
+        rows, cursor = list_jobs_page(jobs, limit=25)
+
+        assert len(rows) == 25
+        assert cursor is None
+
+    def test_invalid_cursor_is_rejected(self, jobs):
+        """Test: A malformed cursor raises ValueError instead of returning a wrong page"""
+        with pytest.raises(ValueError):
+            list_jobs_page(jobs, cursor="not-a-cursor")
+
+    def test_user_id_is_taken_from_payload(self, conn):
+        """Test: upsert_job stores the payload's user_id in its own indexed column"""
+        upsert_job(conn, "qcf-1", "queued", 0, job_type="quick_create_full_universe", payload={"user_id": "alice"})
+
+        assert conn.execute("SELECT user_id FROM jobs WHERE job_id = 'qcf-1'").fetchone()[0] == "alice"
+
+
+class TestJobChanges:
+    """Unit tests for the updated_at change feed."""
+
+    def test_only_jobs_written_after_cursor_are_returned(self, conn):
+        """Test: A poll returns just the jobs written since the cursor, in write order"""
+        upsert_jobs(conn, [(f"job-{i}", "queued", 0, "tts", {}) for i in range(5)])
+        cursor = get_changes_cursor(conn)
+
+        update_job_state(conn, "job-3", "running", 10)
+        upsert_job(conn, "job-1", "done", 100, job_type="tts")
+        rows, cursor = list_job_changes(conn, cursor)
+
+        assert [(row[0], row[1]) for row in rows] == [("job-3", "running"), ("job-1", "done")]
+        assert list_job_changes(conn, cursor)[0] == []
+
+    def test_stamps_are_unique_and_increasing(self, conn):
+        """Test: Writes in the same instant still get distinct, ordered updated_at values"""
+        upsert_jobs(conn, [(f"job-{i}", "queued", 0, "tts", {}) for i in range(20)])
+        for i in range(20):
+            update_job_state(conn, f"job-{i}", "running")
+
+        stamps = [row[0] for row in conn.execute("SELECT updated_at FROM jobs ORDER BY updated_at")]
+        assert len(set(stamps)) == 20
+
+    def test_full_page_continues_from_cursor(self, conn):
+        """Test: Paging through a burst of changes with a small limit visits each change once"""
+        upsert_jobs(conn, [(f"job-{i}", "queued", 0, "tts", {}) for i in range(7)])
+
+        seen, cursor = [], 0.0
+        while True:
+            rows, cursor = list_job_changes(conn, cursor, limit=3)
+            seen.extend(row[0] for row in rows)
+            if len(rows) < 3:
+                break
+
+        assert sorted(seen) == [f"job-{i}" for i in range(7)]
+
+    def test_deleted_and_archived_jobs_leave_tombstones(self, conn):
+        """Test: Removed jobs show up in the feed as 'deleted'/'archived', in write order"""
+        upsert_jobs(conn, [(f"job-{i}", "done", 100, "tts", {}) for i in range(3)])
+        cursor = get_changes_cursor(conn)
+
+        update_job_state(conn, "job-2", "running", 10)
+        delete_job(conn, "job-0")
+        retention_cutoff = get_changes_cursor(conn)
+        update_job_state(conn, "job-2", "done", 100)
+        assert archive_jobs(conn, before=retention_cutoff) == 1
+        rows, cursor = list_job_changes(conn, cursor)
+
+        assert [(row[0], row[1]) for row in rows] == [("job-0", "deleted"), ("job-2", "done"), ("job-1", "archived")]
+        assert list_job_changes(conn, cursor)[0] == []
+
+    def test_old_tombstones_are_pruned_on_archival(self, conn):
+        """Test: Tombstones older than the archival cutoff are dropped"""
+        upsert_job(conn, "job-0", "done", 100, job_type="tts")
+        delete_job(conn, "job-0")
+
+        archive_jobs(conn, before=get_changes_cursor(conn) + 1)
+
+        assert list_job_changes(conn, 0.0)[0] == []
+
+
+class TestJobCheckpoints:
+    """Unit tests for job phase checkpoints."""
+
+    def test_checkpoints_round_trip_per_phase(self, conn):
+        """Test: Each phase's outputs are stored and returned by phase name"""
+        save_job_checkpoint(conn, "qcf-1", "concept_image", {"concept_image_url": "https://kie/img.png", "sha256": "aa"})
+        save_job_checkpoint(conn, "qcf-1", "video", {"video_url": "https://kie/v.mp4", "sha256": "bb"})
+
+        checkpoints = get_job_checkpoints(conn, "qcf-1")
+
+        assert set(checkpoints) == {"concept_image", "video"}
+        assert checkpoints["video"]["video_url"] == "https://kie/v.mp4"
+
+    def test_checkpoint_overwrites_same_phase(self, conn):
+        """Test: Re-running a phase replaces its checkpoint instead of duplicating it"""
+        save_job_checkpoint(conn, "qcf-1", "video", {"sha256": "old"})
+        save_job_checkpoint(conn, "qcf-1", "video", {"sha256": "new"})
+
+        assert get_job_checkpoints(conn, "qcf-1") == {"video": {"sha256": "new"}}
+
+    def test_checkpoints_are_scoped_to_job(self, conn):
+        """Test: A job without checkpoints starts from scratch"""
+        save_job_checkpoint(conn, "qcf-1", "video", {"sha256": "bb"})
+
+        assert get_job_checkpoints(conn, "qcf-2") == {}
+
+
+class TestJobArchive:
+    """Unit tests for moving finished jobs to jobs_archive."""
+
+    def test_archives_only_old_finished_jobs(self, conn):
+        """Test: Finished jobs past the cutoff move; running or recent ones stay"""
+        upsert_jobs(conn, [
+            ("old-done", "done", 100, "tts", {}),
+            ("old-running", "running", 50, "tts", {}),
+            ("new-error", "error", 0, "tts", {}),
+        ])
+        conn.execute("UPDATE jobs SET updated_at = 1 WHERE job_id LIKE 'old-%'")
+        save_job_checkpoint(conn, "old-done", "video", {"sha256": "bb"})
+        conn.commit()
+
+        assert archive_jobs(conn, before=1000) == 1
+
+        hot = [row[0] for row in conn.execute("SELECT job_id FROM jobs ORDER BY job_id")]
+        assert hot == ["new-error", "old-running"]
+        assert get_job_checkpoints(conn, "old-done") == {}
+
+    def test_archives_in_batches(self, conn):
+        """Test: Each call moves at most `limit` jobs"""
+        upsert_jobs(conn, [(f"job-{i}", "done", 100, "tts", {}) for i in range(5)])
+
+        moved = [archive_jobs(conn, before=float("inf"), limit=2) for _ in range(4)]
+
+        assert moved == [2, 2, 1, 0]
+        assert conn.execute("SELECT COUNT(*) FROM jobs_archive").fetchone()[0] == 5
+
+    def test_get_job_falls_back_to_archive(self, conn):
+        """Test: An archived job reads back the same, payload included"""
+        upsert_job(conn, "qcf-1", "done", 100, job_type="quick_create_full_universe",
+                   payload={"user_id": "user-1", "request": {"idea_text": "x" * 2000}})
+        before = tuple(get_job(conn, "qcf-1"))
+
+        archive_jobs(conn, before=float("inf"))
+
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+        assert tuple(get_job(conn, "qcf-1")) == before
+        assert get_job(conn, "qcf-2") is None
+
+    def test_delete_removes_archived_job(self, conn):
+        """Test: Deleting an archived job removes it from the archive"""
+        upsert_job(conn, "qcf-1", "done", 100)
+        archive_jobs(conn, before=float("inf"))
+
+        assert delete_job(conn, "qcf-1") == 1
+        assert get_job(conn, "qcf-1") is None
+        assert delete_job(conn, "qcf-1") is None
+
+
+def _grouped_job_stats(conn, user_id=None) -> dict:
+    """get_job_stats computed the old way, with GROUP BY over the live and archived jobs"""
+    jobs = ("(SELECT state, progress, job_type, user_id FROM jobs "
+            "UNION ALL SELECT state, progress, job_type, user_id FROM jobs_archive)")
+    stats = {"total": 0, "by_state": {}, "by_job_type": {}}
+    for state, count, avg in conn.execute(f"SELECT state, COUNT(*), AVG(progress) FROM {jobs} GROUP BY state"):
+        stats["total"] += count
+        stats["by_state"][state] = {"count": count, "avg_progress": round(avg, 2)}
+    for job_type, state, count in conn.execute(f"SELECT job_type, state, COUNT(*) FROM {jobs} GROUP BY 1, 2"):
+        stats["by_job_type"].setdefault(job_type, {})[state] = count
+    if user_id is not None:
+        stats["by_user"] = dict(conn.execute(
+            f"SELECT state, COUNT(*) FROM {jobs} WHERE user_id = ? GROUP BY state", (user_id,)
+        ).fetchall())
+    return stats
+
+
+class TestJobStats:
+    """Unit tests for the trigger-maintained job and render counters."""
+
+    def test_counters_follow_every_write_path(self, conn):
+        """Test: Upserts, narrow writes, deletes and archival keep the counters equal to a GROUP BY"""
+        upsert_jobs(conn, [
+            (f"job-{i}", "queued", 0, "tts" if i % 2 else "compose", {"user_id": f"user-{i % 3}"})
+            for i in range(12)
+        ])
+        for i in range(8):
+            update_job_state(conn, f"job-{i}", "running", 10)
+        for i in range(4):
+            update_job_progress(conn, f"job-{i}", 55)
+        update_job_state(conn, "job-0", "done", 100)
+        update_job_state(conn, "job-1", "error")
+        upsert_job(conn, "job-2", "running", 70, job_type="tts", payload={"user_id": "user-9"})
+        delete_job(conn, "job-3")
+        archive_jobs(conn, before=float("inf"))
+        assert get_job_stats(conn)["by_state"]["done"]["count"] == 1
+        delete_job(conn, "job-0")
+
+        for user_id in (None, "user-1", "user-9"):
+            assert get_job_stats(conn, user_id) == _grouped_job_stats(conn, user_id)
+        assert "done" not in get_job_stats(conn)["by_state"]
+
+    def test_archival_keeps_counts(self, conn):
+        """Test: Moving finished jobs to the archive leaves every counter unchanged"""
+        upsert_jobs(conn, [(f"job-{i}", "done", 100, "tts", {"user_id": "user-1"}) for i in range(5)])
+        before = get_job_stats(conn, "user-1")
+
+        assert archive_jobs(conn, before=float("inf")) == 5
+
+        assert get_job_stats(conn, "user-1") == before
+
+    def test_existing_jobs_are_counted_on_creation(self, conn):
+        """Test: Jobs written before the counters existed are backfilled once"""
+        upsert_jobs(conn, [(f"job-{i}", "done", 100, "tts", {"user_id": "user-1"}) for i in range(3)])
+        archive_jobs(conn, before=float("inf"))
+        upsert_jobs(conn, [("job-live", "running", 40, "tts", {"user_id": "user-1"})])
+        conn.execute("DROP TABLE job_stats")
+
+        init_db(conn)
+        init_db(conn)
+
+        assert get_job_stats(conn, "user-1") == _grouped_job_stats(conn, "user-1")
+
+    def test_one_trigger_set_whoever_creates_it_first(self, conn):
+        """Test: Counters made for a jobs table without job_type/user_id are widened when init_db adds them"""
+        conn.execute("DROP TABLE jobs")
+        conn.execute("DROP TABLE job_stats")
+        conn.execute("CREATE TABLE jobs (job_id TEXT PRIMARY KEY, state TEXT NOT NULL, progress INTEGER DEFAULT 0, "
+                     "created_at INTEGER NOT NULL, updated_at INTEGER)")
+        conn.execute("INSERT INTO jobs VALUES ('job-old', 'done', 100, 1, 1)")
+        create_job_stats(conn)
+        assert get_job_stats(conn)["by_job_type"] == {}
+
+        init_db(conn)
+        upsert_jobs(conn, [("job-new", "queued", 0, "tts", {"user_id": "user-1"})])
+
+        assert get_job_stats(conn, "user-1") == _grouped_job_stats(conn, "user-1")
+        triggers = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND name LIKE 'jobs%stats%'")]
+        assert sorted(triggers) == sorted(["jobs_stats_insert", "jobs_stats_delete", "jobs_stats_update",
+                                           "jobs_stats_progress", "jobs_archive_stats_insert", "jobs_archive_stats_delete"])
+
+    def test_render_counters(self, conn):
+        """Test: Render counts and URL coverage follow inserts and updates"""
+        insert_or_update_render(conn, "compose-1", "s1", "h1", "hd", None, "pending")
+        insert_or_update_render(conn, "compose-1", "s2", "h2", "hd", None, "pending")
+        insert_or_update_render(conn, "compose-1", "s1", "h1", "hd", "/files/s1.mp4", "done")
+
+        rows = conn.execute("SELECT status, quality, count, with_url FROM render_stats WHERE count > 0 ORDER BY status").fetchall()
+
+        assert rows == [("done", "hd", 1, 1), ("pending", "hd", 1, 0)]
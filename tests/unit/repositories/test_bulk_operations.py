@@ -0,0 +1,140 @@
+"""
+Unit tests for the bulk (executemany) repository operations.
+"""
+
+import pytest
+
+from tests.conftest import TestDataFactory
+from core.db import get_pool
+from models.dao import get_changes_cursor, init_db, list_job_changes
+from repositories.job import JobRepository
+from models.entities import JobState, RenderQuality, RenderStatus
+
+
+@pytest.fixture
+def renders(job_repository):
+    job_repository.create(TestDataFactory.create_job("bulk-job"))
+    return [TestDataFactory.create_render("bulk-job", f"plano-{i:03d}") for i in range(20)]
+
+
+class TestRenderBulkOperations:
+    """Unit tests for RenderRepository bulk operations."""
+
+    def test_create_many_inserts_all(self, render_repository, renders):
+        """Test: create_many stores every render and returns their composite IDs"""
+        ids = render_repository.create_many(renders)
+
+        assert ids == [f"bulk-job:plano-{i:03d}" for i in range(20)]
+        assert render_repository.count() == 20
+        stored = render_repository.get_by_job_and_item("bulk-job", "plano-007")
+        assert stored.hash == renders[7].hash
+        assert stored.status == RenderStatus.PENDING.value
+
+    def test_create_many_upserts_existing(self, render_repository, renders):
+        """Test: create_many updates renders that already exist, like create"""
+        render_repository.create_many(renders)
+        renders[0].status = RenderStatus.COMPLETED
+        renders[0].url = "http://example.com/plano-000.mp4"
+
+        render_repository.create_many(renders[:1])
+
+        stored = render_repository.get_by_job_and_item("bulk-job", "plano-000")
+        assert stored.status == RenderStatus.COMPLETED.value
+        assert stored.url == "http://example.com/plano-000.mp4"
+        assert render_repository.count() == 20
+
+    def test_create_many_is_all_or_nothing(self, render_repository, renders):
+        """Test: a failing row rolls back the whole batch"""
+        renders[5].hash = None  # NOT NULL
+
+        with pytest.raises(Exception):
+            render_repository.create_many(renders)
+
+        assert render_repository.count() == 0
+
+    def test_update_many_with_mixed_columns(self, render_repository, renders):
+        """Test: update_many applies per-render updates with different columns"""
+        render_repository.create_many(renders)
+
+        updated = render_repository.update_many({
+            "bulk-job:plano-000": {"status": RenderStatus.COMPLETED, "url": "http://example.com/0.mp4"},
+            "bulk-job:plano-001": {"url": "http://example.com/1.mp4", "status": RenderStatus.COMPLETED},
+            "bulk-job:plano-002": {"quality": RenderQuality.LOW},
+            "bulk-job:missing": {"status": RenderStatus.ERROR},
+        })
+
+        assert updated == 3
+        assert render_repository.count(status_filter=RenderStatus.COMPLETED) == 2
+        assert render_repository.get_by_job_and_item("bulk-job", "plano-002").quality == RenderQuality.LOW.value
+
+    def test_delete_many(self, render_repository, renders):
+        """Test: delete_many removes the given renders only"""
+        render_repository.create_many(renders)
+
+        deleted = render_repository.delete_many([f"bulk-job:plano-{i:03d}" for i in range(5)] + ["bulk-job:missing"])
+
+        assert deleted == 5
+        assert render_repository.count() == 15
+
+
+class TestJobBulkOperations:
+    """Unit tests for JobRepository bulk operations."""
+
+    def test_create_update_delete_many(self, job_repository, render_repository):
+        """Test: jobs can be created, updated and deleted (with their renders) in bulk"""
+        jobs = [TestDataFactory.create_job(f"bulk-{i}") for i in range(10)]
+
+        assert job_repository.create_many(jobs) == [job.job_id for job in jobs]
+        render_repository.create_many([TestDataFactory.create_render("bulk-0", "plano-0")])
+
+        updated = job_repository.update_many({
+            f"bulk-{i}": {"state": JobState.PROCESSING, "progress": 50} for i in range(4)
+        })
+        assert updated == 4
+        assert job_repository.count(state_filter=JobState.PROCESSING) == 4
+
+        assert job_repository.delete_many(["bulk-0", "bulk-1", "missing"]) == 2
+        assert job_repository.count() == 8
+        assert render_repository.get_by_job_id("bulk-0") == []
+
+    def test_writes_show_up_in_changes_feed(self, test_db_path):
+        """Test: repository writes are stamped and tombstoned like models.dao writes"""
+        # The application schema, as the API and worker create it
+        conn = get_pool(test_db_path).acquire()
+        init_db(conn)
+        conn.close()
+        job_repository = JobRepository(test_db_path)
+        job_repository.create_table()
+        job_repository.create_many([TestDataFactory.create_job(f"feed-{i}") for i in range(3)])
+        with job_repository.get_connection() as conn:
+            cursor = get_changes_cursor(conn)
+
+        job_repository.update_many({"feed-1": {"progress": 40}, "feed-2": {"progress": 60}})
+        job_repository.update_state("feed-0", JobState.PROCESSING)
+        job_repository.delete_many(["feed-2", "missing"])
+
+        with job_repository.get_connection() as conn:
+            rows, _ = list_job_changes(conn, cursor)
+        assert [(row[0], row[1]) for row in rows] == [
+            ("feed-1", JobState.QUEUED.value), ("feed-0", JobState.PROCESSING.value), ("feed-2", "deleted")
+        ]
+
+
+class TestAssetsCacheBulkOperations:
+    """Unit tests for AssetsCacheRepository bulk operations."""
+
+    def test_create_update_delete_many(self, assets_cache_repository):
+        """Test: cached assets can be created, updated and deleted in bulk"""
+        assets = [TestDataFactory.create_assets_cache(f"asset-{i}") for i in range(10)]
+
+        assert assets_cache_repository.create_many(assets) == [asset.hash for asset in assets]
+        assert assets_cache_repository.count() == 10
+
+        updated = assets_cache_repository.update_many({
+            f"asset-{i}": {"url": f"http://example.com/moved-{i}.mp4"} for i in range(3)
+        })
+        assert updated == 3
+        assert assets_cache_repository.get_by_id("asset-1").url == "http://example.com/moved-1.mp4"
+
+        assert assets_cache_repository.delete_many(["asset-0", "asset-1", "missing"]) == 2
+        assert assets_cache_repository.count() == 8
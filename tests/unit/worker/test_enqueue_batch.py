@@ -0,0 +1,78 @@
+"""
+Unit tests for EnterpriseJobManager.enqueue_jobs credit handling.
+
+The credits calculator and repository are provided as in-memory modules
+that keep a per-user balance, so the tests can check that a batch that
+fails to queue leaves every balance where it started.
+"""
+
+import sys
+import types
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+import worker.enterprise_manager as enterprise_manager
+from worker.enterprise_manager import EnterpriseJobManager
+
+
+class FakeCreditsRepository:
+    balances = {}
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def deduct_credits(self, user_id, amount, job_id, description):
+        if self.balances.get(user_id, 0) < amount:
+            return False, "balance too low"
+        self.balances[user_id] -= amount
+        return True, "ok"
+
+    def add_credits(self, user_id, amount, transaction_type, description):
+        self.balances[user_id] = self.balances.get(user_id, 0) + amount
+
+
+@pytest.fixture
+def credits(monkeypatch):
+    FakeCreditsRepository.balances = {"alice": 25}
+    calculator = types.SimpleNamespace(calculate_job_cost=lambda job_type, payload: 10)
+    monkeypatch.setitem(sys.modules, "services.credits_calculator", calculator)
+    monkeypatch.setitem(sys.modules, "repositories.credits_repository",
+                        types.SimpleNamespace(CreditsRepository=FakeCreditsRepository))
+    monkeypatch.setattr(enterprise_manager, "get_conn", MagicMock())
+    return FakeCreditsRepository.balances
+
+
+def _jobs(count):
+    return [("quick_create_full_universe", {"job_id": f"qcf-{i}", "user_id": "alice"}) for i in range(count)]
+
+
+class TestEnqueueJobsCredits:
+    """Unit tests for credit deduction and refund in enqueue_jobs."""
+
+    async def test_charges_queued_jobs_only(self, credits, monkeypatch):
+        """Test: Jobs the balance cannot cover are rejected and the rest are charged and queued"""
+        monkeypatch.setattr(enterprise_manager, "storage", MagicMock(upsert_jobs=AsyncMock()))
+        monkeypatch.setattr(enterprise_manager, "job_queue", MagicMock(enqueue_many=AsyncMock()))
+
+        results = await EnterpriseJobManager().enqueue_jobs(_jobs(3))
+
+        assert [result["status"] for result in results] == ["queued", "queued", "rejected"]
+        assert credits["alice"] == 5
+
+    @pytest.mark.parametrize("failing", ["upsert_jobs", "enqueue_many"])
+    async def test_failed_batch_is_refunded(self, credits, monkeypatch, failing):
+        """Test: When persisting or queueing the batch fails, every deduction is refunded and the error propagates"""
+        storage = MagicMock(upsert_jobs=AsyncMock())
+        job_queue = MagicMock(enqueue_many=AsyncMock())
+        target = storage if failing == "upsert_jobs" else job_queue
+        getattr(target, failing).side_effect = ConnectionError("backend down")
+        monkeypatch.setattr(enterprise_manager, "storage", storage)
+        monkeypatch.setattr(enterprise_manager, "job_queue", job_queue)
+        manager = EnterpriseJobManager()
+
+        with pytest.raises(ConnectionError):
+            await manager.enqueue_jobs(_jobs(2))
+
+        assert credits["alice"] == 25
+        assert manager._stats["total_jobs"] == 0
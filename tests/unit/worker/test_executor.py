@@ -0,0 +1,124 @@
+"""
+Unit tests for the worker JobExecutor.
+
+Covers the global and per-job-type concurrency limits, cancellation
+of a single job and the shutdown drain behaviour.
+"""
+
+import asyncio
+import pytest
+
+from worker.executor import JobExecutor
+
+
+async def _run_jobs(executor: JobExecutor, job_type: str, count: int, gauge: dict, delay: float = 0.01):
+    """Submit `count` jobs that record their peak concurrency in `gauge`."""
+    async def job():
+        gauge["now"] += 1
+        gauge["peak"] = max(gauge["peak"], gauge["now"])
+        await asyncio.sleep(delay)
+        gauge["now"] -= 1
+
+    for _ in range(count):
+        await executor.acquire_slot()
+        executor.submit(job_type, job)
+
+
+class TestJobExecutor:
+    """Unit tests for JobExecutor concurrency limits."""
+
+    async def test_global_limit_caps_in_flight_jobs(self):
+        """Test: No more than max_concurrent jobs run at once"""
+        executor = JobExecutor(max_concurrent=3)
+        gauge = {"now": 0, "peak": 0}
+
+        await _run_jobs(executor, "tts", 10, gauge)
+        await executor.drain(timeout=5)
+
+        assert gauge["peak"] == 3
+        assert executor.get_stats()["in_flight"] == 0
+
+    async def test_type_limit_is_stricter_than_global(self):
+        """Test: Per-type limit bounds a job type below the global limit"""
+        executor = JobExecutor(max_concurrent=10, type_limits={"compose": 2})
+        gauge = {"now": 0, "peak": 0}
+
+        await _run_jobs(executor, "compose", 6, gauge)
+        await executor.drain(timeout=5)
+
+        assert gauge["peak"] == 2
+
+    async def test_failing_job_releases_its_slot(self):
+        """Test: An exception in a job does not leak the global slot"""
+        executor = JobExecutor(max_concurrent=1)
+
+        async def boom():
+            raise RuntimeError("boom")
+
+        await executor.acquire_slot()
+        executor.submit("tts", boom)
+        await executor.drain(timeout=1)
+
+        # Would block forever if the slot leaked
+        await asyncio.wait_for(executor.acquire_slot(), timeout=1)
+
+    async def test_saturated_types_follow_submitted_jobs(self):
+        """Test: A capped type is saturated while its limit of jobs is submitted, queued ones included"""
+        executor = JobExecutor(max_concurrent=10, type_limits={"compose": 2})
+        release = asyncio.Event()
+
+        async def job():
+            await release.wait()
+
+        for _ in range(2):
+            await executor.acquire_slot()
+            executor.submit("compose", job)
+        await executor.acquire_slot()
+        executor.submit("tts", job)
+
+        assert executor.saturated_types() == {"compose"}
+
+        release.set()
+        await executor.drain(timeout=1)
+
+        assert executor.saturated_types() == set()
+
+    async def test_drain_cancels_jobs_after_timeout(self):
+        """Test: drain() cancels jobs still running after the grace period"""
+        executor = JobExecutor(max_concurrent=2)
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        await executor.acquire_slot()
+        executor.submit("quick_create_full_universe", slow)
+        await executor.drain(timeout=0.05)
+
+        assert cancelled.is_set()
+        assert executor.get_stats()["in_flight"] == 0
+
+    async def test_cancel_stops_job_and_frees_slot(self):
+        """Test: cancel() interrupts a running job and releases its slot at once"""
+        executor = JobExecutor(max_concurrent=1)
+        outcome = {}
+
+        async def long_job():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                outcome["user_cancel"] = executor.is_cancel_requested("qcf-1")
+                raise
+
+        await executor.acquire_slot()
+        executor.submit("quick_create_full_universe", long_job, key="qcf-1")
+        await asyncio.sleep(0)
+
+        assert executor.cancel("qcf-1") is True
+        await asyncio.wait_for(executor.acquire_slot(), timeout=1)
+        assert outcome["user_cancel"] is True
+        assert executor.cancel("qcf-1") is False
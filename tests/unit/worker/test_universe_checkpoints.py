@@ -0,0 +1,216 @@
+"""
+Unit tests for the phase checkpoints of quick_create_full_universe jobs.
+
+KIE, the HTTP downloads, ffmpeg and the storage backend are replaced by
+in-memory fakes, so the tests count which paid phases a retried job runs
+again after failing at each point of the pipeline.
+"""
+
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import pytest
+
+import worker.enterprise_manager as enterprise_manager
+from worker.enterprise_manager import EnterpriseJob, EnterpriseJobManager, _file_matches
+
+IMAGE_URL = "https://kie.example/concept.jpg"
+VIDEO_URL = "https://kie.example/video.mp4"
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.status = 200 if body is not None else 404
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """aiohttp.ClientSession serving the bodies in `remote`, recording every URL fetched"""
+
+    def __init__(self, remote: dict, fetched: list):
+        self.remote = remote
+        self.fetched = fetched
+
+    def get(self, url):
+        self.fetched.append(url)
+        return FakeResponse(self.remote.get(url, b"soundtrack" if "pixabay" in url else None))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeStorage:
+    def __init__(self):
+        self.checkpoints = {}
+
+    async def get_job_checkpoints(self, job_id):
+        return dict(self.checkpoints)
+
+    async def save_job_checkpoint(self, job_id, phase, data):
+        self.checkpoints[phase] = data
+
+
+async def _ffmpeg(*cmd):
+    # Every ffmpeg call in the pipeline writes its output file last
+    Path(cmd[-1]).write_bytes(b"ffmpeg " + " ".join(cmd[1:-1]).encode())
+    return b"", b""
+
+
+@pytest.fixture
+def universe(monkeypatch, tmp_path):
+    remote = {IMAGE_URL: b"concept image", VIDEO_URL: b"ai video"}
+    env = {
+        "storage": FakeStorage(),
+        "fetched": [],
+        "remote": remote,
+        "image": AsyncMock(return_value=IMAGE_URL),
+        "video": AsyncMock(return_value=VIDEO_URL),
+        "ffmpeg": AsyncMock(side_effect=_ffmpeg),
+        "media": tmp_path / "qcf-1",
+    }
+    monkeypatch.setattr(enterprise_manager.settings, "MEDIA_DIR", str(tmp_path))
+    monkeypatch.setattr(enterprise_manager.settings, "VIDEO_INPUT_CROPPED_IMAGE", False)
+    monkeypatch.setattr(enterprise_manager, "KIE_AVAILABLE", True)
+    monkeypatch.setattr(enterprise_manager, "VIDEO_AVAILABLE", True)
+    monkeypatch.setattr(enterprise_manager, "kie_generate_image", env["image"], raising=False)
+    monkeypatch.setattr(enterprise_manager, "kie_generate_video", env["video"], raising=False)
+    monkeypatch.setattr(enterprise_manager, "_run_subprocess", env["ffmpeg"])
+    monkeypatch.setattr(enterprise_manager, "storage", env["storage"])
+    monkeypatch.setattr(enterprise_manager.aiohttp, "ClientSession", lambda: FakeSession(remote, env["fetched"]))
+    return env
+
+
+async def _run(env) -> EnterpriseJob:
+    manager = EnterpriseJobManager()
+    manager._save_job_state = AsyncMock()
+    job = EnterpriseJob("qcf-1", "quick_create_full_universe", {"idea_text": "a lighthouse", "aspect_ratio": "9:16"})
+    await manager._process_quick_create_full_universe("worker-test", job)
+    return job
+
+
+def _reset_calls(env):
+    env["image"].reset_mock()
+    env["video"].reset_mock()
+    env["ffmpeg"].reset_mock()
+    env["fetched"].clear()
+
+
+def _crop_calls(env) -> int:
+    return sum("crop=720:1280" in " ".join(call.args) for call in env["ffmpeg"].call_args_list)
+
+
+class TestUniverseCheckpoints:
+    """Unit tests for checkpointed resume of quick_create_full_universe."""
+
+    async def test_first_run_checkpoints_every_phase(self, universe):
+        """Test: A clean run records all four phases and feeds the KIE image URL to the video model"""
+        job = await _run(universe)
+
+        assert set(universe["storage"].checkpoints) == {"concept_image", "crop", "video", "audio_mix"}
+        assert universe["video"].await_args.kwargs["image_url"] == IMAGE_URL
+        assert universe["storage"].checkpoints["crop"]["concept_image_url"] == IMAGE_URL
+        assert job.metadata["video_source"] == "ai_generated"
+
+    async def test_cropped_image_url_is_opt_in(self, universe, monkeypatch):
+        """Test: The locally served cropped image is only sent to image-to-video when enabled"""
+        monkeypatch.setattr(enterprise_manager.settings, "VIDEO_INPUT_CROPPED_IMAGE", True)
+        monkeypatch.setattr(enterprise_manager.settings, "PUBLIC_BASE_URL", "https://cdn.example")
+
+        await _run(universe)
+
+        assert universe["video"].await_args.kwargs["image_url"] == "https://cdn.example/files/qcf-1/concept.jpg"
+
+    @pytest.mark.parametrize("done, image_calls, crop_calls, video_calls", [
+        (("concept_image",), 0, 1, 1),
+        (("concept_image", "crop"), 0, 0, 1),
+        (("concept_image", "crop", "video"), 0, 0, 0),
+        (("concept_image", "crop", "video", "audio_mix"), 0, 0, 0),
+    ])
+    async def test_retry_resumes_after_each_phase(self, universe, done, image_calls, crop_calls, video_calls):
+        """Test: A retry after a failure past a phase redoes none of the phases checkpointed so far"""
+        await _run(universe)
+        checkpoints = universe["storage"].checkpoints
+        universe["storage"].checkpoints = {phase: checkpoints[phase] for phase in done}
+        if "audio_mix" not in done:
+            # The mix replaces the video in place: put back what the failed attempt left behind
+            (universe["media"] / "universe_complete.mp4").write_bytes(b"ai video")
+        _reset_calls(universe)
+
+        job = await _run(universe)
+
+        assert universe["image"].await_count == image_calls
+        assert _crop_calls(universe) == crop_calls
+        assert universe["video"].await_count == video_calls
+        if video_calls:
+            assert universe["video"].await_args.kwargs["image_url"] == IMAGE_URL
+        assert set(universe["storage"].checkpoints) == {"concept_image", "crop", "video", "audio_mix"}
+        assert job.metadata["output_url"] == "/files/qcf-1/universe_complete.mp4"
+
+    async def test_file_matches_checks_checksum(self, universe, tmp_path):
+        """Test: _file_matches rejects a missing file, a missing checksum and changed contents"""
+        await _run(universe)
+        image = universe["media"] / "concept.jpg"
+        sha256 = universe["storage"].checkpoints["crop"]["sha256"]
+
+        assert await _file_matches(image, sha256)
+        assert not await _file_matches(image, None)
+        assert not await _file_matches(tmp_path / "missing.jpg", sha256)
+        image.write_bytes(b"corrupted")
+        assert not await _file_matches(image, sha256)
+
+    async def test_corrupted_concept_image_is_downloaded_again(self, universe):
+        """Test: A concept image whose checksum no longer matches is re-fetched from KIE, not regenerated"""
+        await _run(universe)
+        universe["storage"].checkpoints = {"concept_image": universe["storage"].checkpoints["concept_image"]}
+        (universe["media"] / "concept.jpg").write_bytes(b"half written")
+        _reset_calls(universe)
+
+        await _run(universe)
+
+        universe["image"].assert_not_awaited()
+        assert universe["fetched"][0] == IMAGE_URL
+        assert _crop_calls(universe) == 1
+
+    async def test_corrupted_video_is_downloaded_again(self, universe):
+        """Test: A video checkpoint with a mismatching file is restored from its URL, skipping image and video generation"""
+        await _run(universe)
+        checkpoints = universe["storage"].checkpoints
+        universe["storage"].checkpoints = {phase: checkpoints[phase] for phase in ("concept_image", "crop", "video")}
+        (universe["media"] / "universe_complete.mp4").write_bytes(b"truncated")
+        _reset_calls(universe)
+
+        await _run(universe)
+
+        assert universe["fetched"][0] == VIDEO_URL
+        universe["image"].assert_not_awaited()
+        universe["video"].assert_not_awaited()
+
+    async def test_lost_video_is_generated_again(self, universe):
+        """Test: When the checkpointed video can no longer be downloaded, the video phase runs again"""
+        await _run(universe)
+        checkpoints = universe["storage"].checkpoints
+        universe["storage"].checkpoints = {phase: checkpoints[phase] for phase in ("concept_image", "crop", "video")}
+        (universe["media"] / "universe_complete.mp4").unlink()
+        del universe["remote"][VIDEO_URL]
+        universe["video"].return_value = "https://kie.example/video-2.mp4"
+        universe["remote"]["https://kie.example/video-2.mp4"] = b"ai video 2"
+        _reset_calls(universe)
+
+        await _run(universe)
+
+        universe["image"].assert_not_awaited()
+        assert _crop_calls(universe) == 0
+        assert universe["video"].await_count == 1
+        assert universe["storage"].checkpoints["video"]["video_url"] == "https://kie.example/video-2.mp4"